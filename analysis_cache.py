@@ -0,0 +1,106 @@
+"""In-memory transposition cache for engine analysis results.
+
+Positions are keyed by their Polyglot Zobrist hash, so revisiting a position
+(undo + replay, flipping the board, toggling the side to move back) can be
+answered without starting a new search.
+"""
+import threading
+from collections import OrderedDict
+
+import chess.polyglot
+
+
+class CachedAnalysis:
+    __slots__ = ("best_move", "second_move", "score", "depth", "think_time")
+
+    def __init__(self, best_move, second_move, score, depth, think_time):
+        self.best_move = best_move
+        self.second_move = second_move
+        self.score = score
+        self.depth = depth or 0
+        self.think_time = think_time
+
+    def as_result(self):
+        # Same shape as an engine info dict, so update_eval_bar() can use it directly
+        return {'score': self.score, 'depth': self.depth} if self.score is not None else None
+
+
+class AnalysisCache:
+    def __init__(self, max_entries=4096, replace_window=16):
+        self.max_entries = max_entries
+        # When full, the shallowest of the `replace_window` least recently used
+        # entries is evicted, so deep results survive longer than shallow ones.
+        self.replace_window = replace_window
+        self._entries = OrderedDict()
+        # Deepest depth seen so far for each think time, used to decide whether a
+        # cached entry is "deep enough" for the currently selected think time.
+        self._depth_for_time = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(board):
+        return chess.polyglot.zobrist_hash(board)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def expected_depth(self, think_time):
+        with self._lock:
+            return self._expected_depth(think_time)
+
+    def _expected_depth(self, think_time):
+        # Depth reached with this think time; failing that, the shallowest depth
+        # reached with a longer one (a shorter search cannot be expected to beat it)
+        if think_time in self._depth_for_time:
+            return self._depth_for_time[think_time]
+        depths = [d for t, d in self._depth_for_time.items() if t > think_time]
+        return min(depths) if depths else None
+
+    def lookup(self, board, think_time):
+        """Return a CachedAnalysis deep enough for think_time, or None."""
+        key = self.key(board)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.think_time < think_time:
+                needed = self._expected_depth(think_time)
+                if needed is None or entry.depth < needed:
+                    return None
+            # Guard against hash collisions before trusting the cached move
+            if entry.best_move is not None and entry.best_move not in board.legal_moves:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def store(self, board, best_move, second_move, score, depth, think_time):
+        entry = CachedAnalysis(best_move, second_move, score, depth, think_time)
+        key = self.key(board)
+        with self._lock:
+            if entry.depth:
+                self._depth_for_time[think_time] = max(self._depth_for_time.get(think_time, 0), entry.depth)
+            old = self._entries.get(key)
+            if old is not None and old.depth > entry.depth and old.think_time >= entry.think_time:
+                # Keep the deeper result already in the cache
+                self._entries.move_to_end(key)
+                return old
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._evict()
+            return entry
+
+    def _evict(self):
+        victim = None
+        for i, (key, entry) in enumerate(self._entries.items()):
+            if i >= self.replace_window:
+                break
+            if victim is None or entry.depth < victim[1].depth:
+                victim = (key, entry)
+        if victim is not None:
+            del self._entries[victim[0]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
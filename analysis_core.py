@@ -0,0 +1,170 @@
+"""GUI-free analysis helpers shared by the Tk app, the engine pool and the CLI.
+
+Nothing in here imports tkinter or PIL, so it can be used on display-less
+machines and imported cheaply from command-line tools.
+"""
+import os
+
+import chess
+import chess.engine
+
+# Set this to your Stockfish executable path (portable: always looks in the same folder as the script/exe).
+# The STOCKFISH_PATH environment variable overrides it, e.g. on Linux servers.
+STOCKFISH_PATH = os.environ.get(
+    "STOCKFISH_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "stockfish-windows-x86-64-avx2.exe"),
+)
+
+
+class PositionProblem:
+    """Why a position cannot be analysed.
+
+    kind is 'error' (illegal/unsupported position), 'checkmate' or 'stalemate';
+    details lists the likely reasons for an illegal position.
+    """
+    __slots__ = ("text", "kind", "details")
+
+    def __init__(self, text, kind="error", details=()):
+        self.text = text
+        self.kind = kind
+        self.details = list(details)
+
+
+def position_problem(board, user_color=None):
+    """Return a PositionProblem if the engine should not analyse board, else None.
+
+    user_color ('w'/'b') is the side the user asked to analyse for; analysing
+    for the wrong side while the other one is in check is refused.
+    """
+    try:
+        # --- Block engine analysis if user tries to calculate for the wrong side in check ---
+        if user_color and board.king(chess.WHITE) is not None and board.king(chess.BLACK) is not None:
+            # If white is in check and user tries to analyze for black
+            if board.is_check() and board.turn == chess.WHITE and user_color == 'b':
+                return PositionProblem("White in check!")
+            # If black is in check and user tries to analyze for white
+            if board.is_check() and board.turn == chess.BLACK and user_color == 'w':
+                return PositionProblem("Black in check!")
+        if not board.is_valid():
+            details = []
+            if board.king(chess.WHITE) is None:
+                details.append("Missing white king.")
+            if board.king(chess.BLACK) is None:
+                details.append("Missing black king.")
+            if board.is_check():
+                details.append("One or both kings are in check.")
+            details.append("There may be other illegalities (e.g., too many pawns, both kings in check, etc.)")
+            return PositionProblem("Position is illegal!", details=details)
+        if board.king(chess.WHITE) is None or board.king(chess.BLACK) is None:
+            return PositionProblem("Missing king(s)!")
+        if board.is_checkmate():
+            winner = "Black wins" if board.turn == chess.WHITE else "White wins"
+            return PositionProblem(winner, kind="checkmate")
+        if board.is_stalemate():
+            return PositionProblem("Stalemate", kind="stalemate")
+        if not any(board.legal_moves):
+            return PositionProblem("No legal moves for the current side to move!")
+    except Exception as ex:
+        return PositionProblem("Position is not legal for engine analysis!", details=[str(ex)])
+    return None
+
+
+def line_fen(line):
+    """FEN of a line from a FEN or EPD file; EPD records (with or without opcodes) are converted.
+
+    Lines that are neither are returned stripped, so the caller reports them as invalid.
+    """
+    line = line.strip()
+    try:
+        return chess.Board(line).fen()
+    except ValueError:
+        pass
+    try:
+        return chess.Board.from_epd(line)[0].fen()
+    except ValueError:
+        return line
+
+
+class AnalysisOutcome:
+    """Best and second best move of a finished search.
+
+    result is the engine info dict of the principal line (has 'score', 'pv',
+    'depth'), lines holds the info dict of every multipv line in order.
+    """
+    __slots__ = ("board", "best_move", "second_move", "result", "depth", "lines")
+
+    def __init__(self, board, best_move=None, second_move=None, result=None, depth=None, lines=()):
+        self.board = board
+        self.best_move = best_move
+        self.second_move = second_move
+        self.result = result
+        self.depth = depth
+        self.lines = list(lines)
+
+    @property
+    def score(self):
+        return self.result.get('score') if self.result else None
+
+    @property
+    def best_move_san(self):
+        return self.board.san(self.best_move) if self.best_move else None
+
+    @property
+    def second_move_san(self):
+        return self.board.san(self.second_move) if self.second_move else None
+
+    def to_dict(self):
+        # JSON-friendly form; scores are from White's point of view
+        lines = []
+        for i, info in enumerate(self.lines, 1):
+            pv = info.get('pv') or []
+            lines.append({
+                "multipv": info.get('multipv', i),
+                "move": pv[0].uci() if pv else None,
+                "san": self.board.san(pv[0]) if pv else None,
+                "pv": [m.uci() for m in pv],
+                **score_to_dict(info.get('score')),
+            })
+        return {
+            "fen": self.board.fen(),
+            "status": "ok",
+            "best_move": self.best_move.uci() if self.best_move else None,
+            "best_move_san": self.best_move_san,
+            "second_move": self.second_move.uci() if self.second_move else None,
+            "second_move_san": self.second_move_san,
+            "depth": self.depth,
+            **score_to_dict(self.score),
+            "lines": lines,
+        }
+
+
+def score_to_dict(score):
+    if score is None:
+        return {"score_cp": None, "mate": None}
+    white = score.white()
+    return {"score_cp": white.score(), "mate": white.mate()}
+
+
+def outcome_from_infos(board, multipv_infos, depth=None):
+    """Build an AnalysisOutcome from {multipv number: info} (multipv=1 is best, 2 second best)."""
+    lines = [multipv_infos[k] for k in sorted(multipv_infos)]
+    result = multipv_infos.get(1)
+    best_move = second_move = None
+    if result and result.get('pv'):
+        best_move = result['pv'][0]
+    if 2 in multipv_infos and multipv_infos[2].get('pv'):
+        second_move = multipv_infos[2]['pv'][0]
+    if depth is None and result:
+        depth = result.get('depth')
+    return AnalysisOutcome(board, best_move, second_move, result, depth, lines)
+
+
+def outcome_from_list(board, infos):
+    # engine.analyse(..., multipv=n) returns a list of info dicts, best first
+    return outcome_from_infos(board, {i: info for i, info in enumerate(infos, 1)})
+
+
+def analyse(engine, board, limit, multipv=2):
+    """Blocking search on board; returns an AnalysisOutcome."""
+    infos = engine.analyse(board, limit, multipv=multipv)
+    return outcome_from_list(board.copy(stack=False), infos)
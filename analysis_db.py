@@ -0,0 +1,245 @@
+"""Persistent analysis database shared across sessions and users.
+
+Finished searches are stored in a SQLite file keyed by the position's Polyglot
+Zobrist hash and its FEN (without move counters, so hash collisions cannot
+return the wrong position). Each row keeps the depth, think time, score, best
+and second best move, every multipv line and the engine that produced it.
+Writes are depth-aware upserts: a shallower result never replaces a deeper
+one from the same engine, so the file only ever gets better. A result from
+another engine replaces the row (the app only trusts rows from the engine it
+runs), unless either side's engine is unknown.
+
+The file may live on a share used by several analysts. SQLite's default
+rollback journal is used (WAL needs shared memory, which network file systems
+do not provide): any number of readers work concurrently and writers wait up
+to BUSY_TIMEOUT for each other. Every thread gets its own connection.
+
+Import/export uses JSON lines in the same format as `nextchessmove.py batch`
+(plus "engine" and "think_time"), so batch results can be imported directly:
+
+    python nextchessmove.py batch positions.fen --time 5 > deep.jsonl
+    python nextchessmove.py db import deep.jsonl
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import chess
+import chess.engine
+import chess.polyglot
+
+from analysis_core import score_to_dict
+
+# Database file next to the script, or the NEXTCHESSMOVE_ANALYSIS_DB environment variable (e.g. on a share)
+ANALYSIS_DB_PATH = os.environ.get(
+    "NEXTCHESSMOVE_ANALYSIS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis.sqlite3"),
+)
+BUSY_TIMEOUT = 5.0  # Seconds to wait for another process's write lock
+UI_TIMEOUT = 0.05  # Seconds a lookup from the UI thread waits; longer counts as a miss
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    zobrist INTEGER NOT NULL,
+    fen TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    think_time REAL,
+    score_cp INTEGER,
+    mate INTEGER,
+    best_move TEXT,
+    second_move TEXT,
+    lines TEXT NOT NULL,
+    engine TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (zobrist, fen)
+)
+"""
+
+_COLUMNS = ("zobrist", "fen", "depth", "think_time", "score_cp", "mate", "best_move", "second_move", "lines", "engine", "updated")
+
+# Depth-aware upsert: keep the existing row unless the new one is deeper (or as deep with a longer search),
+# or comes from a different engine
+_UPSERT = f"""
+INSERT INTO positions ({", ".join(_COLUMNS)}) VALUES ({", ".join("?" * len(_COLUMNS))})
+ON CONFLICT (zobrist, fen) DO UPDATE SET
+    {", ".join(f"{c} = excluded.{c}" for c in _COLUMNS[2:])}
+WHERE (excluded.engine IS NOT NULL AND positions.engine IS NOT NULL AND excluded.engine != positions.engine)
+   OR excluded.depth > positions.depth
+   OR (excluded.depth = positions.depth AND COALESCE(excluded.think_time, 0) > COALESCE(positions.think_time, 0))
+"""
+
+
+def position_key(board):
+    # SQLite integers are signed 64-bit; the Polyglot hash is unsigned
+    zobrist = chess.polyglot.zobrist_hash(board)
+    return zobrist - (1 << 64) if zobrist >= 1 << 63 else zobrist, board.epd()
+
+
+def _pov_score(score_cp, mate):
+    if mate is not None:
+        return chess.engine.PovScore(chess.engine.Mate(mate), chess.WHITE)
+    if score_cp is not None:
+        return chess.engine.PovScore(chess.engine.Cp(score_cp), chess.WHITE)
+    return None
+
+
+class StoredAnalysis:
+    __slots__ = ("fen", "depth", "think_time", "score", "best_move", "second_move", "lines", "engine", "updated")
+
+    def __init__(self, fen, depth, think_time, score, best_move, second_move, lines, engine, updated):
+        self.fen = fen
+        self.depth = depth
+        self.think_time = think_time
+        self.score = score  # chess.engine.PovScore
+        self.best_move = best_move
+        self.second_move = second_move
+        self.lines = lines  # [{"multipv", "pv": [uci...], "score_cp", "mate"}], best first
+        self.engine = engine
+        self.updated = updated
+
+    @classmethod
+    def from_row(cls, row):
+        _, fen, depth, think_time, score_cp, mate, best, second, lines, engine, updated = row
+        return cls(fen, depth, think_time, _pov_score(score_cp, mate),
+                   chess.Move.from_uci(best) if best else None, chess.Move.from_uci(second) if second else None,
+                   json.loads(lines), engine, updated)
+
+    def as_result(self):
+        # Same shape as an engine info dict, for show_best_moves()/update_eval_bar()
+        if self.score is None:
+            return None
+        pv = self.lines[0].get("pv") if self.lines else None
+        return {'score': self.score, 'depth': self.depth, 'pv': [chess.Move.from_uci(m) for m in pv or ()]}
+
+    def to_dict(self):
+        return {"fen": self.fen, "status": "ok",
+                "best_move": self.best_move.uci() if self.best_move else None,
+                "second_move": self.second_move.uci() if self.second_move else None,
+                "depth": self.depth, **score_to_dict(self.score), "lines": self.lines,
+                "engine": self.engine, "think_time": self.think_time}
+
+
+def _row(board, depth, think_time, score, best_move, second_move, lines, engine, updated=None):
+    zobrist, fen = position_key(board)
+    score = score_to_dict(score)
+    return (zobrist, fen, depth or 0, think_time, score["score_cp"], score["mate"],
+            best_move.uci() if best_move else None, second_move.uci() if second_move else None,
+            json.dumps(lines), engine, updated or time.time())
+
+
+def _outcome_lines(outcome):
+    lines = []
+    for i, info in enumerate(outcome.lines, 1):
+        pv = info.get('pv') or []
+        lines.append({"multipv": info.get('multipv', i), "pv": [m.uci() for m in pv], **score_to_dict(info.get('score'))})
+    return lines
+
+
+class AnalysisDB:
+    def __init__(self, path=ANALYSIS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Each connection is only used by its own thread; close() may run on another one
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            self._local.db = db
+            self._local.timeout = BUSY_TIMEOUT
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def lookup(self, board, timeout=BUSY_TIMEOUT):
+        """The stored analysis of board, or None.
+
+        Waits up to timeout seconds for another process's write to finish,
+        then raises sqlite3.OperationalError ("database is locked").
+        """
+        zobrist, fen = position_key(board)
+        db = self._connect()
+        if self._local.timeout != timeout:
+            # Per connection, so it only affects this thread's lookups
+            db.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+            self._local.timeout = timeout
+        row = db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM positions WHERE zobrist = ? AND fen = ?", (zobrist, fen)).fetchone()
+        return StoredAnalysis.from_row(row) if row else None
+
+    def store(self, outcome, think_time=None, engine=None):
+        """Upsert a finished search (analysis_core.AnalysisOutcome); a deeper stored result is kept."""
+        if outcome.best_move is None:
+            return
+        row = _row(outcome.board, outcome.depth, think_time, outcome.score, outcome.best_move, outcome.second_move,
+                   _outcome_lines(outcome), engine)
+        with self._connect() as db:
+            db.execute(_UPSERT, row)
+
+    def import_lines(self, lines, engine=None, batch_size=1000, on_error=None):
+        """Bulk upsert JSON lines as written by export() or the batch command; returns the number read.
+
+        Lines without a result (errors) are skipped. Lines that do not parse
+        are skipped and reported to on_error(line_number, line, message).
+        engine is used where a line names none.
+        """
+        count = 0
+        rows = []
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("not a JSON object")
+                if record.get("status", "ok") != "ok" or not record.get("best_move"):
+                    continue
+                board = chess.Board(record["fen"])
+                lines_ = [{"multipv": l.get("multipv", i), "pv": l.get("pv") or [], "score_cp": l.get("score_cp"), "mate": l.get("mate")}
+                          for i, l in enumerate(record.get("lines") or (), 1)]
+                rows.append(_row(board, record.get("depth"), record.get("think_time"),
+                                 _pov_score(record.get("score_cp"), record.get("mate")),
+                                 chess.Move.from_uci(record["best_move"]),
+                                 chess.Move.from_uci(record["second_move"]) if record.get("second_move") else None,
+                                 lines_, record.get("engine") or engine, record.get("updated")))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                if on_error:
+                    on_error(line_number, line.strip(), str(e) if not isinstance(e, KeyError) else f"missing {e}")
+                continue
+            count += 1
+            if len(rows) >= batch_size:
+                self._upsert_many(rows)
+                rows = []
+        if rows:
+            self._upsert_many(rows)
+        return count
+
+    def _upsert_many(self, rows):
+        # One transaction per batch: much faster than a commit per row, and readers are only blocked briefly
+        with self._connect() as db:
+            db.executemany(_UPSERT, rows)
+
+    def export_lines(self, min_depth=0):
+        """Yield every stored position as a JSON line (without newline), deepest first."""
+        cursor = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM positions WHERE depth >= ? ORDER BY depth DESC", (min_depth,))
+        for row in cursor:
+            record = StoredAnalysis.from_row(row).to_dict()
+            record["updated"] = row[-1]
+            yield json.dumps(record)
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
@@ -0,0 +1,400 @@
+"""Single-engine, debounced and cancellable analysis scheduler.
+
+The scheduler owns the Stockfish process. Every board edit submits a new
+request; bursts of edits are coalesced, the in-flight search is stopped as soon
+as the position changes, and only results for the latest request are
+published. In streaming mode intermediate results are pushed as the search
+deepens, at most once per update_interval.
+
+While idle, the engine can work through speculative requests (likely next
+positions, see speculate()). They only run when nothing real is queued and are
+dropped the moment a real request or a cancel arrives. Below those come
+background requests (see background()): they survive new requests, and one
+that gets interrupted is simply searched again later.
+
+python-chess cancels a running command when another one is sent on the same
+engine, so blocking code must never call the engine's SimpleEngine facade
+directly; run_exclusive() runs it between searches instead.
+
+Searches run as a coroutine on the shared engine loop (engine_loop), so the
+scheduler adds no threads of its own. Callbacks are handed to dispatch (e.g.
+UiQueue.post to run them on the Tk thread) or called on the loop thread.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+
+import chess
+import chess.engine
+
+from analysis_core import outcome_from_infos
+from engine_loop import shared_loop
+from engine_telemetry import SearchTelemetry
+from fallback_engine import FallbackEngine
+
+class AnalysisRequest:
+    __slots__ = ("board", "think_time", "multipv", "generation", "submitted", "started", "elapsed", "telemetry",
+                 "on_progress", "on_update", "on_done", "on_error", "speculative", "background", "interrupted")
+
+    def __init__(self, board, think_time, multipv, generation, on_progress=None, on_update=None, on_done=None, on_error=None,
+                 speculative=False, background=False):
+        self.board = board
+        self.think_time = think_time  # None: search until stopped
+        self.multipv = multipv
+        self.generation = generation
+        self.submitted = time.monotonic()
+        self.started = None
+        self.elapsed = None  # Seconds actually searched, set when the search ends
+        self.telemetry = None  # engine_telemetry.SearchTelemetry, set when the search starts
+        self.on_progress = on_progress
+        self.on_update = on_update
+        self.on_done = on_done
+        self.on_error = on_error
+        self.speculative = speculative  # Low priority: pre-empted by any real request
+        self.background = background  # Lowest priority: generation counts background() calls
+        self.interrupted = False  # Stopped to make way for something else; searched again later
+
+    @property
+    def searched_time(self):
+        # Seconds of search the result stands for: think_time, or less if the search was stopped early
+        if self.think_time is None:
+            return self.elapsed
+        if self.telemetry is not None and self.telemetry.stopped:
+            return min(self.think_time, self.elapsed)
+        return self.think_time
+
+
+class AnalysisScheduler:
+    def __init__(self, engine_path, profile=None, debounce=0.05, update_interval=0.1, fallback=False,
+                 loop=None, dispatch=None):
+        self.engine_path = engine_path
+        self.profile = profile  # engine_profiles.EngineProfile applied to the engine, or None
+        self.debounce = debounce
+        self.update_interval = update_interval
+        self.fallback = fallback  # Use the built-in engine if engine_path cannot be started
+        self.loop = loop or shared_loop()
+        self.dispatch = dispatch  # callable(fn, *args) delivering callbacks; None: call on the loop thread
+        self.engine = None  # SimpleEngine bound to the loop, or FallbackEngine
+        self.engine_name = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = None
+        self._speculative = collections.deque()  # Speculative AnalysisRequests, run while idle
+        self._background = collections.deque()  # Background AnalysisRequests, run when nothing else is queued
+        self._background_generation = 0
+        self._exclusive = collections.deque()  # (fn, args, concurrent.futures.Future) for run_exclusive()
+        self._active = None  # (request, analysis) being searched; only touched on the loop
+        self._closed = False
+        self._wakeup = None  # asyncio.Event, created on the loop
+        self._task = None  # Future of the _run() coroutine
+
+    def ensure_engine(self):
+        # Start Stockfish on first use; returns None if it cannot be started (and there is no fallback)
+        with self._lock:
+            if self.engine is None and not self._closed:
+                try:
+                    self.engine = self.loop.popen_uci(self.engine_path)
+                    self._configure()
+                except Exception as e:
+                    print(f"Failed to start Stockfish engine: {e}")
+                    self.engine = FallbackEngine() if self.fallback else None
+                    if self.engine is not None:
+                        print("Using the built-in engine instead.")
+                if self.engine is not None:
+                    self.engine_name = self.engine.id.get("name")
+            if self.engine is not None and self._task is None:
+                self._task = self.loop.run(self._run())
+            return self.engine
+
+    def _configure(self):
+        if self.profile is not None:
+            options = self.profile.engine_options(self.engine)
+            if options:
+                self.engine.configure(options)
+
+    def apply_profile(self, profile):
+        """Switch to a new EngineProfile; anything queued or running is cancelled."""
+        self.cancel()
+        with self._lock:
+            self.profile = profile
+            started = self.engine is not None
+        if started:
+            def configure(engine):
+                try:
+                    options = profile.engine_options(engine)
+                    if options:
+                        engine.configure(options)
+                except Exception as e:
+                    print(f"Failed to configure engine: {e}")
+            self.run_exclusive(configure)
+
+    def run_exclusive(self, fn, *args):
+        """Run fn(engine, *args) off the loop with the engine to itself; returns a concurrent.futures.Future.
+
+        For blocking code using the SimpleEngine facade (Points Match, ...).
+        The running search is stopped and searched again afterwards; nothing
+        else starts until fn returns.
+        """
+        future = concurrent.futures.Future()
+        if self.ensure_engine() is None:
+            future.set_exception(chess.engine.EngineTerminatedError("engine not available"))
+            return future
+        with self._lock:
+            self._exclusive.append((fn, args, future))
+        self.loop.call_soon(self._interrupt)
+        return future
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def submit(self, board, think_time, multipv=2, on_progress=None, on_update=None, on_done=None, on_error=None):
+        """Queue analysis of board, replacing anything queued or running.
+
+        think_time=None searches until stop_current() or the next submit.
+        Callbacks go through dispatch: on_progress(request, info) for each
+        engine info line, on_update(request, outcome) with the current best
+        lines as the search deepens (rate-limited), on_done(request, outcome)
+        when a search finishes uncancelled, on_error(request, exc) on engine
+        failure. outcome is an analysis_core.AnalysisOutcome.
+        """
+        with self._lock:
+            self._generation += 1
+            request = AnalysisRequest(board.copy(stack=False), think_time, multipv, self._generation,
+                                      on_progress, on_update, on_done, on_error)
+            self._pending = request
+            self._speculative.clear()
+        self.loop.call_soon(self._kick)
+        return request
+
+    def speculate(self, boards, think_time, multipv=2, on_done=None):
+        """Analyse boards while the engine is otherwise idle, in order.
+
+        on_done(request, outcome) is called for each speculative search that
+        completes. All of them are dropped (a running one is stopped) by the
+        next submit() or cancel(), so they never delay a real request.
+        """
+        with self._lock:
+            self._speculative.clear()
+            for board in boards:
+                self._speculative.append(AnalysisRequest(board.copy(stack=False), think_time, multipv, self._generation,
+                                                         on_done=on_done, speculative=True))
+        self.loop.call_soon(self._wake)
+
+    def background(self, jobs, multipv=1, on_done=None):
+        """Replace the background queue with jobs ((board, think_time) pairs), searched in order when nothing else is queued.
+
+        Unlike speculative requests they are kept across submit() and
+        cancel(); a background search interrupted by a real request is queued
+        again. on_done(request, outcome) is called for each completed one.
+        """
+        with self._lock:
+            self._background_generation += 1
+            self._background.clear()
+            for board, think_time in jobs:
+                self._background.append(AnalysisRequest(board.copy(stack=False), think_time, multipv,
+                                                        self._background_generation, on_done=on_done, background=True))
+        self.loop.call_soon(self._wake)
+
+    def cancel(self):
+        # Invalidate queued and running searches (e.g. the position became illegal)
+        with self._lock:
+            self._generation += 1
+            self._pending = None
+            self._speculative.clear()
+        self.loop.call_soon(self._kick)
+
+    def stop_current(self):
+        # Finish the running search early but still publish its result (e.g. "Stop" in infinite mode)
+        def stop():
+            if self._active is not None and not (self._active[0].speculative or self._active[0].background):
+                self._active[0].telemetry.stopped = True
+                self._stop_active()
+        self.loop.call_soon(stop)
+
+    # --- On the loop ---
+    def _kick(self):
+        # A new request or a cancel: stop the running search and wake the runner
+        if self._active is not None and self._active[0].background:
+            self._active[0].interrupted = True
+        self._stop_active()
+        self._wake()
+
+    def _interrupt(self):
+        # Make way for an exclusive job: the running search is queued again once it has stopped
+        if self._active is not None:
+            self._active[0].interrupted = True
+        self._stop_active()
+        self._wake()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _stop_active(self):
+        if self._active is not None:
+            try:
+                self._active[1].stop()
+            except Exception:
+                pass
+
+    def _is_live(self, request):
+        if request.interrupted:
+            return False
+        if request.background:
+            return request.generation == self._background_generation
+        return self.is_current(request.generation)
+
+    def _requeue(self, request):
+        # Search an interrupted request again, unless something newer replaced it meanwhile
+        request.interrupted = False
+        with self._lock:
+            if request.background:
+                if request.generation == self._background_generation:
+                    self._background.appendleft(request)
+            elif request.generation == self._generation:
+                if request.speculative:
+                    self._speculative.appendleft(request)
+                elif self._pending is None:
+                    request.submitted = time.monotonic() - self.debounce
+                    self._pending = request
+
+    def _emit(self, callback, *args):
+        if self.dispatch is not None:
+            self.dispatch(callback, *args)
+        else:
+            callback(*args)
+
+    async def _next_request(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return None
+                if self._exclusive:
+                    return self._exclusive.popleft()
+                request = self._pending
+                if request is None:
+                    while self._speculative:
+                        speculative = self._speculative.popleft()
+                        if speculative.generation == self._generation:
+                            return speculative
+                    if self._background:
+                        return self._background.popleft()
+            if request is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # Debounce: only start once no newer request arrived for `debounce` seconds
+            remaining = request.submitted + self.debounce - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+            with self._lock:
+                if self._pending is request:
+                    self._pending = None
+                    return request
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            request = await self._next_request()
+            if request is None:
+                return
+            if isinstance(request, tuple):
+                await self._run_exclusive(*request)
+                continue
+            try:
+                outcome = await self._search(request)
+            except Exception as e:
+                if self._is_live(request) and request.on_error:
+                    self._emit(request.on_error, request, e)
+                continue
+            if request.interrupted:
+                # Pre-empted: search it again once the engine is free
+                self._requeue(request)
+                continue
+            if outcome is not None and self._is_live(request) and request.on_done:
+                self._emit(request.on_done, request, outcome)
+
+    async def _run_exclusive(self, fn, args, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = await asyncio.wrap_future(self.loop.run_blocking(fn, self.engine, *args))
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    async def _start_analysis(self, board, limit, multipv):
+        engine = self.engine
+        if engine is None:
+            raise chess.engine.EngineTerminatedError("engine closed")
+        if isinstance(engine, FallbackEngine):
+            return engine.async_analysis(board, limit, multipv=multipv)
+        return await engine.protocol.analysis(board, limit, multipv=multipv)
+
+    async def _search(self, request):
+        multipv_infos = {}
+        depth = None
+        limit = chess.engine.Limit(time=request.think_time) if request.think_time is not None else None
+        if not self._is_live(request):
+            return None
+        request.telemetry = SearchTelemetry(request.board.fen(), request.think_time, request.multipv, self.engine_name)
+        analysis = await self._start_analysis(request.board, limit, request.multipv)
+        self._active = (request, analysis)
+        if self._exclusive or (request.background and self._pending is not None):
+            request.interrupted = True  # Something took priority while the search was being started
+        if not self._is_live(request):
+            analysis.stop()  # Cancelled while the search was being started
+        request.started = time.monotonic()
+        last_update = 0.0
+        changed = False
+        try:
+            async for info in analysis:
+                if not self._is_live(request):
+                    break
+                if info.get('depth') is not None:
+                    depth = info['depth']
+                # Collect by multipv number if present
+                if 'multipv' in info and info.get('pv'):
+                    multipv_infos[info['multipv']] = info.copy()
+                    changed = True
+                request.telemetry.observe(info)
+                if request.on_progress:
+                    self._emit(request.on_progress, request, info)
+                # Stream the current best lines, throttled so the UI is not flooded
+                if request.on_update and changed and 1 in multipv_infos:
+                    now = time.monotonic()
+                    if now - last_update >= self.update_interval:
+                        last_update = now
+                        changed = False
+                        self._emit(request.on_update, request, outcome_from_infos(request.board, dict(multipv_infos), depth))
+        finally:
+            analysis.stop()
+            await analysis.wait()
+            request.elapsed = time.monotonic() - request.started
+            request.telemetry.finish()
+            self._active = None
+        if not self._is_live(request):
+            return None  # Stopped because the position changed, or interrupted
+        return outcome_from_infos(request.board, multipv_infos, depth)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._generation += 1
+            self._pending = None
+            engine, self.engine = self.engine, None
+            exclusive, self._exclusive = list(self._exclusive), collections.deque()
+        for _, _, future in exclusive:
+            future.cancel()
+        self.loop.call_soon(self._kick)
+        if engine is not None:
+            try:
+                engine.quit()
+            except Exception:
+                pass
+            if not isinstance(engine, FallbackEngine):
+                engine.close()
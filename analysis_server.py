@@ -0,0 +1,320 @@
+"""Local HTTP/JSON analysis service backed by a pool of warm engines.
+
+    python nextchessmove.py serve --port 8765 --engines 4
+
+    POST /analyse   {"fen": "...", "time": 1.0, "depth": null, "nodes": null,
+                     "multipv": 2, "stream": false}
+    GET  /metrics   queue depth, in-flight analyses, latency percentiles
+    GET  /health
+
+/analyse answers with the same JSON as `nextchessmove.py analyze`, plus
+"engine" and "think_time". With "stream": true the response is
+newline-delimited JSON: one {"type": "info"} object per engine info line,
+then {"type": "result", ...}.
+
+The server runs on the shared engine loop (engine_loop), next to the
+EnginePool's workers, so it needs no threads of its own. Every request's
+search is capped at max_time seconds. Requests for a position and limit that
+is already being analysed share that search instead of queueing another one.
+When more than max_queue searches are waiting for an engine, new ones are
+refused with 503 so callers can back off.
+"""
+import asyncio
+import collections
+import json
+import time
+from urllib.parse import urlsplit
+
+import chess
+import chess.engine
+
+from analysis_core import position_problem, score_to_dict
+from engine_loop import shared_loop
+from engine_pool import EnginePool
+
+DEFAULT_PORT = 8765
+MAX_TIME = 10.0  # Seconds; cap on every search, also bounds depth/node limited requests
+DEFAULT_TIME = 1.0
+MAX_QUEUE = 64  # Searches waiting for an engine before requests are refused
+MAX_MULTIPV = 5
+MAX_BODY = 64 * 1024
+LATENCY_SAMPLES = 1000  # Recent requests kept for the latency percentiles
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _percentiles(samples):
+    values = sorted(samples)
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "mean": None}
+    pick = lambda f: values[min(len(values) - 1, int(f * len(values)))]
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "mean": sum(values) / len(values)}
+
+
+def _info_dict(info):
+    pv = info.get('pv') or []
+    return {"type": "info", "multipv": info.get('multipv', 1), "depth": info.get('depth'),
+            "seldepth": info.get('seldepth'), "nodes": info.get('nodes'), "nps": info.get('nps'),
+            "pv": [m.uci() for m in pv], **score_to_dict(info.get('score'))}
+
+
+class _Search:
+    # One engine search, shared by every request for the same position and limit
+    def __init__(self, key):
+        self.key = key
+        self.task = None
+        self.started = None  # monotonic time an engine picked it up
+        self.listeners = []  # asyncio.Queues of streaming requests
+
+    def publish(self, info):
+        for listener in self.listeners:
+            listener.put_nowait(info)
+
+
+class AnalysisServer:
+    def __init__(self, engine_path, host="127.0.0.1", port=DEFAULT_PORT, engines=None, max_time=MAX_TIME,
+                 max_queue=MAX_QUEUE, options=None, loop=None):
+        self.host = host
+        self.port = port
+        self.max_time = max_time
+        self.max_queue = max_queue
+        self.loop = loop or shared_loop()
+        self.pool = EnginePool(engine_path, size=engines, options=options, loop=self.loop)
+        self._server = None
+        self._searches = {}  # key -> _Search in flight
+        self.counts = collections.Counter()  # requests, searches, deduplicated, rejected, errors
+        self.latency = collections.deque(maxlen=LATENCY_SAMPLES)  # Request received -> result sent
+        self.queue_wait = collections.deque(maxlen=LATENCY_SAMPLES)  # Search queued -> engine started
+        self.started = time.time()
+
+    # --- Lifecycle (from any thread but the loop) ---
+    def start(self):
+        self.pool.start()
+        self.loop.run(self._start()).result()
+        return self
+
+    async def _start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def close(self):
+        if self._server is not None:
+            self.loop.run(self._stop()).result()
+            self._server = None
+        self.pool.close()
+
+    async def _stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    # --- Analysis ---
+    def _limit(self, request):
+        def number(name, kind):
+            value = request.get(name)
+            if value is None:
+                return None
+            try:
+                value = kind(value)
+            except (TypeError, ValueError):
+                raise RequestError(400, f"{name} must be a number")
+            if value <= 0:
+                raise RequestError(400, f"{name} must be positive")
+            return value
+        seconds, depth, nodes = number("time", float), number("depth", int), number("nodes", int)
+        if seconds is None and depth is None and nodes is None:
+            seconds = DEFAULT_TIME
+        # Every search is capped in time, whatever limit was asked for
+        seconds = min(seconds, self.max_time) if seconds is not None else self.max_time
+        return chess.engine.Limit(time=seconds, depth=depth, nodes=nodes)
+
+    def _parse(self, request):
+        if not isinstance(request, dict) or not isinstance(request.get("fen"), str):
+            raise RequestError(400, "expected a JSON object with a \"fen\" string")
+        try:
+            board = chess.Board(request["fen"])
+        except ValueError as e:
+            raise RequestError(400, f"invalid FEN: {e}")
+        problem = position_problem(board, request.get("side"))
+        if problem is not None:
+            raise RequestError(400, problem.text)
+        multipv = request.get("multipv", 2)
+        if not isinstance(multipv, int) or not 1 <= multipv <= MAX_MULTIPV:
+            raise RequestError(400, f"multipv must be an integer from 1 to {MAX_MULTIPV}")
+        return board, self._limit(request), multipv
+
+    def _search(self, board, limit, multipv):
+        # Join the search for the same position and limit if one is running, else queue a new one
+        key = (board.epd(), limit.time, limit.depth, limit.nodes, multipv)
+        search = self._searches.get(key)
+        if search is not None:
+            self.counts["deduplicated"] += 1
+            return search
+        waiting = self.queue_depth
+        if waiting >= self.max_queue:
+            self.counts["rejected"] += 1
+            raise RequestError(503, f"analysis queue full ({waiting} waiting)")
+        search = _Search(key)
+        queued = time.monotonic()
+        def on_start():
+            search.started = time.monotonic()
+            self.queue_wait.append(search.started - queued)
+        search.task = asyncio.ensure_future(self.pool.analyse_async(board.fen(), limit, multipv,
+                                                                    on_info=search.publish, on_start=on_start))
+        search.task.add_done_callback(lambda _: self._searches.pop(key, None))
+        self._searches[key] = search
+        self.counts["searches"] += 1
+        return search
+
+    @property
+    def queue_depth(self):
+        # Searches not yet picked up by an engine
+        return sum(1 for search in self._searches.values() if search.started is None)
+
+    def metrics(self):
+        return {
+            "uptime": time.time() - self.started,
+            "engines": self.pool.size,
+            "queue_depth": self.queue_depth,
+            "in_flight": len(self._searches),
+            "max_queue": self.max_queue,
+            "max_time": self.max_time,
+            "requests": self.counts["requests"],
+            "searches": self.counts["searches"],
+            "deduplicated": self.counts["deduplicated"],
+            "rejected": self.counts["rejected"],
+            "errors": self.counts["errors"],
+            "latency": _percentiles(self.latency),
+            "queue_wait": _percentiles(self.queue_wait),
+        }
+
+    # --- HTTP ---
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise RequestError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError(400, "bad Content-Length")
+        if length > MAX_BODY:
+            raise RequestError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), urlsplit(target).path, body
+
+    @staticmethod
+    def _send(writer, status, payload, content_type="application/json"):
+        body = (json.dumps(payload) + "\n").encode()
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+
+    @staticmethod
+    def _send_chunk(writer, payload):
+        data = (json.dumps(payload) + "\n").encode()
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    async def _handle(self, reader, writer):
+        received = time.monotonic()
+        try:
+            try:
+                request = await self._read_request(reader)
+                if request is None:
+                    return
+                method, path, body = request
+                if path == "/health":
+                    self._send(writer, 200, {"status": "ok"})
+                elif path == "/metrics":
+                    self._send(writer, 200, self.metrics())
+                elif path == "/analyse":
+                    if method != "POST":
+                        raise RequestError(405, "use POST")
+                    await self._analyse(writer, body, received)
+                else:
+                    raise RequestError(404, f"no such endpoint: {path}")
+            except RequestError as e:
+                self._send(writer, e.status, {"status": "error", "error": str(e)})
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except Exception as e:
+                self.counts["errors"] += 1
+                self._send(writer, 500, {"status": "error", "error": str(e)})
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _analyse(self, writer, body, received):
+        self.counts["requests"] += 1
+        try:
+            request = json.loads(body or b"null")
+        except ValueError as e:
+            raise RequestError(400, f"invalid JSON: {e}")
+        board, limit, multipv = self._parse(request)
+        search = self._search(board, limit, multipv)
+        if not request.get("stream"):
+            result = await asyncio.shield(search.task)
+            self._send_result(writer, result, received)
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        infos = asyncio.Queue()
+        search.listeners.append(infos)
+        try:
+            while not search.task.done():
+                getter = asyncio.ensure_future(infos.get())
+                await asyncio.wait((getter, search.task), return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    break
+                self._send_chunk(writer, _info_dict(getter.result()))
+                await writer.drain()
+            while not infos.empty():
+                self._send_chunk(writer, _info_dict(infos.get_nowait()))
+            result = search.task.result()
+            payload = self._result_payload(result, received)
+            self._send_chunk(writer, {"type": "result", **payload})
+            writer.write(b"0\r\n\r\n")
+        finally:
+            search.listeners.remove(infos)
+
+    def _result_payload(self, result, received):
+        self.latency.append(time.monotonic() - received)
+        if result.outcome is None:
+            self.counts["errors"] += 1
+        return result.to_dict()
+
+    def _send_result(self, writer, result, received):
+        payload = self._result_payload(result, received)
+        self._send(writer, 200 if result.outcome is not None else 500, payload)
+
+
+def serve(engine_path, host="127.0.0.1", port=DEFAULT_PORT, **kwargs):
+    """Run the server until interrupted (Ctrl+C)."""
+    server = AnalysisServer(engine_path, host, port, **kwargs).start()
+    print(f"Serving analysis on http://{server.host}:{server.port} with {server.pool.size} engines "
+          f"(max {server.max_time:g}s per search)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,39 @@
+"""Persistent app settings stored as JSON next to the script.
+
+The NEXTCHESSMOVE_SETTINGS environment variable points to another file, e.g.
+a per-user location on shared installs.
+"""
+import json
+import os
+
+SETTINGS_PATH = os.environ.get(
+    "NEXTCHESSMOVE_SETTINGS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "nextchessmove_settings.json"),
+)
+
+
+def load_settings(path=SETTINGS_PATH):
+    try:
+        with open(path) as f:
+            settings = json.load(f)
+        return settings if isinstance(settings, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable settings file {path}: {e}")
+        return {}
+
+
+def save_settings(settings, path=SETTINGS_PATH):
+    # Write-then-rename so a crash never leaves a truncated settings file
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(settings, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def update_settings(section, values, path=SETTINGS_PATH):
+    settings = load_settings(path)
+    settings[section] = values
+    save_settings(settings, path)
+    return settings
@@ -0,0 +1,138 @@
+"""Deterministic stand-in for Stockfish that speaks just enough UCI.
+
+Every search emits one `info` line per depth and multipv line at a fixed pace
+(--delay-ms per depth) up to --max-depth, then `bestmove`. Moves, scores and
+node counts are derived from the position only, so runs are repeatable and
+need no real engine binary.
+
+    python benchmarks/fake_uci_engine.py --max-depth 12 --delay-ms 2
+"""
+import argparse
+import sys
+import threading
+import time
+
+import chess
+
+NPS = 1000000
+
+
+class FakeEngine:
+    def __init__(self, max_depth, delay):
+        self.max_depth = max_depth
+        self.delay = delay
+        self.board = chess.Board()
+        self.multipv = 1
+        self.options = {}
+        self._out_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._search = None
+
+    def send(self, line):
+        with self._out_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def uci(self):
+        self.send("id name FakeUCI")
+        self.send("id author nextchessmove benchmarks")
+        self.send("option name MultiPV type spin default 1 min 1 max 500")
+        self.send("option name Threads type spin default 1 min 1 max 1024")
+        self.send("option name Hash type spin default 16 min 1 max 33554432")
+        self.send("option name SyzygyPath type string default <empty>")
+        self.send("uciok")
+
+    def position(self, args):
+        if args[0] == "startpos":
+            board, rest = chess.Board(), args[1:]
+        else:
+            fen_end = args.index("moves") if "moves" in args else len(args)
+            board, rest = chess.Board(" ".join(args[1:fen_end])), args[fen_end:]
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                board.push_uci(uci)
+        self.board = board
+
+    def go(self, args):
+        self.wait()
+        limits = {}
+        for name in ("movetime", "depth", "nodes", "wtime", "btime"):
+            if name in args:
+                limits[name] = int(args[args.index(name) + 1])
+        self._stop.clear()
+        self._search = threading.Thread(target=self._run, args=(self.board.copy(), limits, "infinite" in args))
+        self._search.start()
+
+    def _run(self, board, limits, infinite):
+        start = time.monotonic()
+        # Deterministic move order: legal moves sorted by UCI string
+        moves = sorted(board.legal_moves, key=lambda m: m.uci())
+        if not moves:
+            self.send("info depth 0 score mate 0" if board.is_check() else "info depth 0 score cp 0")
+            self.send("bestmove (none)")
+            return
+        max_depth = min(self.max_depth, limits.get("depth", self.max_depth))
+        deadline = start + limits["movetime"] / 1000 if "movetime" in limits else None
+        base = (chess.popcount(board.occupied_co[board.turn]) - chess.popcount(board.occupied_co[not board.turn])) * 100
+        depth = 0
+        while not self._stop.is_set():
+            if depth >= max_depth and not infinite:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            depth += 1
+            elapsed = time.monotonic() - start
+            nodes = depth * 10000
+            for i, move in enumerate(moves[:self.multipv], 1):
+                self.send(f"info depth {depth} seldepth {depth + 4} multipv {i} score cp {base + 17 - 9 * i} "
+                          f"nodes {nodes} nps {NPS} hashfull {min(1000, depth * 20)} tbhits 0 "
+                          f"time {int(elapsed * 1000)} pv {move.uci()}")
+            self._stop.wait(self.delay)
+        self.send(f"bestmove {moves[0].uci()}")
+
+    def wait(self):
+        if self._search is not None:
+            self._search.join()
+            self._search = None
+
+    def loop(self):
+        for line in sys.stdin:
+            parts = line.split()
+            if not parts:
+                continue
+            command, args = parts[0], parts[1:]
+            if command == "uci":
+                self.uci()
+            elif command == "isready":
+                self.send("readyok")
+            elif command == "setoption" and "name" in args and "value" in args:
+                name = " ".join(args[args.index("name") + 1:args.index("value")])
+                value = " ".join(args[args.index("value") + 1:])
+                self.options[name] = value
+                if name == "MultiPV":
+                    self.multipv = max(1, int(value))
+            elif command == "ucinewgame":
+                self.wait()
+            elif command == "position":
+                self.position(args)
+            elif command == "go":
+                self.go(args)
+            elif command == "stop":
+                self._stop.set()
+                self.wait()
+            elif command == "quit":
+                self._stop.set()
+                self.wait()
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-depth", type=int, default=12)
+    parser.add_argument("--delay-ms", type=float, default=2.0, help="time per depth iteration")
+    args = parser.parse_args()
+    FakeEngine(args.max_depth, args.delay_ms / 1000).loop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Benchmarks for the app's hot paths, reported as latency percentiles.
+
+Headless benchmarks (always run):
+  legality        position_problem() on a mix of legal and illegal positions
+  scheduler_e2e   AnalysisScheduler submit -> on_done with the fake engine
+  fallback_search built-in engine, fixed depth 4 search (also reports nodes/s)
+
+GUI benchmarks (need a display; run under `xvfb-run` on servers):
+  draw_board      board redraw after a move
+  drag_frame      one <B1-Motion> step while dragging a piece
+  points_label    update_points_label()
+  legality_gui    calculate_and_show_best_move() on a position it refuses
+  edit_to_best    board edit -> best move displayed (fake engine)
+
+All engine work goes to benchmarks/fake_uci_engine.py, so no Stockfish is
+needed and results are comparable between runs:
+
+    python benchmarks/run_benchmarks.py --json before.json
+    python benchmarks/run_benchmarks.py --compare before.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chess
+
+FAKE_ENGINE = os.path.join(ROOT, "benchmarks", "fake_uci_engine.py")
+
+POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+]
+ILLEGAL = [
+    "8/8/8/8/8/8/8/8 w - - 0 1",  # no kings
+    "4k3/8/8/8/8/8/8/4K2r b - - 0 1",  # side not to move is in check
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN1 w Qkq - 0 1",
+]
+
+
+def fake_engine_command(max_depth=12, delay_ms=2):
+    return [sys.executable, FAKE_ENGINE, "--max-depth", str(max_depth), "--delay-ms", str(delay_ms)]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "n": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p90_ms": pick(0.90) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def timed(fn, iterations, setup=None):
+    samples = []
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# --- Headless ---
+
+def bench_legality(iterations):
+    from analysis_core import position_problem
+    boards = [chess.Board(fen) for fen in POSITIONS + ILLEGAL]
+    return timed(lambda i: position_problem(boards[i % len(boards)], 'w'), iterations)
+
+
+def bench_scheduler_e2e(iterations):
+    import threading
+    from analysis_scheduler import AnalysisScheduler
+    scheduler = AnalysisScheduler(fake_engine_command())
+    if scheduler.ensure_engine() is None:
+        raise RuntimeError("fake engine did not start")
+    boards = [chess.Board(fen) for fen in POSITIONS]
+    done = threading.Event()
+    try:
+        def run(i):
+            done.clear()
+            scheduler.submit(boards[i % len(boards)], 5, on_done=lambda request, outcome: done.set())
+            if not done.wait(10):
+                raise RuntimeError("analysis timed out")
+        return timed(run, iterations)
+    finally:
+        scheduler.close()
+
+
+def bench_fallback_search(iterations):
+    from fallback_engine import FallbackEngine
+    import chess.engine
+    boards = [chess.Board(fen) for fen in POSITIONS]
+    nodes = []
+    def run(i):
+        engine = FallbackEngine()  # Fresh transposition table: every sample searches for real
+        info = engine.analyse(boards[i % len(boards)], chess.engine.Limit(depth=4))
+        nodes.append(info["nodes"])
+    samples = timed(run, iterations)
+    stats = percentiles(samples)
+    stats["nps"] = sum(nodes) / sum(samples)
+    return stats
+
+
+# --- GUI ---
+
+def make_gui():
+    import tkinter as tk
+    import nextchessmove
+    root = tk.Tk()
+    nextchessmove.STOCKFISH_PATH = fake_engine_command()
+    nextchessmove.ANALYSIS_DB_PATH = ":memory:"  # Never touch the user's (possibly shared) database
+    gui = nextchessmove.ChessGUI(root)
+    # No database at all: edit_to_best must time searches, not lookups of earlier runs
+    if gui.analysis_db is not None:
+        gui.analysis_db.close()
+        gui.analysis_db = None
+    root.update()
+    return root, gui
+
+
+def bench_draw_board(gui, iterations):
+    boards = [chess.Board(fen) for fen in POSITIONS]
+    def setup(i):
+        gui.model.board = boards[i % len(boards)].copy()
+    return timed(lambda i: gui.draw_board(), iterations, setup)
+
+
+def bench_drag_frame(gui, iterations):
+    gui.model.board = chess.Board(POSITIONS[2])
+    gui.draw_board()
+    gui.on_piece_press(types.SimpleNamespace(x=4*60+30, y=7*60+30))
+    samples = timed(lambda i: gui.on_piece_drag(types.SimpleNamespace(x=100 + i % 300, y=100 + (i * 7) % 300)), iterations)
+    gui.renderer.end_drag()
+    gui.drag_data = None
+    return samples
+
+
+def bench_points_label(gui, iterations):
+    return timed(lambda i: gui.update_points_label(), iterations)
+
+
+def bench_legality_gui(gui, iterations):
+    boards = [chess.Board(fen) for fen in ILLEGAL]
+    def setup(i):
+        gui.model.board = boards[i % len(boards)].copy()
+    return timed(lambda i: gui.calculate_and_show_best_move(), iterations, setup)
+
+
+def bench_edit_to_best(root, gui, iterations):
+    shown = []
+    original = gui.show_best_moves
+    def show_best_moves(*args, **kwargs):
+        original(*args, **kwargs)
+        if not kwargs.get('live'):
+            shown.append(time.perf_counter())
+    gui.show_best_moves = show_best_moves
+    gui.live_analysis.set(False)
+    boards = [chess.Board(fen) for fen in POSITIONS[1:]]
+    samples = []
+    try:
+        for i in range(iterations):
+            gui.analysis_cache.clear()
+            gui.model.board = boards[i % len(boards)].copy()
+            count = len(shown)
+            start = time.perf_counter()
+            gui.model.changed()
+            deadline = start + 10
+            while len(shown) == count and time.perf_counter() < deadline:
+                root.update()
+                time.sleep(0.0005)
+            if len(shown) == count:
+                raise RuntimeError("best move was never displayed")
+            samples.append(shown[-1] - start)
+    finally:
+        gui.show_best_moves = original
+    return samples
+
+
+def run(args):
+    results = {}
+    def record(name, fn):
+        try:
+            results[name] = percentiles(fn())
+        except Exception as e:
+            results[name] = {"skipped": str(e)}
+    record("legality", lambda: bench_legality(args.iterations * 10))
+    record("scheduler_e2e", lambda: bench_scheduler_e2e(max(5, args.iterations // 10)))
+    try:
+        results["fallback_search"] = bench_fallback_search(max(5, args.iterations // 20))
+    except Exception as e:
+        results["fallback_search"] = {"skipped": str(e)}
+    try:
+        root, gui = make_gui()
+    except Exception as e:
+        for name in ("draw_board", "drag_frame", "points_label", "legality_gui", "edit_to_best"):
+            results[name] = {"skipped": f"GUI unavailable ({e.__class__.__name__}: {e}); try xvfb-run"}
+        return results
+    try:
+        record("draw_board", lambda: bench_draw_board(gui, args.iterations))
+        record("drag_frame", lambda: bench_drag_frame(gui, args.iterations))
+        record("points_label", lambda: bench_points_label(gui, args.iterations))
+        record("legality_gui", lambda: bench_legality_gui(gui, args.iterations))
+        record("edit_to_best", lambda: bench_edit_to_best(root, gui, max(5, args.iterations // 10)))
+    finally:
+        gui.on_closing()
+    return results
+
+
+def report(results, baseline=None):
+    columns = ("n", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+    print(f"{'benchmark':<15}" + "".join(f"{c:>10}" for c in columns) + ("   p50 vs baseline" if baseline else ""))
+    for name, stats in results.items():
+        if "skipped" in stats:
+            print(f"{name:<15}  skipped: {stats['skipped']}")
+            continue
+        row = f"{name:<15}{stats['n']:>10}" + "".join(f"{stats[c]:>10.3f}" for c in columns[1:])
+        old = (baseline or {}).get(name, {})
+        if "p50_ms" in old and old["p50_ms"]:
+            row += f"   {(stats['p50_ms'] / old['p50_ms'] - 1) * 100:+.1f}%"
+        if "nps" in stats:
+            row += f"   {stats['nps']:,.0f} nodes/s"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path benchmarks with a scripted fake UCI engine.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --json run")
+    args = parser.parse_args()
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""The position being edited, with batched change notifications.
+
+Code that modifies the board calls changed() afterwards (or replaces it with
+set_board). Listeners are not called right away: the first change schedules
+one flush through the given scheduler (Tk's after_idle in the GUI), so a burst
+of edits inside one event handler results in a single redraw, FEN update and
+analysis request.
+"""
+import chess
+
+
+class BoardModel:
+    def __init__(self, schedule, board=None):
+        self.board = board if board is not None else chess.Board()
+        self._schedule = schedule  # callable(fn): run fn once the current event is handled
+        self._listeners = []
+        self._pending = None  # None, or whether the pending change needs a new analysis
+
+    def subscribe(self, listener):
+        """listener(board, analyse) is called once per batch of changes."""
+        self._listeners.append(listener)
+
+    def set_board(self, board, analyse=True):
+        self.board = board
+        self.changed(analyse)
+
+    def changed(self, analyse=True):
+        # analyse=False for edits that do not need a new search (the result is already known)
+        if self._pending is None:
+            self._pending = analyse
+            self._schedule(self.flush)
+        else:
+            self._pending = self._pending or analyse
+
+    def flush(self):
+        if self._pending is None:
+            return
+        analyse, self._pending = self._pending, None
+        for listener in list(self._listeners):
+            listener(self.board, analyse)
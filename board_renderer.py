@@ -0,0 +1,196 @@
+"""Retained-mode renderer for the main board canvas.
+
+Canvas items for the 64 squares, the pieces, the coordinate labels and the
+arrows are created once and then updated in place: a redraw only touches the
+squares whose piece changed, and dragging a piece just moves one sprite.
+"""
+import tkinter as tk
+
+import chess
+
+
+class BoardRenderer:
+    def __init__(self, canvas, images, square_size=60):
+        self.canvas = canvas
+        self.images = images  # piece symbol -> PhotoImage (PIECE_IMAGES)
+        self.square_size = square_size
+        self.flip = False
+        self.colors = None
+        self.square_items = {}  # square -> rectangle id
+        self.piece_items = {}  # square -> image id
+        self.shown = {}  # square -> piece symbol currently displayed
+        self.hidden_square = None  # square whose piece is being dragged
+        self.label_items = []
+        self.arrow_items = []
+        self._arrow_spec = None
+        self.drag_item = None
+
+    # --- Geometry ---
+    def display_cell(self, square):
+        col, row = chess.square_file(square), 7 - chess.square_rank(square)
+        if self.flip:
+            col, row = 7 - col, 7 - row
+        return col, row
+
+    def square_center(self, col, row):
+        size = self.square_size
+        return col*size+size//2, row*size+size//2
+
+    # --- Full layout (first draw, flip, theme change) ---
+    def _layout(self, flip, colors):
+        size = self.square_size
+        self.flip = flip
+        self.colors = colors
+        for square in chess.SQUARES:
+            col, row = self.display_cell(square)
+            x1, y1 = col*size, row*size
+            color = colors[(chess.square_file(square) + 7 - chess.square_rank(square)) % 2]
+            item = self.square_items.get(square)
+            if item is None:
+                self.square_items[square] = self.canvas.create_rectangle(x1, y1, x1+size, y1+size, fill=color, tags="square")
+            else:
+                self.canvas.coords(item, x1, y1, x1+size, y1+size)
+                self.canvas.itemconfig(item, fill=color)
+            if square in self.piece_items:
+                self.canvas.coords(self.piece_items[square], x1+size//2, y1+size//2)
+        # Rank (1-8) and file (a-h) labels
+        for item in self.label_items:
+            self.canvas.delete(item)
+        files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+        if flip:
+            files = files[::-1]
+            ranks = ['1', '2', '3', '4', '5', '6', '7', '8']
+        else:
+            ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
+        self.label_items = []
+        # Files (a-h) below the board
+        for i, file_char in enumerate(files):
+            self.label_items.append(self.canvas.create_text(i*size+size//2, 8*size-8, text=file_char, font=("Arial", 10), fill="#444", tags="coord"))
+        # Ranks (1-8) left of the board
+        for i, rank_char in enumerate(ranks):
+            self.label_items.append(self.canvas.create_text(8, i*size+size//2, text=rank_char, font=("Arial", 10), fill="#444", tags="coord"))
+        self._arrow_spec = None  # Arrow coordinates depend on orientation
+
+    def invalidate(self):
+        # Force a full relayout on the next render
+        self.colors = None
+
+    def resize(self, square_size):
+        # New square size: piece items are recreated with the new sprites on the next render
+        self.square_size = square_size
+        for item in self.piece_items.values():
+            self.canvas.delete(item)
+        self.piece_items.clear()
+        self.shown.clear()
+        if self.drag_item is not None:
+            self.canvas.delete(self.drag_item)
+            self.drag_item = None
+        self.hidden_square = None
+        self.invalidate()
+
+    # --- Incremental update ---
+    def render(self, board, flip, colors, arrows=(), best_move_arrow=None, arrow_drag=None):
+        if flip != self.flip or colors != self.colors:
+            self._layout(flip, tuple(colors))
+        created = False
+        size = self.square_size
+        piece_map = board.piece_map()
+        for square in set(self.shown) | set(piece_map):
+            piece = piece_map.get(square)
+            symbol = piece.symbol() if piece else None
+            if self.shown.get(square) == symbol:
+                continue
+            item = self.piece_items.get(square)
+            if symbol is None:
+                self.canvas.delete(item)
+                del self.piece_items[square]
+                del self.shown[square]
+                continue
+            if item is None:
+                col, row = self.display_cell(square)
+                self.piece_items[square] = self.canvas.create_image(col*size+size//2, row*size+size//2, image=self.images[symbol], tags="piece")
+                created = True
+            else:
+                self.canvas.itemconfig(item, image=self.images[symbol])
+            self.shown[square] = symbol
+        if self.hidden_square is not None and self.hidden_square in self.piece_items:
+            self.canvas.itemconfig(self.piece_items[self.hidden_square], state="hidden")
+        self.render_arrows(arrows, best_move_arrow, arrow_drag)
+        if created:
+            self._restack()
+
+    def _restack(self):
+        # Squares < pieces < dragged piece < arrows < coordinate labels
+        for tag in ("piece", "dragged_piece", "arrow", "coord"):
+            self.canvas.tag_raise(tag)
+
+    # --- Arrows ---
+    def render_arrows(self, arrows=(), best_move_arrow=None, arrow_drag=None):
+        spec = (tuple(arrows), best_move_arrow,
+                (arrow_drag['from'], arrow_drag['to']) if arrow_drag is not None else None)
+        if spec == self._arrow_spec:
+            return
+        self._arrow_spec = spec
+        for item in self.arrow_items:
+            self.canvas.delete(item)
+        self.arrow_items = []
+        # Draw user arrows
+        for from_sq, to_sq in arrows:
+            x1, y1 = self.square_center(*self.display_cell(from_sq))
+            x2, y2 = self.square_center(*self.display_cell(to_sq))
+            self._draw_arrow(x1, y1, x2, y2, color="#2600ff", width=5)
+        # Draw best move thin light arrow if present
+        if best_move_arrow:
+            from_sq, to_sq = best_move_arrow
+            x1, y1 = self.square_center(*self.display_cell(from_sq))
+            x2, y2 = self.square_center(*self.display_cell(to_sq))
+            # Draw a thin, light blue arrow (no dash)
+            self._draw_arrow(x1, y1, x2, y2, color="#99ccff", width=5)
+        # Draw arrow being dragged
+        if arrow_drag is not None:
+            x1, y1 = self.square_center(*arrow_drag['from'])
+            x2, y2 = self.square_center(*arrow_drag['to'])
+            self._draw_arrow(x1, y1, x2, y2, color="#1100ff", width=3, dash=(4,2))
+        self.canvas.tag_raise("coord")
+
+    def _draw_arrow(self, x1, y1, x2, y2, color="#1201ff", width=5, dash=None):
+        size = self.square_size
+        # If the arrow is a knight move, draw an L-shaped arrow
+        dx = abs(x2 - x1)
+        dy = abs(y2 - y1)
+        if (dx == size and dy == 2*size) or (dx == 2*size and dy == size):
+            # Determine the intermediate corner point
+            if dx == size:
+                # Horizontal first, then vertical
+                mid_x, mid_y = x2, y1
+            else:
+                # Vertical first, then horizontal
+                mid_x, mid_y = x1, y2
+            # Draw two segments: start to corner, corner to end
+            self.arrow_items.append(self.canvas.create_line(x1, y1, mid_x, mid_y, fill=color, width=width, capstyle=tk.ROUND, dash=dash, tags="arrow"))
+            self.arrow_items.append(self.canvas.create_line(mid_x, mid_y, x2, y2, fill=color, width=width, arrow=tk.LAST, arrowshape=(16,20,6), capstyle=tk.ROUND, dash=dash, tags="arrow"))
+        else:
+            # Draw main line for non-knight moves
+            self.arrow_items.append(self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width, arrow=tk.LAST, arrowshape=(16,20,6), capstyle=tk.ROUND, dash=dash, tags="arrow"))
+
+    # --- Dragging: only the sprite moves ---
+    def begin_drag(self, square, symbol, x, y):
+        self.hidden_square = square
+        if square in self.piece_items:
+            self.canvas.itemconfig(self.piece_items[square], state="hidden")
+        if self.drag_item is None:
+            self.drag_item = self.canvas.create_image(x, y, image=self.images[symbol], tags="dragged_piece")
+            self._restack()
+        else:
+            self.canvas.itemconfig(self.drag_item, image=self.images[symbol], state="normal")
+            self.canvas.coords(self.drag_item, x, y)
+
+    def move_drag(self, x, y):
+        self.canvas.coords(self.drag_item, x, y)
+
+    def end_drag(self):
+        if self.drag_item is not None:
+            self.canvas.itemconfig(self.drag_item, state="hidden")
+        if self.hidden_square is not None and self.hidden_square in self.piece_items:
+            self.canvas.itemconfig(self.piece_items[self.hidden_square], state="normal")
+        self.hidden_square = None
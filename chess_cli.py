@@ -0,0 +1,250 @@
+"""Command-line interface: engine analysis without the Tk window.
+
+    python nextchessmove.py analyze --fen "<FEN>" --time 2 --multipv 2
+    python nextchessmove.py batch positions.fen --time 1 > results.jsonl
+    python nextchessmove.py annotate games.pgn annotated.pgn --time 0.5
+    python nextchessmove.py epd wac.epd --times 0.1,0.5,1 > report.jsonl
+    python nextchessmove.py db import results.jsonl
+    python nextchessmove.py serve --port 8765
+
+Output is JSON. Only the modules a command needs are imported, so one-off
+queries start quickly and work on machines without a display.
+"""
+import argparse
+import json
+import sys
+
+
+def _limit(args):
+    import chess.engine
+    return chess.engine.Limit(time=args.time, depth=args.depth, nodes=args.nodes)
+
+
+def cmd_analyze(args):
+    import chess
+    from analysis_core import analyse, position_problem
+    from engine_loop import shared_loop
+
+    try:
+        board = chess.Board(args.fen)
+    except ValueError as e:
+        print(json.dumps({"fen": args.fen, "status": "error", "error": f"invalid FEN: {e}"}))
+        return 2
+    problem = position_problem(board, args.side)
+    if problem is not None:
+        print(json.dumps({"fen": board.fen(), "status": problem.kind, "error": problem.text, "details": problem.details}))
+        return 2
+    try:
+        engine = shared_loop().popen_uci(args.engine)
+        # Same Threads/Hash/SyzygyPath as the app (auto-detected or from the settings dialog)
+        from engine_profiles import EngineProfile
+        options = EngineProfile.load().engine_options(engine)
+        if options:
+            engine.configure(options)
+    except Exception as e:
+        print(json.dumps({"fen": board.fen(), "status": "error", "error": f"Failed to start engine: {e}"}))
+        return 1
+    try:
+        outcome = analyse(engine, board, _limit(args), multipv=args.multipv)
+    finally:
+        engine.quit()
+        engine.close()
+    print(json.dumps(outcome.to_dict(), indent=args.indent))
+    return 0
+
+
+def cmd_batch(args):
+    from engine_pool import EnginePool
+
+    source = sys.stdin if args.file == "-" else open(args.file)
+    try:
+        with EnginePool(args.engine, size=args.engines) as pool:
+            fens = (line for line in source if line.strip())
+            for result in pool.analyse_many(fens, _limit(args), multipv=args.multipv):
+                print(json.dumps(result.to_dict()), flush=True)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+def cmd_annotate(args):
+    from pgn_annotate import annotate_pgn, load_progress
+
+    if not args.restart and load_progress(args.output):
+        print(f"Resuming {args.output}", file=sys.stderr)
+    def report(index, game, counts):
+        white, black = game.headers.get("White", "?"), game.headers.get("Black", "?")
+        flagged = ", ".join(f"{n} {label.lower()}" for label, n in counts.items() if n)
+        print(f"game {index}: {white} - {black}" + (f" ({flagged})" if flagged else ""), file=sys.stderr)
+    done = annotate_pgn(args.input, args.output, _limit(args), engine_path=args.engine,
+                        engines=args.engines, resume=not args.restart, on_game=report)
+    print(f"{done} games annotated -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_epd(args):
+    from epd_suite import SuiteConfig, run_suite
+
+    if args.file == "-":
+        lines = sys.stdin.readlines()  # Read once, every configuration runs the whole suite
+    else:
+        lines = None
+    def on_error(line_number, line, message):
+        print(f"line {line_number}: {message}", file=sys.stderr)
+    def on_position(position, result, solved, seconds):
+        record = {"id": position.id, "fen": position.board.fen(),
+                  "status": "error" if result.outcome is None else ("solved" if solved else "failed"),
+                  "move": result.best_move.uci() if result.best_move else None, "time_to_solution": seconds}
+        if result.outcome is None:
+            record["error"] = result.error
+        print(json.dumps(record), flush=True)
+    for think_time in args.times:
+        for threads in args.threads:
+            config = SuiteConfig(think_time, threads, args.hash, args.engines)
+            print(f"{config.label} ...", file=sys.stderr)
+            source = lines if lines is not None else open(args.file)
+            try:
+                stats = run_suite(source, config, args.engine, on_position=on_position if args.positions else None,
+                                  on_error=on_error if think_time == args.times[0] and threads == args.threads[0] else None)
+            finally:
+                if lines is None:
+                    source.close()
+            print(json.dumps(stats.summary()), flush=True)
+    return 0
+
+
+def cmd_db(args):
+    from analysis_db import AnalysisDB, ANALYSIS_DB_PATH
+
+    # Defaults are resolved here, not in build_parser(), so other commands never import sqlite3
+    args.db = args.db or ANALYSIS_DB_PATH
+    db = AnalysisDB(args.db)
+    try:
+        if args.action == "import":
+            skipped = []
+            def on_error(line_number, line, message):
+                skipped.append(line_number)
+                print(f"line {line_number}: {message}", file=sys.stderr)
+            source = sys.stdin if args.file == "-" else open(args.file)
+            try:
+                count = db.import_lines(source, engine=args.engine_name, on_error=on_error)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+            print(f"{count} positions imported into {args.db} ({len(db)} stored), {len(skipped)} lines skipped",
+                  file=sys.stderr)
+        elif args.action == "export":
+            target = sys.stdout if args.file == "-" else open(args.file, "w")
+            try:
+                for line in db.export_lines(args.min_depth):
+                    target.write(line + "\n")
+            finally:
+                if target is not sys.stdout:
+                    target.close()
+        else:
+            print(json.dumps({"path": args.db, "positions": len(db)}))
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_serve(args):
+    from analysis_server import serve, DEFAULT_PORT, MAX_QUEUE, MAX_TIME
+
+    try:
+        serve(args.engine, args.host, DEFAULT_PORT if args.port is None else args.port, engines=args.engines,
+              max_time=args.max_time or MAX_TIME, max_queue=args.max_queue or MAX_QUEUE,
+              options={"Threads": args.threads, "Hash": args.hash})
+    except (OSError, RuntimeError) as e:
+        print(f"Cannot start server: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _number_list(kind):
+    def parse(text):
+        try:
+            values = [kind(v) for v in text.split(",") if v.strip()]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected a comma-separated list, got {text!r}")
+        if not values or any(v <= 0 for v in values):
+            raise argparse.ArgumentTypeError(f"expected positive values, got {text!r}")
+        return values
+    return parse
+
+
+def _add_limit_args(parser):
+    parser.add_argument("--time", type=float, default=None, help="seconds per position (default 2 if no other limit)")
+    parser.add_argument("--depth", type=int, default=None, help="search depth limit")
+    parser.add_argument("--nodes", type=int, default=None, help="node limit")
+    parser.add_argument("--multipv", type=int, default=2, help="number of lines to report (default 2)")
+
+
+def build_parser():
+    from analysis_core import STOCKFISH_PATH
+
+    parser = argparse.ArgumentParser(prog="nextchessmove", description="Offline next-best-move analysis.")
+    parser.add_argument("--engine", default=STOCKFISH_PATH, help="path to a UCI engine (default: STOCKFISH_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="analyse one position and print JSON (scores from White's view)")
+    p.add_argument("--fen", required=True)
+    p.add_argument("--side", choices=["w", "b"], default=None,
+                   help="side the analysis is for; refused if the other side is in check")
+    p.add_argument("--indent", type=int, default=None, help="pretty-print the JSON")
+    _add_limit_args(p)
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("batch", help="analyse one FEN per line on all cores, printing JSON lines in input order")
+    p.add_argument("file", help="FEN file, or - for stdin")
+    p.add_argument("--engines", type=int, default=None, help="engine processes (default: one per core)")
+    _add_limit_args(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("annotate", help="add [%%eval] comments and mistake marks to every game of a PGN file")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--engines", type=int, default=None, help="engine processes (default: one per core)")
+    p.add_argument("--restart", action="store_true", help="ignore saved progress and start from the first game")
+    _add_limit_args(p)
+    p.set_defaults(func=cmd_annotate)
+
+    p = sub.add_parser("epd", help="run an EPD test suite (bm/am) and print solve rate and timings per configuration")
+    p.add_argument("file", help="EPD file, or - for stdin")
+    p.add_argument("--times", type=_number_list(float), default=[1.0], help="think times to compare, e.g. 0.1,0.5,1 (default 1)")
+    p.add_argument("--threads", type=_number_list(int), default=[1], help="Threads per engine to compare, e.g. 1,2 (default 1)")
+    p.add_argument("--hash", type=int, default=64, help="Hash (MB) per engine (default 64)")
+    p.add_argument("--engines", type=int, default=None, help="engine processes (default: cores / threads)")
+    p.add_argument("--positions", action="store_true", help="also print one JSON line per position")
+    p.set_defaults(func=cmd_epd)
+
+    p = sub.add_parser("db", help="import, export or count positions in the persistent analysis database")
+    p.add_argument("action", choices=["import", "export", "stats"])
+    p.add_argument("file", nargs="?", default="-", help="JSON lines to import (batch output) or export to; - for stdin/stdout")
+    p.add_argument("--db", default=None, help="database file (default: NEXTCHESSMOVE_ANALYSIS_DB, or analysis.sqlite3 next to the script)")
+    p.add_argument("--min-depth", type=int, default=0, help="export only positions searched at least this deep")
+    p.add_argument("--engine-name", default=None, help="engine recorded for imported lines that name none")
+    p.set_defaults(func=cmd_db)
+
+    p = sub.add_parser("serve", help="serve analysis over HTTP/JSON from a pool of warm engines")
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    p.add_argument("--port", type=int, default=None, help="port (default 8765, 0 picks a free one)")
+    p.add_argument("--engines", type=int, default=None, help="engine processes (default: one per core)")
+    p.add_argument("--threads", type=int, default=1, help="Threads per engine (default 1)")
+    p.add_argument("--hash", type=int, default=64, help="Hash (MB) per engine (default 64)")
+    p.add_argument("--max-time", type=float, default=None, help="cap on every search in seconds (default 10)")
+    p.add_argument("--max-queue", type=int, default=None, help="searches waiting before requests get 503 (default 64)")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "time", None) is None and getattr(args, "depth", None) is None and getattr(args, "nodes", None) is None:
+        args.time = 2
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
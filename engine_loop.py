@@ -0,0 +1,127 @@
+"""One asyncio event loop for all engine I/O.
+
+chess.engine.SimpleEngine.popen_uci starts a private event loop thread for
+every engine process. Here engines are opened with python-chess's asyncio API
+(chess.engine.popen_uci) on a single shared loop thread instead, so any
+number of engines and searches run concurrently without adding threads.
+Blocking code can still use EngineLoop.popen_uci(), which returns a
+SimpleEngine bound to the shared loop (never call it from the loop thread).
+
+UiQueue carries results from the loop back to the Tk thread.
+"""
+import asyncio
+import concurrent.futures
+import queue
+import sys
+import threading
+
+import chess.engine
+
+DEFAULT_TIMEOUT = 10.0
+
+
+class EngineLoop:
+    def __init__(self, name="engine-loop"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Blocking helpers (code written against the SimpleEngine facade) run on this one thread
+        self._blocking = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-blocking")
+
+    def _main(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._main, name=self.name, daemon=True)
+                self._thread.start()
+
+    def run(self, coro):
+        """Schedule coro on the loop from any other thread; returns a concurrent.futures.Future."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, fn, *args):
+        self.start()
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def run_blocking(self, fn, *args):
+        # For blocking engine calls (SimpleEngine facade) that must not run on the loop or the UI thread
+        return self._blocking.submit(fn, *args)
+
+    async def open_uci(self, command, options=None, timeout=DEFAULT_TIMEOUT):
+        """Coroutine: start and initialise a UCI engine; returns (transport, protocol)."""
+        transport, protocol = await asyncio.wait_for(chess.engine.popen_uci(command), timeout)
+        if options:
+            options = {name: value for name, value in options.items()
+                       if value is not None and name in protocol.options}
+            if options:
+                await protocol.configure(options)
+        return transport, protocol
+
+    def popen_uci(self, command, timeout=DEFAULT_TIMEOUT):
+        """Blocking: start a UCI engine on this loop and return a SimpleEngine bound to it."""
+        async def open_engine():
+            transport, protocol = await self.open_uci(command, timeout=timeout)
+            return chess.engine.SimpleEngine(transport, protocol, timeout=timeout)
+        return self.run(open_engine()).result()
+
+    def close(self):
+        self._blocking.shutdown(wait=False)
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_loop():
+    """The process-wide EngineLoop used by the scheduler, the pool and the CLI."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EngineLoop()
+        return _shared
+
+
+class UiQueue:
+    """Thread-safe queue of callbacks to run on the Tk thread.
+
+    post() may be called from any thread. Only the first post after a drain
+    wakes Tk (one root.after call); that single Tk callback then runs
+    everything queued so far, so a burst of engine updates costs one wake-up.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def post(self, fn, *args):
+        self._queue.put((fn, args))
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.root.after(0, self.drain)
+        except RuntimeError:
+            pass  # Tk is shutting down
+
+    def drain(self):
+        with self._lock:
+            self._scheduled = False
+        while True:
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
@@ -0,0 +1,276 @@
+"""Pool of Stockfish processes for analysing many positions at once.
+
+Each engine process is driven by a worker coroutine on the shared engine loop
+(engine_loop), so the pool adds no threads however many engines it runs.
+Positions are fed lazily from the caller's thread with a bound on how many are
+in flight (so a huge FEN list is never materialised in memory) and results
+are yielded back in input order. Code running on the engine loop itself
+(e.g. the HTTP server) awaits single positions with analyse_async().
+
+    with EnginePool(STOCKFISH_PATH) as pool:
+        for result in pool.analyse_many(fens, chess.engine.Limit(time=1)):
+            print(result.fen, result.best_move)
+"""
+import asyncio
+import os
+import threading
+import time
+
+import chess
+import chess.engine
+
+from analysis_core import line_fen, outcome_from_list, position_problem
+from engine_loop import shared_loop
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_pool_size(threads_per_engine=1):
+    return max(1, available_cores() // max(1, threads_per_engine))
+
+
+class PoolResult:
+    __slots__ = ("index", "fen", "outcome", "error", "trace", "engine", "think_time")
+
+    def __init__(self, index, fen, outcome=None, error=None, trace=None, engine=None, think_time=None):
+        self.index = index
+        self.fen = fen
+        self.outcome = outcome  # analysis_core.AnalysisOutcome, None on error
+        self.error = error
+        self.trace = trace  # [(seconds, move)] each time the best move changed, if requested
+        self.engine = engine  # Name the engine reported (id name)
+        self.think_time = think_time  # The limit's time, if it had one
+
+    @property
+    def best_move(self):
+        return self.outcome.best_move if self.outcome else None
+
+    @property
+    def second_move(self):
+        return self.outcome.second_move if self.outcome else None
+
+    @property
+    def score(self):
+        return self.outcome.score if self.outcome else None
+
+    @property
+    def depth(self):
+        return self.outcome.depth if self.outcome else None
+
+    def to_dict(self):
+        if self.outcome is None:
+            return {"fen": self.fen, "status": "error", "error": self.error}
+        # engine and think_time let `db import` store the result like one from the app
+        return {**self.outcome.to_dict(), "engine": self.engine, "think_time": self.think_time}
+
+
+class _Job:
+    # One analyse_many() call: reorder buffer filled by the worker coroutines
+    def __init__(self):
+        self.results = {}
+        self.cond = threading.Condition()
+        self.cancelled = False
+
+    def begin(self, index):
+        pass
+
+    def put(self, result):
+        with self.cond:
+            self.results[result.index] = result
+            self.cond.notify_all()
+
+    def cancel(self):
+        with self.cond:
+            self.cancelled = True
+            self.cond.notify_all()
+
+
+class _AsyncJob:
+    # One analyse_async() call; only touched on the loop
+    __slots__ = ("future", "on_start")
+
+    def __init__(self, future, on_start=None):
+        self.future = future
+        self.on_start = on_start
+
+    @property
+    def cancelled(self):
+        return self.future.cancelled()
+
+    def begin(self, index):
+        if self.on_start is not None:
+            self.on_start()
+
+    def put(self, result):
+        if not self.future.done():
+            self.future.set_result(result)
+
+
+class EnginePool:
+    def __init__(self, engine_path, size=None, threads_per_engine=1, hash_mb=64, max_pending=None, options=None, loop=None):
+        self.engine_path = engine_path
+        self.size = size or default_pool_size(threads_per_engine)
+        # Per-engine UCI options; Threads/Hash keep N engines from oversubscribing the machine
+        self.options = {"Threads": threads_per_engine, "Hash": hash_mb}
+        self.options.update(options or {})
+        self.max_pending = max_pending or self.size * 4
+        self.loop = loop or shared_loop()
+        self._tasks = None  # asyncio.Queue of positions, created on the loop
+        self._engines = []  # (transport, protocol) per worker
+        self._workers = []  # Worker tasks
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self._workers:
+            return
+        self.loop.run(self._start()).result()
+
+    async def _start(self):
+        # Launch all processes concurrently; Stockfish startup is mostly waiting on I/O
+        opened = await asyncio.gather(*(self.loop.open_uci(self.engine_path, self.options) for _ in range(self.size)),
+                                      return_exceptions=True)
+        errors = [e for e in opened if isinstance(e, BaseException)]
+        self._engines = [e for e in opened if not isinstance(e, BaseException)]
+        if not self._engines:
+            raise RuntimeError(f"Failed to start any engine: {errors[0] if errors else 'unknown error'}")
+        self._tasks = asyncio.Queue()
+        self._workers = [asyncio.ensure_future(self._work(slot)) for slot in range(len(self._engines))]
+
+    async def _work(self, slot):
+        while True:
+            task = await self._tasks.get()
+            if task is None:
+                return
+            job, index, fen, limit, multipv, trace, on_info = task
+            if job.cancelled:
+                job.put(PoolResult(index, fen, error="cancelled"))
+                continue
+            job.begin(index)
+            job.put(await self._analyse(slot, index, fen, limit, multipv, trace, on_info))
+
+    @staticmethod
+    async def _traced_analyse(protocol, board, limit, multipv, trace, on_info=None):
+        # Same result as protocol.analyse(), also recording when the best move changed (trace
+        # is a list or None) and passing every info to on_info
+        start = time.monotonic()
+        analysis = await protocol.analysis(board, limit, multipv=multipv)
+        try:
+            async for info in analysis:
+                if on_info is not None:
+                    on_info(info)
+                pv = info.get('pv')
+                if trace is not None and pv and info.get('multipv', 1) == 1 and (not trace or trace[-1][1] != pv[0]):
+                    trace.append((info.get('time', time.monotonic() - start), pv[0]))
+        finally:
+            analysis.stop()
+        await analysis.wait()
+        return analysis.multipv
+
+    async def _analyse(self, slot, index, fen, limit, multipv, trace=False, on_info=None):
+        try:
+            board = chess.Board(fen)
+        except ValueError as e:
+            return PoolResult(index, fen, error=f"invalid FEN: {e}")
+        problem = position_problem(board)
+        if problem is not None:
+            return PoolResult(index, fen, error=problem.text)
+        for attempt in range(2):
+            moves = [] if trace else None
+            try:
+                protocol = self._engines[slot][1]
+                if trace or on_info is not None:
+                    infos = await self._traced_analyse(protocol, board, limit, multipv, moves, on_info)
+                else:
+                    infos = await protocol.analyse(board, limit, multipv=multipv)
+                break
+            except chess.engine.EngineTerminatedError as e:
+                # Replace a crashed engine once before giving up on this position
+                if attempt:
+                    return PoolResult(index, fen, error=f"engine terminated: {e}")
+                self._engines[slot][0].close()
+                try:
+                    self._engines[slot] = await self.loop.open_uci(self.engine_path, self.options)
+                except Exception as e2:
+                    return PoolResult(index, fen, error=f"engine restart failed: {e2}")
+            except Exception as e:
+                return PoolResult(index, fen, error=str(e))
+        return PoolResult(index, fen, outcome_from_list(board, infos), trace=moves,
+                          engine=protocol.id.get("name"), think_time=limit.time)
+
+    def analyse_many(self, fens, limit, multipv=2, trace=False):
+        """Analyse every FEN (or EPD record) in the iterable and yield PoolResults in input order.
+
+        At most max_pending positions are queued or waiting to be yielded at any
+        time, so the input may be a lazy iterator over a very large file.
+        trace=True fills PoolResult.trace with the best move's history.
+        """
+        job = _Job()
+        fens = iter(fens)
+        count = 0  # Positions handed to the workers
+        exhausted = False
+        index = 0  # Next result to yield
+        try:
+            while True:
+                # Top up the in-flight window from the caller's thread (no feeder thread)
+                while not exhausted and count - index < self.max_pending:
+                    fen = next(fens, None)
+                    if fen is None:
+                        exhausted = True
+                        break
+                    self.loop.call_soon(self._tasks.put_nowait, (job, count, line_fen(fen), limit, multipv, trace, None))
+                    count += 1
+                if index >= count:
+                    return
+                with job.cond:
+                    while index not in job.results:
+                        job.cond.wait()
+                    result = job.results.pop(index)
+                yield result
+                index += 1
+        finally:
+            job.cancel()
+
+    def analyse(self, fen, limit, multipv=2):
+        return next(self.analyse_many([fen], limit, multipv))
+
+    async def analyse_async(self, fen, limit, multipv=2, on_info=None, on_start=None):
+        """Coroutine (on the engine loop): queue one position and return its PoolResult.
+
+        on_info(info) receives every engine info line, on_start() is called
+        when an engine picks the position up. Cancelling the coroutine before
+        that drops the position from the queue.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._tasks.put_nowait((_AsyncJob(future, on_start), 0, fen.strip(), limit, multipv, False, on_info))
+        return await future
+
+    def close(self):
+        if not self._workers:
+            return
+        try:
+            self.loop.run(self._close()).result(timeout=15)
+        except Exception as e:
+            print(f"Failed to shut down engine pool cleanly: {e}")
+        self._workers = []
+        self._engines = []
+
+    async def _close(self):
+        for _ in self._workers:
+            self._tasks.put_nowait(None)
+        await asyncio.wait(self._workers, timeout=5)
+        for transport, protocol in self._engines:
+            try:
+                await asyncio.wait_for(protocol.quit(), 5)
+            except Exception:
+                transport.close()
@@ -0,0 +1,106 @@
+"""Engine profiles: UCI options sized to the machine, with user overrides.
+
+auto_profile() picks Threads from the available cores and Hash from the free
+memory. Values the user changes in the settings dialog are stored as
+overrides in the app settings file and win over the detected ones, so the
+automatic part still adapts when the app moves to another machine.
+"""
+import os
+import sys
+
+from app_settings import load_settings, update_settings
+from engine_pool import available_cores
+
+SECTION = "engine_overrides"
+DEFAULT_MULTIPV = 2  # Best and second best move
+MAX_AUTO_HASH_MB = 8192
+
+
+def free_memory_mb():
+    """Available physical memory in MB, or None if it cannot be determined."""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+        if sys.platform == "win32":
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullAvailPhys // (1024 * 1024)
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def auto_profile():
+    cores = available_cores()
+    # Leave one core for the UI on bigger machines
+    threads = cores - 1 if cores > 2 else cores
+    free = free_memory_mb()
+    hash_mb = 16
+    if free:
+        # Largest power of two up to a quarter of the free memory (Stockfish prefers powers of two)
+        budget = min(free // 4, MAX_AUTO_HASH_MB)
+        while hash_mb * 2 <= budget:
+            hash_mb *= 2
+    return {"Threads": threads, "Hash": hash_mb, "MultiPV": DEFAULT_MULTIPV, "SyzygyPath": ""}
+
+
+class EngineProfile:
+    def __init__(self, overrides=None):
+        self.detected = auto_profile()
+        self.overrides = dict(overrides or {})
+
+    @classmethod
+    def load(cls):
+        return cls(load_settings().get(SECTION))
+
+    def save(self):
+        update_settings(SECTION, self.overrides)
+
+    @property
+    def options(self):
+        options = dict(self.detected)
+        options.update(self.overrides)
+        return options
+
+    @property
+    def multipv(self):
+        # At least 2 so the second best move can always be shown
+        return max(2, int(self.options.get("MultiPV") or DEFAULT_MULTIPV))
+
+    def set_options(self, values):
+        # Only keep values that differ from what auto-detection would pick
+        self.overrides = {name: value for name, value in values.items() if self.detected.get(name) != value}
+
+    def engine_options(self, engine):
+        """UCI options to configure on engine: known to it, clamped to its limits.
+
+        MultiPV is not included; python-chess manages it per analysis call.
+        """
+        options = {}
+        for name, value in self.options.items():
+            if name == "MultiPV" or name not in engine.options:
+                continue
+            option = engine.options[name]
+            if option.type == "spin":
+                value = int(value)
+                if option.min is not None:
+                    value = max(option.min, value)
+                if option.max is not None:
+                    value = min(option.max, value)
+            elif option.type == "string" and not value:
+                continue
+            options[name] = value
+        return options
@@ -0,0 +1,78 @@
+"""Per-search engine telemetry.
+
+SearchTelemetry keeps what Stockfish reports in its info lines (nodes, nps,
+hashfull, seldepth, tbhits, time) plus timings measured on our side: time to
+the first principal variation and time at which the final depth was reached.
+Finished records can be appended to a JSONL file for later sizing of hardware
+and think time.
+"""
+import json
+import os
+import threading
+import time
+
+METRICS_LOG_PATH = os.environ.get(
+    "NEXTCHESSMOVE_METRICS_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.jsonl"),
+)
+
+FIELDS = ("depth", "seldepth", "nodes", "nps", "hashfull", "tbhits", "time")
+
+
+class SearchTelemetry:
+    def __init__(self, fen, think_time, multipv=1, engine_name=None):
+        self.fen = fen
+        self.think_time = think_time
+        self.multipv = multipv
+        self.engine_name = engine_name
+        self.started = time.monotonic()
+        self.values = dict.fromkeys(FIELDS)
+        self.first_pv = None  # Seconds until the first line with a pv
+        self.final_depth_at = None  # Seconds until the deepest depth was first reported
+        self.elapsed = None
+        self.stopped = False  # Ended early by the user rather than by the time limit
+
+    def observe(self, info):
+        now = time.monotonic() - self.started
+        depth = info.get('depth')
+        if depth is not None and (self.values['depth'] is None or depth > self.values['depth']):
+            self.final_depth_at = now
+        for field in FIELDS:
+            value = info.get(field)
+            if value is not None:
+                self.values[field] = value
+        if self.first_pv is None and info.get('pv'):
+            self.first_pv = now
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+
+    def snapshot(self):
+        record = dict(self.values)
+        record.update({
+            "fen": self.fen,
+            "think_time": self.think_time,
+            "multipv": self.multipv,
+            "engine": self.engine_name,
+            "time_to_first_pv": self.first_pv,
+            "time_to_final_depth": self.final_depth_at,
+            "elapsed": self.elapsed if self.elapsed is not None else time.monotonic() - self.started,
+            "stopped": self.stopped,
+        })
+        return record
+
+
+class MetricsLog:
+    """Appends one JSON object per finished search (thread-safe)."""
+
+    def __init__(self, path=METRICS_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, telemetry):
+        record = telemetry.snapshot()
+        record["timestamp"] = time.time()
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
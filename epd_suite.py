@@ -0,0 +1,179 @@
+"""Run EPD test suites (WAC, STS, ...) to measure solve rate against think time.
+
+Each EPD record carries the expected answer as a `bm` (best move) and/or `am`
+(avoid move) operation. Positions are streamed from the file and analysed in
+parallel through an EnginePool; a position counts as solved when the engine's
+best move (the same first PV move the app shows) is one of the `bm` moves and
+none of the `am` moves.
+
+Time-to-solution is the time at which the engine settled on a correct move
+and kept it until the end of the search. From it the report derives the solve
+rate at fractions of the think time, so one run also shows what a shorter
+budget would have solved.
+
+    python nextchessmove.py epd wac.epd --times 0.1,0.5,1 --threads 1,2
+"""
+import collections
+import time
+
+import chess
+import chess.engine
+
+from engine_pool import EnginePool, default_pool_size
+
+TIME_FRACTIONS = (0.1, 0.25, 0.5, 1.0)  # Solve rate reported at these fractions of the think time
+
+
+class EpdPosition:
+    __slots__ = ("index", "id", "board", "best_moves", "avoid_moves")
+
+    def __init__(self, index, id, board, best_moves=(), avoid_moves=()):
+        self.index = index
+        self.id = id
+        self.board = board
+        self.best_moves = list(best_moves)
+        self.avoid_moves = list(avoid_moves)
+
+    def is_solution(self, move):
+        if move is None:
+            return False
+        if self.best_moves and move not in self.best_moves:
+            return False
+        return move not in self.avoid_moves
+
+
+def read_epd(lines, on_error=None):
+    """Yield an EpdPosition for every usable record in lines (any iterable of str).
+
+    Records without a bm/am operation or that do not parse are skipped and
+    reported to on_error(line_number, line, message).
+    """
+    index = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            board, ops = chess.Board.from_epd(line)
+        except ValueError as e:
+            if on_error:
+                on_error(line_number, line, f"invalid EPD: {e}")
+            continue
+        best, avoid = ops.get("bm") or [], ops.get("am") or []
+        if not best and not avoid:
+            if on_error:
+                on_error(line_number, line, "no bm or am operation")
+            continue
+        yield EpdPosition(index, ops.get("id") or str(line_number), board, best, avoid)
+        index += 1
+
+
+def time_to_solution(trace, position):
+    """Seconds until the best move became, and stayed, a solution; None if it never did."""
+    if not trace or not position.is_solution(trace[-1][1]):
+        return None
+    found = trace[-1][0]
+    for seconds, move in reversed(trace):
+        if not position.is_solution(move):
+            break
+        found = seconds
+    return found
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+class SuiteConfig:
+    """One engine configuration to test: think time per position, Threads and Hash per engine."""
+    __slots__ = ("think_time", "threads", "hash_mb", "engines")
+
+    def __init__(self, think_time, threads=1, hash_mb=64, engines=None):
+        self.think_time = think_time
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.engines = engines or default_pool_size(threads)
+
+    @property
+    def label(self):
+        return f"{self.think_time:g}s x{self.threads}T {self.hash_mb}MB ({self.engines} engines)"
+
+
+class SuiteStats:
+    def __init__(self, config):
+        self.config = config
+        self.total = 0
+        self.solved = 0
+        self.errors = 0
+        self.times = []  # Time-to-solution of every solved position
+        self.started = time.monotonic()
+        self.elapsed = None
+
+    def add(self, solved, seconds=None, error=False):
+        self.total += 1
+        if error:
+            self.errors += 1
+        elif solved:
+            self.solved += 1
+            if seconds is not None:
+                self.times.append(seconds)
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+
+    def summary(self):
+        times = sorted(self.times)
+        elapsed = self.elapsed if self.elapsed is not None else time.monotonic() - self.started
+        limit = self.config.think_time
+        return {
+            "config": self.config.label,
+            "think_time": limit,
+            "threads": self.config.threads,
+            "hash_mb": self.config.hash_mb,
+            "engines": self.config.engines,
+            "positions": self.total,
+            "solved": self.solved,
+            "failed": self.total - self.solved - self.errors,
+            "errors": self.errors,
+            "solve_rate": self.solved / self.total if self.total else None,
+            # Solve rate had the search been cut off at a fraction of the think time
+            "solve_rate_by_time": {f"{limit * f:g}": (sum(1 for t in times if t <= limit * f) / self.total if self.total else None)
+                                   for f in TIME_FRACTIONS},
+            "tts_mean": sum(times) / len(times) if times else None,
+            "tts_p50": _percentile(times, 0.5),
+            "tts_p90": _percentile(times, 0.9),
+            "tts_max": times[-1] if times else None,
+            "elapsed": elapsed,
+            "positions_per_second": self.total / elapsed if elapsed > 0 else None,
+        }
+
+
+def run_suite(lines, config, engine_path, on_position=None, on_error=None):
+    """Analyse every EPD record of lines with one configuration; returns SuiteStats.
+
+    on_position(position, result, solved, seconds) is called in file order,
+    result being the engine_pool.PoolResult.
+    """
+    pending = collections.deque()  # Positions handed to the pool, in order; results come back in the same order
+    def fens():
+        for position in read_epd(lines, on_error):
+            pending.append(position)
+            yield position.board.fen()
+    limit = chess.engine.Limit(time=config.think_time)
+    with EnginePool(engine_path, size=config.engines, threads_per_engine=config.threads, hash_mb=config.hash_mb) as pool:
+        stats = SuiteStats(config)  # Throughput excludes engine startup
+        results = pool.analyse_many(fens(), limit, multipv=1, trace=True)
+        for result in results:
+            position = pending.popleft()
+            if result.outcome is None:
+                solved, seconds = False, None
+                stats.add(False, error=True)
+            else:
+                solved = position.is_solution(result.best_move)
+                seconds = time_to_solution(result.trace, position) if solved else None
+                stats.add(solved, seconds)
+            if on_position:
+                on_position(position, result, solved, seconds)
+    stats.finish()
+    return stats
+
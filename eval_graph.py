@@ -0,0 +1,102 @@
+"""Evaluation graph of the current line, filled in by background searches.
+
+EvalGraph holds one point per ply of the line (root to the end of the line
+through the current node). Evaluations are kept by Zobrist key across line
+changes, so adding or undoing a move only leaves the new plies to compute.
+Plies are first searched briefly (QUICK_TIME) so the whole graph appears
+fast, then again for REFINE_TIME; results from the app's own searches are
+used whenever they are at least as long.
+"""
+import chess
+
+QUICK_TIME = 0.05  # Seconds per ply for the first pass
+REFINE_TIME = 0.5  # Seconds per ply for the second pass
+CLAMP = 1000  # Centipawns; scores (and mates) are clipped to +-CLAMP for plotting
+
+
+class GraphPoint:
+    __slots__ = ("cp", "depth", "think_time")
+
+    def __init__(self, cp, depth, think_time):
+        self.cp = cp  # White's point of view, clamped
+        self.depth = depth
+        self.think_time = think_time
+
+
+def white_cp(score):
+    white = score.white()
+    if white.is_mate():
+        return CLAMP if white.mate() > 0 else -CLAMP
+    return max(-CLAMP, min(CLAMP, white.score()))
+
+
+class EvalGraph:
+    def __init__(self):
+        self.line = []  # VariationNodes, root first
+        self.points = {}  # Zobrist key -> GraphPoint
+
+    def set_line(self, nodes):
+        """Use nodes as the line; returns True if it differs from the previous one."""
+        nodes = list(nodes)
+        changed = [n.key for n in nodes] != [n.key for n in self.line]
+        self.line = nodes
+        return changed
+
+    def record(self, key, score, depth, think_time):
+        # A longer search replaces a shorter one; returns True if the point changed
+        if score is None:
+            return False
+        point = self.points.get(key)
+        if point is not None and (point.think_time or 0) >= (think_time or 0):
+            return False
+        self.points[key] = GraphPoint(white_cp(score), depth, think_time)
+        return True
+
+    def record_terminal(self, key, board):
+        # Game over on the board: exact value, never searched
+        if board.is_checkmate():
+            cp = -CLAMP if board.turn == chess.WHITE else CLAMP
+        else:
+            cp = 0
+        self.points[key] = GraphPoint(cp, 0, float("inf"))
+
+    def missing(self, think_time):
+        """Indices of the plies without a result from at least think_time seconds of search."""
+        result = []
+        for i, node in enumerate(self.line):
+            point = self.points.get(node.key)
+            if point is None or (point.think_time or 0) < think_time:
+                result.append(i)
+        return result
+
+    def values(self):
+        # One value per ply (None where not known yet)
+        values = []
+        for node in self.line:
+            point = self.points.get(node.key)
+            values.append(point.cp if point is not None else None)
+        return values
+
+
+def line_through(tree):
+    """The root, the path to the current node and its continuation (the forward() choices)."""
+    nodes = [tree.root, *tree.current.path()]
+    node = tree.current
+    while node.children:
+        node = node.next or node.children[0]
+        nodes.append(node)
+    return nodes
+
+
+def line_boards(tree, nodes, indices):
+    """Boards for nodes[i] for every i in indices, replaying the line once."""
+    wanted = set(indices)
+    boards = {}
+    board = tree.root_board.copy()
+    for i, node in enumerate(nodes):
+        if i:
+            board.push(node.move)
+            board.turn = node.turn
+        if i in wanted:
+            boards[i] = board.copy(stack=False)
+    return boards
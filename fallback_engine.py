@@ -0,0 +1,579 @@
+"""Built-in pure-Python engine, used when Stockfish cannot be started.
+
+Much weaker and slower than Stockfish, but it suggests sensible moves within
+the same think time: iterative deepening principal variation search with a
+transposition table, null-move pruning, MVV-LVA / killer / history move
+ordering, a quiescence search over captures and a material plus
+piece-square-table evaluation.
+
+FallbackEngine implements the part of chess.engine.SimpleEngine the app uses
+(analysis(), analyse(), configure(), options, id, quit()), so the scheduler,
+the cache, the telemetry and the eval bar work with it unchanged.
+"""
+import asyncio
+import queue
+import threading
+import time
+
+import chess
+import chess.engine
+
+ENGINE_NAME = "NextChessMove built-in"
+MAX_DEPTH = 64
+DEFAULT_TT_ENTRIES = 1 << 20  # About 150-200 MB of Python objects when full
+
+MATE = 100000
+MATE_BOUND = MATE - 1000  # Scores beyond this are mate scores
+INF = MATE + 1
+EXACT, LOWER, UPPER = 0, 1, 2
+
+PIECE_VALUES = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+# Non-pawn material that counts as "opening" for the king table (both sides' knights, bishops, rooks and queens)
+PHASE_WEIGHTS = {chess.KNIGHT: 1, chess.BISHOP: 1, chess.ROOK: 2, chess.QUEEN: 4}
+MAX_PHASE = 24
+
+# Piece-square tables from White's point of view, a8 first (as seen on a diagram)
+PST = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    chess.ROOK: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+}
+KING_MIDDLEGAME = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+KING_ENDGAME = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+
+def _by_square(table, color, base=0):
+    # Diagram order (a8 first) -> indexed by square for the given color
+    if color == chess.WHITE:
+        return [base + table[square ^ 56] for square in chess.SQUARES]
+    return [base + table[square] for square in chess.SQUARES]
+
+
+# (color, piece type) -> value of that piece on each square, material included
+SQUARE_VALUES = {
+    (color, piece_type): _by_square(PST[piece_type], color, PIECE_VALUES[piece_type])
+    for color in chess.COLORS for piece_type in PST
+}
+KING_VALUES = {
+    color: (_by_square(KING_MIDDLEGAME, color), _by_square(KING_ENDGAME, color))
+    for color in chess.COLORS
+}
+
+
+def evaluate(board):
+    """Static evaluation in centipawns from the side to move's point of view."""
+    score = 0
+    phase = 0
+    for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+        for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+            mask = board.pieces_mask(piece_type, color)
+            if not mask:
+                continue
+            values = SQUARE_VALUES[(color, piece_type)]
+            for square in chess.scan_forward(mask):
+                score += sign * values[square]
+            phase += PHASE_WEIGHTS.get(piece_type, 0) * chess.popcount(mask)
+    # King safety matters while there is material left, king activity in the endgame
+    phase = min(phase, MAX_PHASE)
+    for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+        king = board.king(color)
+        if king is not None:
+            middlegame, endgame = KING_VALUES[color]
+            score += sign * (middlegame[king] * phase + endgame[king] * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if board.turn == chess.WHITE else -score
+
+
+def to_pov_score(score, turn):
+    if score > MATE_BOUND:
+        return chess.engine.PovScore(chess.engine.Mate((MATE - score + 1) // 2), turn)
+    if score < -MATE_BOUND:
+        return chess.engine.PovScore(chess.engine.Mate(-((MATE + score) // 2)), turn)
+    return chess.engine.PovScore(chess.engine.Cp(score), turn)
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Searcher:
+    """Alpha-beta search state; the transposition table survives between searches."""
+
+    def __init__(self, tt_entries=DEFAULT_TT_ENTRIES):
+        self.tt_entries = tt_entries
+        self.tt = {}  # transposition key -> (depth, flag, score, move)
+        self.nodes = 0
+        self.seldepth = 0
+        self.killers = []
+        self.history = {}
+        self.deadline = None
+        self.max_nodes = None
+        self.stop_event = None
+        self._can_abort = False
+
+    # --- Time and node budget ---
+    def _check_budget(self):
+        if not self._can_abort:
+            return  # Depth 1 always completes so there is a move to show
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise _Timeout()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise _Timeout()
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise _Timeout()
+
+    # --- Transposition table (mate scores stored relative to the node) ---
+    def _store(self, key, depth, flag, score, move, ply):
+        if score > MATE_BOUND:
+            score += ply
+        elif score < -MATE_BOUND:
+            score -= ply
+        if len(self.tt) >= self.tt_entries and key not in self.tt:
+            self.tt.clear()
+        self.tt[key] = (depth, flag, score, move)
+
+    @staticmethod
+    def _tt_score(score, ply):
+        if score > MATE_BOUND:
+            return score - ply
+        if score < -MATE_BOUND:
+            return score + ply
+        return score
+
+    # --- Move ordering ---
+    def _ordered_moves(self, board, tt_move, ply, moves=None):
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+        turn = board.turn
+        scored = []
+        for move in (moves if moves is not None else board.generate_legal_moves()):
+            if move == tt_move:
+                order = 1000000
+            elif board.is_capture(move):
+                # MVV-LVA: most valuable victim first, least valuable attacker first
+                victim = board.piece_type_at(move.to_square) or chess.PAWN  # en passant
+                order = 100000 + victim * 10 - board.piece_type_at(move.from_square)
+            elif move.promotion:
+                order = 90000 + move.promotion
+            elif move in killers:
+                order = 80000
+            else:
+                order = min(history.get((turn, move.from_square, move.to_square), 0), 79999)
+            scored.append((order, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def _ordered_captures(self, board):
+        scored = []
+        for move in board.generate_legal_captures():
+            victim = board.piece_type_at(move.to_square) or chess.PAWN
+            scored.append((victim * 10 - board.piece_type_at(move.from_square), victim, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(victim, move) for _, victim, move in scored]
+
+    def _remember_quiet(self, board, move, depth, ply):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        key = (board.turn, move.from_square, move.to_square)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    # --- Search ---
+    def _quiesce(self, board, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_budget()
+        if ply > self.seldepth:
+            self.seldepth = ply
+        stand_pat = evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        for victim, move in self._ordered_captures(board):
+            # Delta pruning: even winning the victim for free cannot raise alpha
+            if not move.promotion and stand_pat + PIECE_VALUES[victim] + 200 < alpha:
+                continue
+            board.push(move)
+            score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            board.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _search(self, board, depth, alpha, beta, ply, allow_null=True):
+        if depth <= 0:
+            return self._quiesce(board, alpha, beta, ply)
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_budget()
+        if board.halfmove_clock >= 100 or (board.halfmove_clock >= 4 and board.is_repetition(2)):
+            return 0
+        key = board._transposition_key()
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, entry_score, tt_move = entry
+            if entry_depth >= depth:
+                score = self._tt_score(entry_score, ply)
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    return score
+        in_check = board.is_check()
+        if in_check:
+            depth += 1  # Check extension
+        # Null move: if passing still fails high, the position is good enough to cut
+        if (allow_null and not in_check and depth >= 3 and beta < MATE_BOUND
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            board.push(chess.Move.null())
+            score = -self._search(board, depth - 3, -beta, -beta + 1, ply + 1, False)
+            board.pop()
+            if score >= beta:
+                return beta
+        moves = self._ordered_moves(board, tt_move, ply)
+        if not moves:
+            return -MATE + ply if in_check else 0
+        original_alpha = alpha
+        best_score, best_move = -INF, None
+        for i, move in enumerate(moves):
+            quiet = not board.is_capture(move) and not move.promotion
+            board.push(move)
+            if i == 0:
+                score = -self._search(board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # Principal variation search: prove the move is worse with a null window
+                score = -self._search(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self._search(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    if quiet:
+                        self._remember_quiet(board, move, depth, ply)
+                    break
+        flag = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+        self._store(key, depth, flag, best_score, best_move, ply)
+        return best_score
+
+    def _search_root(self, board, depth, moves):
+        alpha, beta = -INF, INF
+        best_score, best_move = -INF, None
+        for i, move in enumerate(moves):
+            board.push(move)
+            if i == 0:
+                score = -self._search(board, depth - 1, -beta, -alpha, 1)
+            else:
+                score = -self._search(board, depth - 1, -alpha - 1, -alpha, 1)
+                if score > alpha:
+                    score = -self._search(board, depth - 1, -beta, -alpha, 1)
+            board.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+                alpha = score
+        return best_score, best_move
+
+    def _principal_variation(self, board, move, depth):
+        pv = [move]
+        board = board.copy(stack=False)
+        board.push(move)
+        seen = {board._transposition_key()}
+        while len(pv) < max(depth, 1):
+            entry = self.tt.get(board._transposition_key())
+            if entry is None or entry[3] is None or not board.is_legal(entry[3]):
+                break
+            board.push(entry[3])
+            key = board._transposition_key()
+            if key in seen:
+                break
+            seen.add(key)
+            pv.append(entry[3])
+        return pv
+
+    def search(self, board, limit=None, multipv=1, root_moves=None, stop_event=None, on_info=None):
+        """Iterative deepening search of board; returns the info dict of each line, best first.
+
+        on_info(info) is called for every line of every completed depth, with
+        the same keys Stockfish reports (depth, seldepth, multipv, score, pv,
+        nodes, nps, time, hashfull).
+        """
+        started = time.monotonic()
+        think_time = limit.time if limit is not None else None
+        self.deadline = started + think_time if think_time is not None else None
+        self.max_nodes = limit.nodes if limit is not None else None
+        max_depth = min(limit.depth, MAX_DEPTH) if limit is not None and limit.depth else MAX_DEPTH
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.seldepth = 0
+        self.killers = []
+        self.history = {}
+        moves = list(board.legal_moves)
+        if root_moves:
+            moves = [move for move in moves if move in root_moves]
+        if not moves:
+            return []
+        multipv = max(1, min(multipv or 1, len(moves)))
+        work = board.copy()
+        lines = []
+        previous = []  # Line moves of the last completed depth, searched first
+        for depth in range(1, max_depth + 1):
+            self._can_abort = depth > 1
+            new_lines = []
+            try:
+                excluded = []
+                for k in range(multipv):
+                    # Line k: best move among those not already used by lines 1..k-1
+                    first = previous[k] if k < len(previous) and previous[k] not in excluded else None
+                    candidates = self._ordered_moves(work, first, 0, [m for m in moves if m not in excluded])
+                    score, move = self._search_root(work, depth, candidates)
+                    excluded.append(move)
+                    if k == 0:
+                        self._store(work._transposition_key(), depth, EXACT, score, move, 0)
+                    new_lines.append((score, move))
+            except _Timeout:
+                break
+            elapsed = time.monotonic() - started
+            lines = []
+            for k, (score, move) in enumerate(new_lines, 1):
+                lines.append({
+                    "depth": depth,
+                    "seldepth": max(self.seldepth, depth),
+                    "multipv": k,
+                    "score": to_pov_score(score, board.turn),
+                    "pv": self._principal_variation(board, move, depth),
+                    "nodes": self.nodes,
+                    "nps": int(self.nodes / elapsed) if elapsed > 0 else 0,
+                    "time": elapsed,
+                    "hashfull": min(1000, len(self.tt) * 1000 // self.tt_entries),
+                })
+            previous = [move for _, move in new_lines]
+            if on_info is not None:
+                for info in lines:
+                    on_info(info)
+            best_score = new_lines[0][0]
+            if abs(best_score) > MATE_BOUND and MATE - abs(best_score) <= depth:
+                break  # Forced mate found within the full-width depth
+            # The next depth takes several times longer: don't start what cannot finish
+            if think_time is not None and elapsed > think_time * 0.5:
+                break
+        return lines
+
+
+class _SearchJob:
+    __slots__ = ("board", "limit", "multipv", "root_moves", "stop_event", "on_info", "on_done")
+
+    def __init__(self, board, limit, multipv, root_moves, stop_event, on_info, on_done):
+        self.board = board
+        self.limit = limit
+        self.multipv = multipv
+        self.root_moves = root_moves
+        self.stop_event = stop_event
+        self.on_info = on_info  # Called with every info dict, on the search thread
+        self.on_done = on_done  # Called with the final lines (possibly empty), on the search thread
+
+
+class FallbackAnalysis:
+    """Running search, iterated like chess.engine.SimpleAnalysisResult."""
+
+    _DONE = object()
+
+    def __init__(self, engine, board, limit, multipv, root_moves):
+        self.multipv = []  # Info dicts of the last completed depth, best first
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        engine._submit(_SearchJob(board.copy(), limit, multipv, root_moves, self._stop, self._queue.put, self._finish))
+
+    def _finish(self, lines):
+        self.multipv = lines
+        self._done.set()
+        self._queue.put(self._DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        info = self._queue.get()
+        if info is self._DONE:
+            self._queue.put(self._DONE)  # Keep ending further iterations
+            raise StopIteration
+        return info
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self):
+        self._done.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.wait()
+
+
+class AsyncFallbackAnalysis:
+    """Running search, iterated like chess.engine.AnalysisResult (create it on an asyncio loop)."""
+
+    _DONE = object()
+
+    def __init__(self, engine, board, limit, multipv, root_moves):
+        self.multipv = []
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stop = threading.Event()
+        self._done = asyncio.Event()
+        engine._submit(_SearchJob(board.copy(), limit, multipv, root_moves, self._stop,
+                                  lambda info: self._loop.call_soon_threadsafe(self._queue.put_nowait, info),
+                                  lambda lines: self._loop.call_soon_threadsafe(self._finish, lines)))
+
+    def _finish(self, lines):
+        self.multipv = lines
+        self._done.set()
+        self._queue.put_nowait(self._DONE)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        info = await self._queue.get()
+        if info is self._DONE:
+            self._queue.put_nowait(self._DONE)
+            raise StopAsyncIteration
+        return info
+
+    def stop(self):
+        self._stop.set()
+
+    async def wait(self):
+        await self._done.wait()
+        return self.multipv
+
+
+class FallbackEngine:
+    def __init__(self, tt_entries=DEFAULT_TT_ENTRIES):
+        self.id = {"name": ENGINE_NAME, "author": "nextchessmove"}
+        self.options = {}  # No UCI options; engine profiles filter everything out
+        self._searcher = Searcher(tt_entries)
+        # One persistent search thread, like a single engine process: searches run one at a time
+        self._jobs = queue.SimpleQueue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def _submit(self, job):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="fallback-search", daemon=True)
+                self._worker.start()
+        self._jobs.put(job)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            lines = []
+            try:
+                lines = self._searcher.search(job.board, job.limit, job.multipv, job.root_moves, job.stop_event, job.on_info)
+            except Exception as e:
+                print(f"[FALLBACK ENGINE ERROR] {e}")
+            finally:
+                job.on_done(lines)
+
+    def configure(self, options):
+        pass
+
+    def analysis(self, board, limit=None, *, multipv=None, root_moves=None, **kwargs):
+        return FallbackAnalysis(self, board, limit, multipv, root_moves)
+
+    def async_analysis(self, board, limit=None, *, multipv=None, root_moves=None):
+        return AsyncFallbackAnalysis(self, board, limit, multipv, root_moves)
+
+    def analyse(self, board, limit, *, multipv=None, root_moves=None, **kwargs):
+        with self.analysis(board, limit, multipv=multipv, root_moves=root_moves) as analysis:
+            for _ in analysis:
+                pass
+        lines = analysis.multipv
+        if multipv is None:
+            return lines[0] if lines else {}
+        return lines
+
+    def quit(self):
+        with self._worker_lock:
+            if self._worker is not None:
+                self._jobs.put(None)
+                self._worker = None
+        self._searcher.tt.clear()
+
+    close = quit
@@ -1,27 +1,44 @@
+import sys
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Command-line mode (e.g. `python nextchessmove.py analyze --fen ...`): never import Tk/PIL
+    from chess_cli import main
+    sys.exit(main())
 import tkinter as tk
 from tkinter import messagebox
-import sys
-import platform
-if platform.system() == "Windows":
-    import winsound
-else:
-    winsound = None
 import chess
 import chess.engine
-from PIL import Image, ImageTk
+import sqlite3
 
 import threading
 
-# Set this to your Stockfish executable path (portable: always looks in the same folder as the script/exe)
+from analysis_cache import AnalysisCache
+from analysis_db import AnalysisDB, ANALYSIS_DB_PATH, UI_TIMEOUT
+from analysis_scheduler import AnalysisScheduler
+from board_model import BoardModel
+from board_renderer import BoardRenderer
+from engine_loop import UiQueue
+from engine_pool import EnginePool
+from engine_telemetry import MetricsLog, METRICS_LOG_PATH
+from engine_profiles import EngineProfile
+from fallback_engine import FallbackEngine, ENGINE_NAME as FALLBACK_ENGINE_NAME
+from points_match import PointsMatch, DEFAULT_MOVES, captured_piece, choose_engine_move
+from sound_player import SoundPlayer, SOUNDS_DIR
+from sprite_cache import SpriteCache, snap_size
+from ui_profiler import profiler as ui_profiler, install as install_ui_profiler, PROFILE_OUT_PATH
+from variation_tree import VariationTree, position_key
+from eval_graph import EvalGraph, QUICK_TIME, REFINE_TIME, CLAMP, line_through, line_boards
+# STOCKFISH_PATH: edit it in analysis_core.py or set the STOCKFISH_PATH environment variable
+from analysis_core import STOCKFISH_PATH, position_problem
+
 import os
-STOCKFISH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stockfish-windows-x86-64-avx2.exe")
 
 PIECE_IMAGES = {}
 PIECES = ['r', 'n', 'b', 'q', 'k', 'p', 'R', 'N', 'B', 'Q', 'K', 'P']
 
-# Polyglot opening book path
-POLYGLOT_BOOK_PATH = r"C:\Users\hp\OneDrive\Desktop\Chess bot\komodo.bin"
-import chess.polyglot
+# Polyglot opening book path: edit it in opening_book.py or set the POLYGLOT_BOOK_PATH environment variable
+from opening_book import OpeningBook, POLYGLOT_BOOK_PATH
+# Syzygy tablebase directory: edit it in tablebase.py or set the SYZYGY_PATH environment variable
+from tablebase import SyzygyTablebase, SYZYGY_PATH
 
 class ChessGUI:
     # --- Board themes ---
@@ -38,37 +55,18 @@ class ChessGUI:
     }
 
     def play_sound(self, sound_name):
-        """Play a sound effect from the sounds/ folder. sound_name: 'move', 'capture', 'check'"""
-        import os
-        sound_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds", f"{sound_name}.wav")
-        if not os.path.exists(sound_file):
-            # Uncomment the next line to debug missing sound files
-            # print(f"[SOUND] File not found: {sound_file}")
-            return  # No sound file, skip
-        try:
-            if winsound:
-                # Stop any currently playing sound first (to avoid overlap)
-                winsound.PlaySound(None, winsound.SND_PURGE)
-                winsound.PlaySound(sound_file, winsound.SND_FILENAME | winsound.SND_ASYNC)
-            else:
-                # On Linux/Mac, try to use aplay/afplay if available
-                import subprocess
-                if sys.platform == "darwin":
-                    subprocess.Popen(["afplay", sound_file])
-                else:
-                    subprocess.Popen(["aplay", sound_file])
-        except Exception as e:
-            print(f"[SOUND ERROR] {e}")
+        """Play a sound effect from the sounds/ folder. sound_name: 'move', 'capture', 'check', 'castle'"""
+        self.sounds.play(sound_name)
     def fen_entry_callback(self, event=None):
         fen = self.fen_var.get().strip()
-        import chess
+        if fen == self.board.fen():
+            return  # Focus left an unedited entry: nothing changed
         try:
             board = chess.Board(fen)
             if board.is_valid():
-                self.board = board
+                self.end_points_match(stopped=True)
+                self.model.set_board(board)
                 self.update_castling_vars_from_board()
-                self.draw_board()
-                self.calculate_and_show_best_move()
                 self.fen_entry.config(bg="#eaffea")  # light green for valid
             else:
                 self.fen_entry.config(bg="#ffeaea")  # light red for invalid
@@ -96,12 +94,159 @@ class ChessGUI:
             self.root.after_cancel(self._loading_anim_after_id)
             del self._loading_anim_after_id
     def go_back_one_move(self, event=None):
-        if self.board.move_stack:
+        if self.points_match is not None:
+            return
+        node = self.variations.back()
+        if node is not None:
+            self.show_variation_node(node)
+        elif self.board.move_stack:
+            # Moves from before the position was last edited are not in the tree
             self.board.pop()
-            self.draw_board()
-            self.calculate_and_show_best_move()
+            self.model.changed()
+
+    def go_forward_one_move(self, event=None):
+        if self.points_match is not None:
+            return
+        node = self.variations.forward()
+        if node is not None:
+            self.show_variation_node(node)
+
+    def show_variation_node(self, node):
+        # Step to a node of the variation tree; its last analysis is shown again without searching
+        self.model.set_board(self.variations.board(node), analyse=node.analysis is None)
+        self.model.flush()
+        if node.analysis is not None:
+            self.analysis_scheduler.cancel()
+            self.stop_loading_animation()
+            self.best_move_arrow = None
+            self.clear_arrows()
+            analysis = node.analysis
+            self.show_best_moves(self.board, analysis.best_move, analysis.second_move, analysis.as_result(), analysis.depth)
+
+    # --- Evaluation graph ---
+    def toggle_eval_graph(self):
+        if self.show_eval_graph.get():
+            self.eval_graph_canvas.grid()
+            self.eval_graph.line = []  # Recompute what is missing
+            self.refresh_eval_graph()
+        else:
+            self.eval_graph_canvas.grid_remove()
+            self.analysis_scheduler.background(())
+
+    def refresh_eval_graph(self):
+        # Redraw; if the line changed, fill in what is already known and queue background
+        # searches for the rest: a quick pass over every missing ply first, then refinement.
+        # Paused during a Points Match, which needs the engine.
+        if not self.show_eval_graph.get() or self.points_match is not None:
+            return
+        graph = self.eval_graph
+        if graph.set_line(line_through(self.variations)):
+            nodes = graph.line
+            todo = graph.missing(REFINE_TIME)
+            boards = line_boards(self.variations, nodes, todo)
+            quick, refine = [], []
+            for i in todo:
+                board, node = boards[i], nodes[i]
+                if board.is_game_over():
+                    graph.record_terminal(node.key, board)
+                    continue
+                if not board.is_valid():
+                    continue
+                known = node.analysis or self.known_analysis(board, QUICK_TIME)
+                if known is not None:
+                    graph.record(node.key, known.score, known.depth, known.think_time)
+                point = graph.points.get(node.key)
+                if point is None or (point.think_time or 0) < QUICK_TIME:
+                    quick.append((board, QUICK_TIME))
+                if point is None or (point.think_time or 0) < REFINE_TIME:
+                    refine.append((board, REFINE_TIME))
+            self.init_engine()
+            self.analysis_scheduler.background(quick + refine, on_done=self._on_graph_result)
+        self.draw_eval_graph()
+
+    def _record_graph_point(self, board, score, depth, think_time):
+        if self.eval_graph.record(position_key(board), score, depth, think_time) and self.show_eval_graph.get():
+            self.draw_eval_graph()
+
+    def _on_graph_result(self, request, outcome):
+        if outcome.best_move is None:
+            return
+        searched = request.searched_time
+        self.analysis_cache.store(request.board, outcome.best_move, outcome.second_move, outcome.score, outcome.depth, searched)
+        if self.analysis_db is not None:
+            self.analysis_scheduler.loop.run_blocking(self._save_outcome, outcome, searched, self.analysis_scheduler.engine_name)
+        self._record_graph_point(request.board, outcome.score, outcome.depth, searched)
+
+    def draw_eval_graph(self):
+        canvas = self.eval_graph_canvas
+        canvas.delete("all")
+        width, height = int(canvas.cget('width')), int(canvas.cget('height'))
+        mid = height / 2
+        canvas.create_line(0, mid, width, mid, fill="#BBB")
+        values = self.eval_graph.values()
+        if len(values) < 2:
+            return
+        step = (width - 8) / (len(values) - 1)
+        scale = (mid - 4) / CLAMP
+        segment = []
+        for i, value in enumerate(values + [None]):
+            if value is not None:
+                segment.append((4 + i * step, mid - value * scale))
+                continue
+            if len(segment) > 1:
+                canvas.create_line(*[c for p in segment for c in p], fill="#4a6fa5", width=2)
+            elif segment:
+                x, y = segment[0]
+                canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill="#4a6fa5", outline="")
+            segment = []
+        # Current position
+        current = len(self.variations.current.path())
+        x = 4 + current * step
+        canvas.create_line(x, 0, x, height, fill="#E07A00")
+
+    def on_eval_graph_click(self, event):
+        line = self.eval_graph.line
+        if len(line) < 2 or self.points_match is not None:
+            return
+        step = (int(self.eval_graph_canvas.cget('width')) - 8) / (len(line) - 1)
+        index = max(0, min(len(line) - 1, round((event.x - 4) / step)))
+        node = line[index]
+        if node is not self.variations.current:
+            self.variations.goto(node)
+            self.show_variation_node(node)
+
+    def load_pgn(self):
+        from tkinter import filedialog
+        import chess.pgn
+        path = filedialog.askopenfilename(title="Load PGN", filetypes=[("PGN files", "*.pgn"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                game = chess.pgn.read_game(f)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Load PGN", f"Could not read {path}: {e}")
+            return
+        if game is None:
+            messagebox.showerror("Load PGN", f"No game found in {path}")
+            return
+        self.end_points_match(stopped=True)
+        self.variations = VariationTree.from_game(game)
+        self.model.set_board(self.variations.board())
+        self.update_castling_vars_from_board()
+
+    def save_pgn(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(title="Save PGN", defaultextension=".pgn", filetypes=[("PGN files", "*.pgn"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, "w") as f:
+                print(self.variations.to_game(), file=f, end="\n\n")
+        except OSError as e:
+            messagebox.showerror("Save PGN", f"Could not write {path}: {e}")
     def on_right_click(self, event):
-        col, row = event.x // 60, event.y // 60
+        col, row = event.x // self.square_size, event.y // self.square_size
         if 0 <= col < 8 and 0 <= row < 8:
             self._right_click_start = (col, row, event.x, event.y)
             self.arrow_drag = {'from': (col, row), 'to': (col, row)}
@@ -111,14 +256,14 @@ class ChessGUI:
 
     def on_right_drag(self, event):
         if self.arrow_drag is not None:
-            col, row = event.x // 60, event.y // 60
+            col, row = event.x // self.square_size, event.y // self.square_size
             self.arrow_drag['to'] = (col, row)
             # If drag distance is significant, mark as drag
             if hasattr(self, '_right_click_start') and self._right_click_start is not None:
                 sx, sy = self._right_click_start[2], self._right_click_start[3]
                 if abs(event.x - sx) > 5 or abs(event.y - sy) > 5:
                     self._right_click_dragged = True
-            self.draw_board()
+            self.draw_arrows()
 
     def on_right_release(self, event):
         # If drag distance is small, treat as click (remove piece)
@@ -137,10 +282,9 @@ class ChessGUI:
                         board_row = row
                     square = chess.square(board_col, 7 - board_row)
                     piece = self.board.piece_at(square)
-                    if piece:
+                    if piece and self.points_match is None:
                         self.board.remove_piece_at(square)
-                        self.draw_board()
-                        self.calculate_and_show_best_move()
+                        self.model.changed()
                 self.arrow_drag = None
                 self._right_click_start = None
                 self._right_click_dragged = False
@@ -174,11 +318,22 @@ class ChessGUI:
             self.arrow_drag = None
         self._right_click_start = None
         self._right_click_dragged = False
-        self.draw_board()
+        self.draw_arrows()
+
+    @property
+    def board(self):
+        # The position lives in the board model; call self.model.changed() after modifying it
+        return self.model.board
+
     def __init__(self, root):
         self.root = root
         self.root.title("Offline Chess - Next Best Move")
-        self.board = chess.Board()
+        # Board changes are batched per Tk idle cycle: one redraw/FEN/label/analysis per change
+        self.model = BoardModel(root.after_idle)
+        # Every line played from the current position, with the last analysis of each node
+        self.variations = VariationTree(self.model.board)
+        # Evaluation of every ply of the current line, computed in the background
+        self.eval_graph = EvalGraph()
         self.selected = None
         self.squares = {}
         self.images = {}
@@ -191,6 +346,10 @@ class ChessGUI:
         self.fen_entry.pack(side='left', fill='x', expand=True)
         self.fen_entry.bind('<Return>', self.fen_entry_callback)
         self.fen_entry.bind('<FocusOut>', self.fen_entry_callback)
+        # --- Evaluation graph of the current line (click a point to go there) ---
+        self.eval_graph_canvas = tk.Canvas(root, width=480, height=80, bg="#F7F7F7", highlightthickness=0)
+        self.eval_graph_canvas.grid(row=23, column=1, columnspan=2, sticky='w', pady=(0,4))
+        self.eval_graph_canvas.bind('<Button-1>', self.on_eval_graph_click)
         self.fen_var.set(self.board.fen())
         # Update FEN entry when board changes
         def update_fen_entry(*args):
@@ -198,14 +357,15 @@ class ChessGUI:
             self.fen_entry.config(bg="white")
         self.update_fen_entry = update_fen_entry
 
-        # --- Always keep board and FEN in sync after any manual move or edit ---
-        self._sync_fen_after_move = True
+        # Square size in pixels; follows the window size (see on_window_resize)
+        self.square_size = 60
+        sq = self.square_size
         # --- Evaluation bar ---
-        self.eval_bar_canvas = tk.Canvas(root, width=30, height=600, bg="#DDD", highlightthickness=0)
+        self.eval_bar_canvas = tk.Canvas(root, width=30, height=10*sq, bg="#DDD", highlightthickness=0)
         self.eval_bar_canvas.grid(row=0, column=0, rowspan=22, sticky='nsw')
 
         # --- Scrollable left frame for palettes and board ---
-        self.left_canvas = tk.Canvas(root, width=480, height=600)
+        self.left_canvas = tk.Canvas(root, width=8*sq, height=10*sq)
         self.left_canvas.grid(row=0, column=1, rowspan=22, sticky='ns')
         self.left_scrollbar = tk.Scrollbar(root, orient='vertical', command=self.left_canvas.yview)
         self.left_scrollbar.grid(row=0, column=2, rowspan=22, sticky='nsw')
@@ -218,15 +378,38 @@ class ChessGUI:
         self.left_canvas.configure(yscrollcommand=self.left_scrollbar.set)
 
         # Piece palettes above and below the board (now inside left_frame)
-        self.top_palette = tk.Canvas(self.left_frame, width=480, height=60, bg="#EEE")
+        self.top_palette = tk.Canvas(self.left_frame, width=8*sq, height=sq, bg="#EEE")
         self.top_palette.grid(row=0, column=0)
-        self.canvas = tk.Canvas(self.left_frame, width=480, height=480)
+        self.canvas = tk.Canvas(self.left_frame, width=8*sq, height=8*sq)
         self.canvas.grid(row=1, column=0)
-        self.bottom_palette = tk.Canvas(self.left_frame, width=480, height=60, bg="#EEE")
+        self.bottom_palette = tk.Canvas(self.left_frame, width=8*sq, height=sq, bg="#EEE")
         self.bottom_palette.grid(row=2, column=0)
 
         self.load_images()
+        self.renderer = BoardRenderer(self.canvas, PIECE_IMAGES, self.square_size)
         self.engine = None
+        # Threads/Hash sized to this machine, plus the user's overrides from Engine Settings
+        self.engine_profile = EngineProfile.load()
+        # Engine results reach the Tk thread through this queue (one wake-up per burst of updates)
+        self.ui_queue = UiQueue(root)
+        # Owns the Stockfish process (or the built-in engine if Stockfish won't start); coalesces and cancels analysis requests.
+        # It runs on the shared asyncio engine loop and delivers its callbacks on the Tk thread.
+        self.analysis_scheduler = AnalysisScheduler(STOCKFISH_PATH, self.engine_profile, fallback=True,
+                                                    dispatch=self.ui_queue.post)
+        # Transposition cache of finished searches, keyed by Zobrist hash
+        self.analysis_cache = AnalysisCache()
+        # Finished searches persist across sessions (and users, if the file is on a share)
+        try:
+            self.analysis_db = AnalysisDB(ANALYSIS_DB_PATH)
+        except sqlite3.Error as e:
+            print(f"Analysis database unavailable ({ANALYSIS_DB_PATH}): {e}")
+            self.analysis_db = None
+        # Opening positions are answered from the Polyglot book without searching
+        self.opening_book = OpeningBook(POLYGLOT_BOOK_PATH)
+        # Endgames within the local Syzygy tables are answered exactly
+        self.tablebase = SyzygyTablebase(self.engine_profile.options.get("SyzygyPath") or SYZYGY_PATH)
+        # Sound effects are decoded once and played through one output stream
+        self.sounds = SoundPlayer(SOUNDS_DIR)
 
         # Controls (right side)
         self.controls_frame = tk.Frame(root)
@@ -268,10 +451,22 @@ class ChessGUI:
         self.think_time = tk.IntVar(value=2)
         self.time_slider = tk.Scale(self.controls_frame, from_=1, to=60, orient=tk.HORIZONTAL, variable=self.think_time, showvalue=True, length=180)
         self.time_slider.pack(anchor='w')
+        # Live analysis: show the best line as the search deepens; infinite: search until Stop
+        self.live_analysis = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.controls_frame, text="Live analysis", variable=self.live_analysis).pack(anchor='w')
+        self.infinite_analysis = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.controls_frame, text="Infinite analysis (until stopped)", variable=self.infinite_analysis, command=self.calculate_and_show_best_move).pack(anchor='w')
+        # Speculative analysis: while idle, pre-analyse the positions after the best/second move and before the last move
+        self.speculative_analysis = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.controls_frame, text="Pre-analyse likely next positions", variable=self.speculative_analysis).pack(anchor='w')
+        self.show_eval_graph = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.controls_frame, text="Evaluation graph", variable=self.show_eval_graph, command=self.toggle_eval_graph).pack(anchor='w')
 
         # Calculate Next Move
         self.calc_btn = tk.Button(self.controls_frame, text="Calculate Next Move", command=self.calculate_and_show_best_move)
-        self.calc_btn.pack(pady=8, anchor='w')
+        self.calc_btn.pack(pady=(8,2), anchor='w')
+        self.stop_btn = tk.Button(self.controls_frame, text="Stop", command=self.stop_analysis)
+        self.stop_btn.pack(pady=(0,8), anchor='w')
 
         # Status label for best move
         self.status = tk.Label(self.controls_frame, text="", font=("Calibri", 14))
@@ -280,11 +475,27 @@ class ChessGUI:
         self.second_move_label = tk.Label(self.controls_frame, text="", font=("Calibri", 10), fg="#666", cursor="hand2")
         self.second_move_label.pack(anchor='w')
         self.second_move_label.bind("<Button-1>", lambda e: None)  # Placeholder, will be set dynamically
+        # Principal variation of the best move
+        self.pv_label = tk.Label(self.controls_frame, text="", font=("Calibri", 9), fg="#666", wraplength=260, justify='left')
+        self.pv_label.pack(anchor='w')
 
         # Points label for each player
         self.points_label = tk.Label(self.controls_frame, text="", font=("Calibri", 12), fg="#333")
         self.points_label.pack(anchor='w')
 
+        # Points Match: play from the current position against the engine, scoring captures
+        self.points_match = None
+        self._points_match_thinking = False
+        match_frame = tk.Frame(self.controls_frame)
+        match_frame.pack(pady=(8,2), anchor='w')
+        self.points_match_btn = tk.Button(match_frame, text="Start Points Match", command=self.toggle_points_match)
+        self.points_match_btn.pack(side='left')
+        tk.Label(match_frame, text=" Moves:").pack(side='left')
+        self.points_match_moves_var = tk.StringVar(value=str(DEFAULT_MOVES))
+        tk.Spinbox(match_frame, from_=1, to=100, width=4, textvariable=self.points_match_moves_var).pack(side='left')
+        self.points_match_label = tk.Label(self.controls_frame, text="", font=("Calibri", 10), fg="#333")
+        self.points_match_label.pack(anchor='w')
+
         # --- Initialization that was misplaced ---
         # --- Arrow drawing state ---
         self.arrows = []  # List of (from_square, to_square)
@@ -301,7 +512,9 @@ class ChessGUI:
         self.theme_menu.pack(side='left')
 
         self.init_engine()
+        self.model.subscribe(self._on_board_changed)
         self.draw_board()
+        self.update_points_label()
         self.draw_palettes()
         # --- Ensure all event bindings are set at startup, not just on theme change ---
         self.canvas.bind('<ButtonPress-1>', self.on_piece_press)
@@ -311,113 +524,195 @@ class ChessGUI:
         self.canvas.bind('<B3-Motion>', self.on_right_drag)
         self.canvas.bind('<ButtonRelease-3>', self.on_right_release)
         self.root.bind('<Left>', self.go_back_one_move)
+        self.root.bind('<Right>', self.go_forward_one_move)
         self.canvas.focus_set()
         if not hasattr(self, 'clear_arrows_btn'):
             self.clear_arrows_btn = tk.Button(self.controls_frame, text="Clear Arrows", command=self.clear_arrows)
             self.clear_arrows_btn.pack(pady=2, anchor='w')
-        self.root.after(100, self._fen_sync_loop)
+        # Lines played are kept as a variation tree: step through them, save or load them as PGN
+        pgn_frame = tk.Frame(self.controls_frame)
+        pgn_frame.pack(pady=2, anchor='w')
+        tk.Button(pgn_frame, text="◀", width=2, command=self.go_back_one_move).pack(side='left')
+        tk.Button(pgn_frame, text="▶", width=2, command=self.go_forward_one_move).pack(side='left', padx=(0,6))
+        tk.Button(pgn_frame, text="Load PGN...", command=self.load_pgn).pack(side='left')
+        tk.Button(pgn_frame, text="Save PGN...", command=self.save_pgn).pack(side='left', padx=2)
+        # Batch analysis of a FEN file through the engine pool
+        self.batch_btn = tk.Button(self.controls_frame, text="Batch Analyse FEN File...", command=self.batch_analyse_file)
+        self.batch_btn.pack(pady=2, anchor='w')
+        self.batch_label = tk.Label(self.controls_frame, text="", font=("Calibri", 10), fg="#666")
+        self.batch_label.pack(anchor='w')
+        self.settings_btn = tk.Button(self.controls_frame, text="Engine Settings...", command=self.open_engine_settings)
+        self.settings_btn.pack(pady=2, anchor='w')
+        # Collapsible engine stats panel (nps, nodes, hashfull, ... of the last search)
+        self.stats_toggle_btn = tk.Button(self.controls_frame, text="▸ Engine stats", relief='flat', command=self.toggle_stats_panel)
+        self.stats_toggle_btn.pack(pady=(6,0), anchor='w')
+        self.stats_frame = tk.Frame(self.controls_frame)
+        self.stats_label = tk.Label(self.stats_frame, text="No search yet.", font=("Courier", 9), fg="#333", justify='left')
+        self.stats_label.pack(anchor='w')
+        self.log_metrics = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.stats_frame, text="Log searches to metrics.jsonl", variable=self.log_metrics).pack(anchor='w')
+        # UI profiling: times every Tk callback plus the drawing/legality hot paths (see ui_profiler)
+        self.profile_ui = tk.BooleanVar(value=ui_profiler.enabled)
+        self._ui_instrumented = False
+        profile_frame = tk.Frame(self.stats_frame)
+        profile_frame.pack(anchor='w')
+        tk.Checkbutton(profile_frame, text="Profile UI", variable=self.profile_ui, command=self.toggle_ui_profiling).pack(side='left')
+        tk.Button(profile_frame, text="Export...", command=self.export_ui_profile).pack(side='left', padx=4)
+        self.metrics_log = MetricsLog(METRICS_LOG_PATH)
         credit = tk.Label(self.root, text="App by Shishir", font=("Arial", 8), fg="#888", bg=self.root.cget('bg'))
         credit.place(relx=1.0, rely=1.0, anchor='se', x=-8, y=-4)
+        # Resizable board: square size follows the window; scale likely sizes in the background
+        self.root.bind('<Configure>', self.on_window_resize)
+        self.sprites.prewarm(PIECES, [snap_size(s) for s in range(40, 104, 8)])
+        if ui_profiler.enabled:
+            self.instrument_ui()
 
     def on_theme_change(self, *args):
         self.draw_board()
-        # Bind mouse events for drag-and-drop piece movement on the board (only once)
-        self.canvas.bind('<ButtonPress-1>', self.on_piece_press)
-        self.canvas.bind('<B1-Motion>', self.on_piece_drag)
-        self.canvas.bind('<ButtonRelease-1>', self.on_piece_release)
-        self.canvas.bind('<ButtonPress-3>', self.on_right_click)
-        self.canvas.bind('<B3-Motion>', self.on_right_drag)
-        self.canvas.bind('<ButtonRelease-3>', self.on_right_release)
-        # Bind left arrow key to go back one move (only once)
-        self.root.bind('<Left>', self.go_back_one_move)
-        self.canvas.focus_set()
-        # Clear Arrows button (only once)
-        if not hasattr(self, 'clear_arrows_btn'):
-            self.clear_arrows_btn = tk.Button(self.controls_frame, text="Clear Arrows", command=self.clear_arrows)
-            self.clear_arrows_btn.pack(pady=2, anchor='w')
-        # Start FEN sync loop
-        self.root.after(100, self._fen_sync_loop)
+        self.update_eval_bar(getattr(self, '_eval_result', None))
 
-        # --- App credit label ---
-        credit = tk.Label(self.root, text="App by Shishir", font=("Arial", 8), fg="#888", bg=self.root.cget('bg'))
-        credit.place(relx=1.0, rely=1.0, anchor='se', x=-8, y=-4)
-
-    def _fen_sync_loop(self):
-        # Keep FEN entry in sync with board (unless user is editing)
-        if self.fen_entry.focus_get() != self.fen_entry:
+    def _on_board_changed(self, board, analyse):
+        # Single listener for a batch of board changes (see BoardModel)
+        self.variations.sync(board)
+        self.draw_board()
+        self.refresh_eval_graph()
+        self.update_points_label()
+        # Left alone when the change came from the FEN entry itself (keeps its valid/invalid color)
+        if self.fen_var.get().strip() != board.fen():
             self.update_fen_entry()
-        self.root.after(500, self._fen_sync_loop)
+        if analyse:
+            self.calculate_and_show_best_move()
+
     def init_engine(self):
         if self.engine is None:
-            try:
-                self.engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
-            except Exception as e:
-                print(f"Failed to start Stockfish engine: {e}")
-                self.engine = None
+            self.engine = self.analysis_scheduler.ensure_engine()
+            if isinstance(self.engine, FallbackEngine):
+                self.status.config(text="Stockfish not found: using the built-in engine.", fg="#a06000")
     def reset_board(self):
+        self.end_points_match(stopped=True)
         self.board.reset()
         self.update_castling_vars_from_board()
-        self.draw_board()
-        self.calculate_and_show_best_move()
-        self.update_fen_entry()
+        self.model.changed()
 
     def clear_board(self):
         # Remove all pieces (including kings) for full custom setup
+        self.end_points_match(stopped=True)
         self.board.clear()
         self.update_castling_vars_from_board()
-        self.draw_board()
-        self.calculate_and_show_best_move()
-        self.update_fen_entry()
-    
-        # Decide who starts based on active_color
-        if (self.active_color.get() == 'w' and self.board.turn == chess.WHITE) or (self.active_color.get() == 'b' and self.board.turn == chess.BLACK):
-            # User to play first
-            pass
+        self.model.changed()
+
+    # --- Points Match: user vs engine, scoring captured material ---
+    def toggle_points_match(self):
+        if self.points_match is None:
+            self.start_points_match()
         else:
-            # Engine to play first
-            self.root.after(500, self.points_match_engine_move)
+            self.end_points_match(stopped=True)
 
-        import chess
-        import chess.engine
-        board_fen = self.board.fen()
+    def start_points_match(self):
+        problem = position_problem(self.board)
+        if problem is not None:
+            self.status.config(text=f"Cannot start Points Match: {problem.text}", fg="red")
+            return
+        self.init_engine()
+        if not self.engine:
+            self.status.config(text="Engine not available.", fg="red")
+            return
         try:
-            with self.engine.analysis(chess.Board(board_fen), chess.engine.Limit(time=1), multipv=3) as analysis:
-                best_move = None
-                best_capture_value = -1
-                for info in analysis:
-                    if 'pv' in info and info['pv']:
-                        move = info['pv'][0]
-                        captured = self.board.piece_at(move.to_square)
-                        value = self.get_piece_value(captured) if captured else 0
-                        if value > best_capture_value:
-                            best_capture_value = value
-                            best_move = move
-                if not best_move:
-                    # fallback: pick any legal move
-                    best_move = next(iter(self.board.legal_moves))
-            captured = self.board.piece_at(best_move.to_square)
-            self.board.push(best_move)
-            if captured:
-                self.points_match_engine_points += self.get_piece_value(captured)
-            self.points_match_moves += 1
-            self.update_points_match_tally()
-            self.draw_board()
-            if self.points_match_moves >= self.points_match_max_moves:
+            max_moves = max(1, int(self.points_match_moves_var.get()))
+        except ValueError:
+            max_moves = DEFAULT_MOVES
+        # The user plays the active color, the engine the other side; no hints during the match
+        user_color = chess.WHITE if self.active_color.get() == 'w' else chess.BLACK
+        self.points_match = PointsMatch(user_color, max_moves)
+        self.analysis_scheduler.cancel()
+        self.analysis_scheduler.background(())  # The eval graph waits until the match is over
+        self.stop_loading_animation()
+        self.best_move_arrow = None
+        self.clear_arrows()
+        self.second_move_label.config(text="")
+        self.pv_label.config(text="")
+        self.update_eval_bar(None)
+        self.status.unbind("<Button-1>")
+        self.points_match_btn.config(text="End Points Match")
+        self.update_points_match_tally()
+        if self.board.turn != user_color:
+            self.points_match_engine_move()
+        else:
+            self.status.config(text="Points Match: your move", fg="black")
+
+    def points_match_user_move(self, move):
+        # Drag-and-drop during a match: only legal moves for the user's side are played
+        match = self.points_match
+        if self._points_match_thinking or self.board.turn != match.user_color:
+            return False
+        if move.promotion is None and self.board.piece_type_at(move.from_square) == chess.PAWN \
+                and chess.square_rank(move.to_square) in (0, 7):
+            move.promotion = chess.QUEEN
+        if move not in self.board.legal_moves:
+            return False
+        captured = captured_piece(self.board, move)
+        match.play(self.board, move)
+        self.play_sound('capture' if captured else 'move')
+        self.model.changed(analyse=False)
+        self.model.flush()  # Now, so the dropped piece never shows on its old square for a frame
+        self.update_points_match_tally()
+        if match.finished(self.board):
+            self.end_points_match()
+        else:
+            self.points_match_engine_move()
+        return True
+
+    def points_match_engine_move(self):
+        # The engine picks its move off the UI thread, between the scheduler's searches; the UI stays responsive
+        match = self.points_match
+        board = self.board.copy()
+        self._points_match_thinking = True
+        self.status.config(text="Points Match: engine is thinking…", fg="black")
+        def apply(future):
+            self._points_match_thinking = False
+            if self.points_match is not match or self.board.fen() != board.fen():
+                return  # Match ended or board edited meanwhile
+            try:
+                move = future.result()
+            except Exception as e:
+                self.status.config(text=f"Engine error: {e}", fg="red")
+                self.end_points_match(stopped=True)
+                return
+            if move is None:
                 self.end_points_match()
                 return
-            # User's turn next
-        except Exception as e:
-            self.status.config(text=f"Engine error: {e}", fg="red")
-    def get_piece_value(self, piece):
-        if not piece:
-            return 0
-        values = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9}
-        return values.get(piece.piece_type, 0)
+            captured = captured_piece(self.board, move)
+            match.play(self.board, move)
+            self.play_sound('check' if self.board.is_check() else 'capture' if captured else 'move')
+            self.model.changed(analyse=False)
+            self.update_points_match_tally()
+            if match.finished(self.board):
+                self.end_points_match()
+            else:
+                self.status.config(text=f"Points Match: engine played {board.san(move)}, your move", fg="black")
+        future = self.analysis_scheduler.run_exclusive(choose_engine_move, board)
+        future.add_done_callback(lambda f: self.ui_queue.post(apply, f))
+
+    def update_points_match_tally(self):
+        match = self.points_match
+        self.points_match_label.config(text=match.tally_text() if match is not None else "")
+
+    def end_points_match(self, stopped=False):
+        match, self.points_match = self.points_match, None
+        self._points_match_thinking = False
+        self.points_match_btn.config(text="Start Points Match")
+        if match is None:
+            return
+        self.eval_graph.line = []  # Fill in the plies played during the match
+        self.refresh_eval_graph()
+        result = "Points Match stopped." if stopped else match.result_text(self.board)
+        self.points_match_label.config(text=f"You: {match.user_points}  Engine: {match.engine_points}")
+        self.status.config(text=result, fg="blue")
 
     def flip_board(self):
         self.flip = not self.flip
         self.draw_board()
-        self.update_fen_entry()
+        self.draw_palettes()
 
     def get_palette_pieces(self):
         # Returns (top_palette_pieces, bottom_palette_pieces) depending on flip
@@ -434,22 +729,20 @@ class ChessGUI:
             )
 
     def set_active_color(self):
+        self.end_points_match(stopped=True)
         self.board.turn = (self.active_color.get() == 'w')
-        self.draw_board()
-        self.calculate_and_show_best_move()
-        self.update_fen_entry()
+        self.model.changed()
 
     def set_castling(self):
         # Set castling rights based on checkboxes
+        self.end_points_match(stopped=True)
         self.board.clear_stack()
         self.board.castling_rights = 0
         if self.castle_wk.get(): self.board.castling_rights |= chess.BB_H1
         if self.castle_wq.get(): self.board.castling_rights |= chess.BB_A1
         if self.castle_bk.get(): self.board.castling_rights |= chess.BB_H8
         if self.castle_bq.get(): self.board.castling_rights |= chess.BB_A8
-        self.draw_board()
-        self.calculate_and_show_best_move()
-        self.update_fen_entry()
+        self.model.changed()
 
     def update_castling_vars_from_board(self):
         self.castle_wk.set(self.board.has_kingside_castling_rights(chess.WHITE))
@@ -458,155 +751,359 @@ class ChessGUI:
         self.castle_bq.set(self.board.has_queenside_castling_rights(chess.BLACK))
 
     def calculate_and_show_best_move(self):
+        if self.points_match is not None:
+            return  # No hints during a Points Match
         # Clear all arrows when calculating next move
-        self.clear_arrows()
         self.best_move_arrow = None  # For translucent best move arrow
+        self.clear_arrows()
+        # Whatever was queued or running is for an older position now
+        self.analysis_scheduler.cancel()
+        self.stop_loading_animation()
         # Remove all Points Mode logic and references to self.points_mode
         # (Points Mode is deprecated; Points Match is the new mode)
         # ...proceed to normal engine mode...
         # --- Normal engine mode ---
-        self.init_engine()
-        if not self.engine:
-            self.status.config(text="Engine not available.", fg="red")
+        # Enhanced legality checks for custom positions
+        problem = position_problem(self.board, self.active_color.get())
+        if problem is not None:
+            if problem.details:
+                # More specific error reporting in terminal
+                print(f"[ERROR] {problem.text} Possible reasons:")
+                for detail in problem.details:
+                    print(f"- {detail}")
+            colors = {'checkmate': "green", 'stalemate': "gold"}
+            self.status.config(text=problem.text, fg=colors.get(problem.kind, "red"))
             self.status.unbind("<Button-1>")
             self.update_eval_bar(None)
             return
-        # Enhanced legality checks for custom positions
-        try:
-            # --- Block engine analysis if user tries to calculate for the wrong side in check ---
-            user_color = self.active_color.get()
-            # If white is in check and user tries to analyze for black
-            if self.board.king(chess.WHITE) is not None and self.board.king(chess.BLACK) is not None:
-                if self.board.is_check() and self.board.turn == chess.WHITE and user_color == 'b':
-                    self.status.config(text="White in check!", fg="red")
-                    self.status.unbind("<Button-1>")
-                    self.update_eval_bar(None)
-                    return
-                # If black is in check and user tries to analyze for white
-                if self.board.is_check() and self.board.turn == chess.BLACK and user_color == 'w':
-                    self.status.config(text="Black in check!", fg="red")
-                    self.status.unbind("<Button-1>")
-                    self.update_eval_bar(None)
-                    return
-            if not self.board.is_valid():
-                # More specific error reporting in terminal
-                print("[ERROR] Board is not valid. Possible reasons:")
-                if self.board.king(chess.WHITE) is None:
-                    print("- Missing white king.")
-                if self.board.king(chess.BLACK) is None:
-                    print("- Missing black king.")
-                if self.board.is_check():
-                    print("- One or both kings are in check.")
-                print("- There may be other illegalities (e.g., too many pawns, both kings in check, etc.)")
-                self.status.config(text="Position is illegal!", fg="red")
-                self.status.unbind("<Button-1>")
-                self.update_eval_bar(None)
-                return
-            if self.board.king(chess.WHITE) is None or self.board.king(chess.BLACK) is None:
-                print("[ERROR] Missing king(s) on the board.")
-                self.status.config(text="Missing king(s)!", fg="red")
-                self.status.unbind("<Button-1>")
-                self.update_eval_bar(None)
-                return
-            if self.board.is_checkmate():
-                winner = "Black wins" if self.board.turn == chess.WHITE else "White wins"
-                self.status.config(text=winner, fg="green")
-                self.status.unbind("<Button-1>")
-                self.update_eval_bar(None)
-                return
-            if self.board.is_stalemate():
-                self.status.config(text="Stalemate", fg="gold")
-                self.status.unbind("<Button-1>")
-                self.update_eval_bar(None)
-                return
-            if not any(self.board.legal_moves):
-                print("[ERROR] No legal moves for the current side to move.")
-                self.status.config(text="No legal moves for the current side to move!", fg="red")
-                self.status.unbind("<Button-1>")
-                self.update_eval_bar(None)
-                return
-        except Exception as ex:
-            print(f"[ERROR] Exception during legality check: {ex}")
-            self.status.config(text="Position is not legal for engine analysis!", fg="red")
+        # Position in the opening book: answer instantly with the weighted book moves
+        book_moves = self.opening_book.moves(self.board)
+        if book_moves:
+            self.show_book_moves(self.board, book_moves)
+            return
+        # Few pieces left: exact result, best move and DTZ from the tablebase
+        tb_result = self.tablebase.probe(self.board)
+        if tb_result is not None and tb_result.best_move is not None:
+            self.show_tablebase_result(tb_result)
+            return
+        think_time = self.think_time.get() if hasattr(self, 'think_time') else 2
+        infinite = self.infinite_analysis.get()
+        # Revisited position: answer from the analysis cache (or the database) without searching again
+        cached = self.known_analysis(self.board, think_time) if not infinite else None
+        if cached is not None:
+            self._remember_analysis(self.board, cached)
+            self.show_best_moves(self.board, cached.best_move, cached.second_move, cached.as_result(), cached.depth)
+            self.speculate_next_positions(self.board, (cached.best_move, cached.second_move), think_time)
+            return
+        self.init_engine()
+        if not self.engine:
+            self.status.config(text="Engine not available.", fg="red")
             self.status.unbind("<Button-1>")
             self.update_eval_bar(None)
             return
         self._current_depth = None
         self.status.config(text="Calculating best move", fg="black")
         self.status.unbind("<Button-1>")
+        self.pv_label.config(text="")
         self.update_eval_bar(None)
         self.start_loading_animation()
-        def analyse_in_thread(board_fen, think_time):
+        # The scheduler delivers these on the Tk thread (through self.ui_queue)
+        def on_progress(request, info):
+            if info.get('depth') is not None:
+                self._current_depth = info['depth']
+        def on_update(request, outcome):
+            if self.live_analysis.get() or request.think_time is None:
+                self._publish_analysis(request, outcome, live=True)
+        def on_done(request, outcome):
+            self._store_outcome(request, outcome)
+            if self.log_metrics.get():
+                try:
+                    self.metrics_log.append(request.telemetry)
+                except OSError as e:
+                    print(f"[METRICS ERROR] {e}")
+            self._publish_analysis(request, outcome)
+            if request.think_time is not None and self.analysis_scheduler.is_current(request.generation):
+                self.speculate_next_positions(self.board, (outcome.best_move, outcome.second_move), request.think_time)
+        def on_error(request, exc):
+            if not self.analysis_scheduler.is_current(request.generation):
+                return
+            self.stop_loading_animation()
+            self.status.config(text="No best move found.", fg="red")
+            self.status.unbind("<Button-1>")
+            self.second_move_label.config(text="")
+            self.pv_label.config(text="")
+            self.update_eval_bar(None)
+        self.analysis_scheduler.submit(self.board, None if infinite else think_time, multipv=self.engine_profile.multipv,
+                                       on_progress=on_progress, on_update=on_update, on_done=on_done, on_error=on_error)
+
+    def known_analysis(self, board, think_time):
+        # Cached or stored analysis deep enough for think_time, or None.
+        # Database hits are copied into the in-memory cache.
+        cached = self.analysis_cache.lookup(board, think_time)
+        if cached is not None or self.analysis_db is None:
+            return cached
+        try:
+            # Never block the UI on another analyst's write to a shared file: busy counts as a miss
+            stored = self.analysis_db.lookup(board, timeout=UI_TIMEOUT)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                print(f"[DB ERROR] {e}")
+            return None
+        except sqlite3.Error as e:
+            print(f"[DB ERROR] {e}")
+            return None
+        if stored is None or stored.best_move not in board.legal_moves or not self._trusted_engine(stored.engine):
+            return None
+        if stored.think_time is None or stored.think_time < think_time:
+            needed = self.analysis_cache.expected_depth(think_time)
+            if needed is None or stored.depth < needed:
+                return None
+        return self.analysis_cache.store(board, stored.best_move, stored.second_move, stored.score, stored.depth,
+                                         stored.think_time if stored.think_time is not None else think_time)
+
+    def _remember_analysis(self, board, analysis):
+        # Keep the analysis on its variation tree node, for stepping back through the line
+        node = self.variations.node_for(board)
+        if node is not None:
+            node.analysis = analysis
+
+    def _store_outcome(self, request, outcome):
+        if outcome.best_move is not None:
+            searched = request.searched_time
+            entry = self.analysis_cache.store(request.board, outcome.best_move, outcome.second_move, outcome.score, outcome.depth, searched)
+            self._remember_analysis(request.board, entry)
+            self._record_graph_point(request.board, outcome.score, outcome.depth, searched)
+            if self.analysis_db is not None:
+                # Off the Tk thread: the write may wait for another user's lock on a shared file
+                self.analysis_scheduler.loop.run_blocking(self._save_outcome, outcome, searched, self.analysis_scheduler.engine_name)
+
+    def _trusted_engine(self, engine_name):
+        # Stored rows only count if the running engine (when known) produced them; never the built-in engine's
+        if engine_name == FALLBACK_ENGINE_NAME:
+            return False
+        current = self.analysis_scheduler.engine_name
+        return engine_name is None or current is None or engine_name == current
+
+    def _save_outcome(self, outcome, think_time, engine_name):
+        if engine_name == FALLBACK_ENGINE_NAME:
+            return  # Too weak to share with analysts running Stockfish
+        try:
+            self.analysis_db.store(outcome, think_time, engine_name)
+        except sqlite3.Error as e:
+            print(f"[DB ERROR] {e}")
+
+    def _board_after(self, board, move):
+        # Same position play_best_move() produces: the move, then the turn forced to the selected color
+        child = board.copy()
+        child.push(move)
+        child.turn = (self.active_color.get() == 'w')
+        return child
+
+    def speculate_next_positions(self, board, moves, think_time):
+        # Use idle engine time on what the user will probably ask next: playing the
+        # best/second move or undoing the last one. Results only land in the cache.
+        if not self.speculative_analysis.get() or self.points_match is not None:
+            return
+        candidates = [self._board_after(board, move) for move in moves if move is not None and move in board.legal_moves]
+        if board.move_stack:
+            parent = board.copy()
+            parent.pop()
+            candidates.append(parent)
+        boards = [b for b in candidates
+                  if position_problem(b, self.active_color.get()) is None
+                  and not self.opening_book.moves(b)
+                  and not self.tablebase.covers(b)
+                  and self.known_analysis(b, think_time) is None]
+        if boards:
+            self.analysis_scheduler.speculate(boards, think_time, multipv=self.engine_profile.multipv, on_done=self._store_outcome)
+
+    def open_engine_settings(self):
+        # Dialog for Threads/Hash/MultiPV/SyzygyPath; saved values persist between runs
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Engine Settings")
+        dialog.transient(self.root)
+        from engine_profiles import free_memory_mb
+        from engine_pool import available_cores
+        free = free_memory_mb()
+        tk.Label(dialog, text=f"Detected: {available_cores()} cores, {free if free is not None else '?'} MB free memory", fg="#666").grid(row=0, column=0, columnspan=2, sticky='w', padx=8, pady=(8,4))
+        fields = [("Threads", "Threads"), ("Hash", "Hash (MB)"), ("MultiPV", "Lines (MultiPV)"), ("SyzygyPath", "Syzygy path")]
+        entries = {}
+        options = self.engine_profile.options
+        for i, (name, label) in enumerate(fields, 1):
+            tk.Label(dialog, text=label).grid(row=i, column=0, sticky='w', padx=8, pady=2)
+            var = tk.StringVar(value=str(options.get(name, "")))
+            tk.Entry(dialog, textvariable=var, width=40 if name == "SyzygyPath" else 10).grid(row=i, column=1, sticky='w', padx=8, pady=2)
+            entries[name] = var
+        def auto_detect():
+            for name, value in self.engine_profile.detected.items():
+                entries[name].set(str(value))
+        def save():
+            values = {}
             try:
-                import chess
-                board = chess.Board(board_fen)
-                multipv_infos = {}
-                # Use analysis context manager for live info
-                with self.engine.analysis(board, chess.engine.Limit(time=think_time), multipv=2) as analysis:
-                    for info in analysis:
-                        if info.get('depth') is not None:
-                            self._current_depth = info['depth']
-                        # Collect by multipv number if present
-                        if 'multipv' in info and info.get('pv'):
-                            multipv_infos[info['multipv']] = info.copy()
-                # After analysis, get the best and second best moves from multipv_infos
-                best_move = None
-                second_move = None
-                best_move_san = None
-                second_move_san = None
-                result = None
-                # multipv=1 is best, multipv=2 is second best
-                if 1 in multipv_infos:
-                    info1 = multipv_infos[1]
-                    result = info1
-                    if info1.get('pv'):
-                        best_move = info1['pv'][0]
-                        best_move_san = board.san(best_move)
-                if 2 in multipv_infos:
-                    info2 = multipv_infos[2]
-                    if info2.get('pv'):
-                        second_move = info2['pv'][0]
-                        second_move_san = board.san(second_move)
-                def update():
-                    self.stop_loading_animation()
-                    depth_str = f"  Depth: {self._current_depth}" if self._current_depth is not None else ""
-                    if best_move_san:
-                        self.status.config(text=f"Best move: {best_move_san}{depth_str}", fg="blue")
-                        self.status.bind("<Button-1>", lambda e: self.play_best_move(best_move))
-                        # Show translucent arrow for best move
-                        from_sq = best_move.from_square
-                        to_sq = best_move.to_square
-                        self.best_move_arrow = (from_sq, to_sq)
-                    else:
-                        self.status.config(text="No best move found.", fg="red")
-                        self.status.unbind("<Button-1>")
-                        self.best_move_arrow = None
-                    # Show second best move below, smaller font, and make it clickable
-                    if second_move_san:
-                        self.second_move_label.config(text=f"Second best: {second_move_san}")
-                        self.second_move_label.bind("<Button-1>", lambda e, m=second_move: self.play_best_move(m))
-                    else:
-                        self.second_move_label.config(text="")
-                        self.second_move_label.unbind("<Button-1>")
-                    self.update_eval_bar(result)
-                    self.draw_board()  # Redraw to show best move arrow
-                self.root.after(0, update)
-            except Exception as e:
-                def update():
-                    self.stop_loading_animation()
-                    self.status.config(text="No best move found.", fg="red")
-                    self.status.unbind("<Button-1>")
-                    self.second_move_label.config(text="")
-                    self.update_eval_bar(None)
-                self.root.after(0, update)
-        think_time = self.think_time.get() if hasattr(self, 'think_time') else 2
-        threading.Thread(target=analyse_in_thread, args=(self.board.fen(), think_time), daemon=True).start()
+                for name in ("Threads", "Hash", "MultiPV"):
+                    values[name] = int(entries[name].get())
+                    if values[name] < 1:
+                        raise ValueError(f"{name} must be at least 1")
+            except ValueError as e:
+                messagebox.showerror("Engine Settings", f"Invalid value: {e}", parent=dialog)
+                return
+            values["SyzygyPath"] = entries["SyzygyPath"].get().strip()
+            self.engine_profile.set_options(values)
+            try:
+                self.engine_profile.save()
+            except OSError as e:
+                messagebox.showerror("Engine Settings", f"Could not save settings: {e}", parent=dialog)
+            self.analysis_scheduler.apply_profile(self.engine_profile)
+            self.tablebase.set_path(values["SyzygyPath"] or SYZYGY_PATH)
+            dialog.destroy()
+            self.calculate_and_show_best_move()
+        buttons = tk.Frame(dialog)
+        buttons.grid(row=len(fields)+1, column=0, columnspan=2, sticky='e', padx=8, pady=8)
+        tk.Button(buttons, text="Auto-detect", command=auto_detect).pack(side='left', padx=2)
+        tk.Button(buttons, text="Cancel", command=dialog.destroy).pack(side='left', padx=2)
+        tk.Button(buttons, text="Save", command=save).pack(side='left', padx=2)
+
+    def toggle_stats_panel(self):
+        if self.stats_frame.winfo_ismapped():
+            self.stats_frame.pack_forget()
+            self.stats_toggle_btn.config(text="▸ Engine stats")
+        else:
+            self.stats_frame.pack(after=self.stats_toggle_btn, anchor='w', padx=(12,0))
+            self.stats_toggle_btn.config(text="▾ Engine stats")
+
+    def update_stats_panel(self, stats):
+        def fmt(value, unit=""):
+            return "-" if value is None else f"{value:,}{unit}"
+        def secs(value):
+            return "-" if value is None else f"{value*1000:.0f} ms"
+        hashfull = stats.get('hashfull')
+        lines = [
+            f"Depth     {fmt(stats.get('depth'))}/{fmt(stats.get('seldepth'))}",
+            f"Nodes     {fmt(stats.get('nodes'))}",
+            f"NPS       {fmt(stats.get('nps'))}",
+            f"Hash      {'-' if hashfull is None else f'{hashfull/10:.1f}%'}",
+            f"TB hits   {fmt(stats.get('tbhits'))}",
+            f"Time      {secs(stats.get('elapsed'))}",
+            f"First PV  {secs(stats.get('time_to_first_pv'))}",
+            f"Final dep {secs(stats.get('time_to_final_depth'))}",
+        ]
+        self.stats_label.config(text="\n".join(lines))
+
+    def instrument_ui(self):
+        # Time the usual suspects for lag individually, not just the callbacks that call them
+        if self._ui_instrumented:
+            return
+        self._ui_instrumented = True
+        ui_profiler.instrument(self, ("draw_board", "draw_arrows", "draw_palettes", "update_points_label", "update_eval_bar",
+                                      "calculate_and_show_best_move", "show_best_moves",
+                                      "known_analysis", "draw_eval_graph", "refresh_eval_graph"))
+        ui_profiler.instrument(sys.modules[type(self).__module__], ("position_problem",))
+        ui_profiler.instrument(self.opening_book, ("moves",), prefix="OpeningBook.")
+        ui_profiler.instrument(self.tablebase, ("probe", "covers"), prefix="SyzygyTablebase.")
+
+    def toggle_ui_profiling(self):
+        if self.profile_ui.get():
+            self.instrument_ui()
+            ui_profiler.enable(cprofile=ui_profiler.cprofile)
+        else:
+            ui_profiler.disable()
+
+    def export_ui_profile(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(title="Export UI profile", initialfile=os.path.basename(PROFILE_OUT_PATH),
+                                            defaultextension=".json", filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            ui_profiler.export(path)
+        except OSError as e:
+            messagebox.showerror("Export UI profile", f"Could not write {path}: {e}")
+
+    def stop_analysis(self):
+        # End the running search now and show what it found so far
+        self.analysis_scheduler.stop_current()
+
+    def _publish_analysis(self, request, outcome, live=False):
+        # Drop results that arrived after the position changed again
+        if not self.analysis_scheduler.is_current(request.generation):
+            return
+        self.update_stats_panel(request.telemetry.snapshot())
+        self.show_best_moves(request.board, outcome.best_move, outcome.second_move, outcome.result, outcome.depth, live=live)
+
+    def show_best_moves(self, board, best_move, second_move, result, depth, live=False):
+        # Display best/second best move, best move arrow and eval bar (runs on the Tk thread).
+        # live=True is an intermediate result of a search that is still running.
+        self.stop_loading_animation()
+        best_move_san = board.san(best_move) if best_move else None
+        second_move_san = board.san(second_move) if second_move else None
+        depth_str = f"  Depth: {depth}" if depth is not None else ""
+        if best_move_san:
+            self.status.config(text=f"Best move: {best_move_san}{depth_str}{' …' if live else ''}", fg="#4a6fa5" if live else "blue")
+            self.status.bind("<Button-1>", lambda e: self.play_best_move(best_move))
+            # Show translucent arrow for best move
+            self.best_move_arrow = (best_move.from_square, best_move.to_square)
+        else:
+            self.status.config(text="No best move found.", fg="red")
+            self.status.unbind("<Button-1>")
+            self.best_move_arrow = None
+        # Show second best move below, smaller font, and make it clickable
+        if second_move_san:
+            self.second_move_label.config(text=f"Second best: {second_move_san}")
+            self.second_move_label.bind("<Button-1>", lambda e, m=second_move: self.play_best_move(m))
+        else:
+            self.second_move_label.config(text="")
+            self.second_move_label.unbind("<Button-1>")
+        pv = result.get('pv') if result else None
+        try:
+            self.pv_label.config(text=board.variation_san(pv[:10]) if pv else "")
+        except ValueError:
+            self.pv_label.config(text="")
+        self.update_eval_bar(result)
+        self.draw_arrows()  # Only the best move arrow changed
+
+    def show_book_moves(self, board, book_moves):
+        # Book hit: heaviest move is "best", the next one "second best"; weights shown as percentages
+        best = book_moves[0]
+        self.stop_loading_animation()
+        self.status.config(text=f"Book move: {board.san(best.move)} ({best.share:.0%})", fg="blue")
+        self.status.bind("<Button-1>", lambda e: self.play_best_move(best.move))
+        self.best_move_arrow = (best.move.from_square, best.move.to_square)
+        if len(book_moves) > 1:
+            others = ", ".join(f"{board.san(m.move)} ({m.share:.0%})" for m in book_moves[1:4])
+            second = book_moves[1].move
+            self.second_move_label.config(text=f"Also in book: {others}")
+            self.second_move_label.bind("<Button-1>", lambda e, m=second: self.play_best_move(m))
+        else:
+            self.second_move_label.config(text="")
+            self.second_move_label.unbind("<Button-1>")
+        self.pv_label.config(text="")
+        self.update_eval_bar(None)
+        self.draw_arrows()  # Show best move arrow
+
+    def show_tablebase_result(self, tb_result):
+        board = tb_result.board
+        self.stop_loading_animation()
+        best_move = tb_result.best_move
+        self.status.config(text=f"Tablebase: {tb_result.text}  Best move: {board.san(best_move)}  DTZ: {abs(tb_result.dtz)}", fg="blue")
+        self.status.bind("<Button-1>", lambda e: self.play_best_move(best_move))
+        self.best_move_arrow = (best_move.from_square, best_move.to_square)
+        if tb_result.second_move is not None:
+            second = tb_result.second_move
+            self.second_move_label.config(text=f"Second best: {board.san(second)}")
+            self.second_move_label.bind("<Button-1>", lambda e, m=second: self.play_best_move(m))
+        else:
+            self.second_move_label.config(text="")
+            self.second_move_label.unbind("<Button-1>")
+        self.pv_label.config(text="")
+        self.update_eval_bar(tb_result.as_result())
+        self.draw_arrows()  # Show best move arrow
 
     def update_eval_bar(self, engine_result):
         '''Draws a chess.com-style evaluation bar on self.eval_bar_canvas, using the current board theme colors.'''
+        self._eval_result = engine_result  # Kept so a resize can redraw the bar
         self.eval_bar_canvas.delete("all")
-        bar_height = 480
-        bar_top = 60
+        bar_height = 8 * self.square_size
+        bar_top = self.square_size
         bar_left = 5
         bar_width = 20
 
@@ -630,6 +1127,21 @@ class ChessGUI:
             self.eval_bar_canvas.create_rectangle(bar_left, bar_top, bar_left+bar_width, bar_top+bar_height, fill="#BBB", outline="#AAA")
             self.eval_bar_canvas.create_text(bar_left+bar_width//2, bar_top+bar_height//2, text="?", font=("Arial", 16))
             return
+        # Exact tablebase result (WDL from White's point of view)
+        if engine_result.get('tablebase') is not None:
+            wdl = engine_result['tablebase']
+            if wdl == 2:
+                self.eval_bar_canvas.create_rectangle(bar_left, bar_top, bar_left+bar_width, bar_top+bar_height, fill=color_mate_white, outline="#AAA")
+                self.eval_bar_canvas.create_text(bar_left+bar_width//2, bar_top+20, text="TB", font=("Arial", 10), fill="#000")
+            elif wdl == -2:
+                self.eval_bar_canvas.create_rectangle(bar_left, bar_top, bar_left+bar_width, bar_top+bar_height, fill=color_mate_black, outline="#AAA")
+                self.eval_bar_canvas.create_text(bar_left+bar_width//2, bar_top+bar_height-20, text="TB", font=("Arial", 10), fill="#FFF")
+            else:
+                # Draw (including cursed wins / blessed losses)
+                self.eval_bar_canvas.create_rectangle(bar_left, bar_top, bar_left+bar_width, bar_top+bar_height//2, fill=color_white_adv, outline="#AAA")
+                self.eval_bar_canvas.create_rectangle(bar_left, bar_top+bar_height//2, bar_left+bar_width, bar_top+bar_height, fill=color_black_adv, outline="#AAA")
+                self.eval_bar_canvas.create_text(bar_left+bar_width//2, bar_top+bar_height//2-10, text="TB=", font=("Arial", 9), fill="#000")
+            return
         score = engine_result['score'].white()
         # Handle mate scores
         if score.is_mate():
@@ -699,9 +1211,7 @@ class ChessGUI:
                 self.play_sound('move')
             # Force turn to selected color for custom play
             self.board.turn = (self.active_color.get() == 'w')
-            self.draw_board()
-            self.calculate_and_show_best_move()
-            self.update_fen_entry()
+            self.model.changed()
         else:
             self.status.config(text="Move not legal for current side to move!", fg="red")
             self.status.unbind("<Button-1>")
@@ -710,130 +1220,68 @@ class ChessGUI:
         import os
         script_dir = os.path.dirname(os.path.abspath(__file__))
         pieces_dir = os.path.join(script_dir, "pieces")
-        print(f"Script directory: {script_dir}")
         print(f"Pieces directory: {pieces_dir}")
-        for piece in PIECES:
-            if piece.isupper():
-                filename = f"w{piece.upper()}.png"  # White pieces
-            else:
-                filename = f"b{piece.upper()}.png"  # Black pieces
-            path = os.path.join(pieces_dir, filename)
-            print(f"Loading: {path}")  # Debug print
-            try:
-                img = Image.open(path).resize((60, 60), Image.LANCZOS)
-                PIECE_IMAGES[piece] = ImageTk.PhotoImage(img)
-            except FileNotFoundError:
-                print(f"ERROR: Could not find image file: {path}")
-                PIECE_IMAGES[piece] = None
-
-    def draw_board(self, dragging_piece=None, dragging_pos=None):
-        # Use selected theme
-        theme = self.BOARD_THEMES.get(self.board_theme_name.get(), ("#F0D9B5", "#B58863"))
-        colors = [theme[0], theme[1]]
-        self.canvas.delete("all")
-        # Draw squares and pieces
-        for row in range(8):
-            for col in range(8):
-                draw_col = 7 - col if getattr(self, 'flip', False) else col
-                draw_row = 7 - row if getattr(self, 'flip', False) else row
-                x1, y1 = draw_col*60, draw_row*60
-                x2, y2 = x1+60, y1+60
-                color = colors[((row+col)%2)]
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, tags="square")
-                square = chess.square(col, 7-row)
-                piece = self.board.piece_at(square)
-                if piece:
-                    if dragging_piece and dragging_piece['square'] == square:
-                        continue
-                    img = PIECE_IMAGES[piece.symbol()]
-                    self.canvas.create_image(x1+30, y1+30, image=img, tags="piece")
-        # Draw the dragged piece on top, following the mouse
-        if dragging_piece and dragging_pos:
-            img = PIECE_IMAGES[dragging_piece['piece'].symbol()]
-            self.canvas.create_image(dragging_pos[0], dragging_pos[1], image=img, tags="dragged_piece")
-
-        # Draw arrows
-        def square_center(col, row):
-            return col*60+30, row*60+30
-        # Draw user arrows
-        for from_sq, to_sq in self.arrows:
-            from_col, from_row = chess.square_file(from_sq), 7 - chess.square_rank(from_sq)
-            to_col, to_row = chess.square_file(to_sq), 7 - chess.square_rank(to_sq)
-            if getattr(self, 'flip', False):
-                from_col, from_row = 7 - from_col, 7 - from_row
-                to_col, to_row = 7 - to_col, 7 - to_row
-            x1, y1 = square_center(from_col, from_row)
-            x2, y2 = square_center(to_col, to_row)
-            self._draw_arrow(x1, y1, x2, y2, color="#2600ff", width=5)
-        # Draw best move thin light arrow if present
-        if hasattr(self, 'best_move_arrow') and self.best_move_arrow:
-            from_sq, to_sq = self.best_move_arrow
-            from_col, from_row = chess.square_file(from_sq), 7 - chess.square_rank(from_sq)
-            to_col, to_row = chess.square_file(to_sq), 7 - chess.square_rank(to_sq)
-            if getattr(self, 'flip', False):
-                from_col, from_row = 7 - from_col, 7 - from_row
-                to_col, to_row = 7 - to_col, 7 - to_row
-            x1, y1 = square_center(from_col, from_row)
-            x2, y2 = square_center(to_col, to_row)
-            # Draw a thin, light blue arrow (no dash)
-            self._draw_arrow(x1, y1, x2, y2, color="#99ccff", width=5)
-        # Draw arrow being dragged
-        if self.arrow_drag is not None:
-            x1, y1 = square_center(*self.arrow_drag['from'])
-            x2, y2 = square_center(*self.arrow_drag['to'])
-            self._draw_arrow(x1, y1, x2, y2, color="#1100ff", width=3, dash=(4,2))
-
-        # Draw rank (1-8) and file (a-h) labels
-        files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
-        if getattr(self, 'flip', False):
-            files = files[::-1]
-            ranks = ['1', '2', '3', '4', '5', '6', '7', '8']
-        else:
-            ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
-        # Files (a-h) below the board
-        for i, file_char in enumerate(files):
-            self.canvas.create_text(i*60+30, 480-8, text=file_char, font=("Arial", 10), fill="#444")
-        # Ranks (1-8) left of the board
-        for i, rank_char in enumerate(ranks):
-            self.canvas.create_text(8, i*60+30, text=rank_char, font=("Arial", 10), fill="#444")
+        # Pre-scaled sprites come from the disk cache; only unseen sizes are resampled
+        if not hasattr(self, 'sprites'):
+            self.sprites = SpriteCache(pieces_dir)
+        PIECE_IMAGES.clear()
+        PIECE_IMAGES.update(self.sprites.images_for(PIECES, self.square_size))
+
+    def on_window_resize(self, event):
+        # Root <Configure> also fires for every child widget; debounce the real resizes
+        if event.widget is not self.root:
+            return
+        if getattr(self, '_resize_after_id', None):
+            self.root.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.root.after(120, self._apply_window_size)
 
-        self.update_points_label()
+    def _apply_window_size(self):
+        self._resize_after_id = None
         self.root.update_idletasks()
+        window = (self.root.winfo_width(), self.root.winfo_height())
+        # The first configure is the natural layout at the default size; only react to real resizes
+        if getattr(self, '_window_size', None) in (None, window):
+            self._window_size = window
+            return
+        self._window_size = window
+        # Board column = palette + 8 squares + palette; the eval bar, scrollbar and controls keep their width
+        other_width = self.eval_bar_canvas.winfo_width() + self.left_scrollbar.winfo_width() + self.controls_frame.winfo_reqwidth()
+        size = snap_size(min((self.root.winfo_width() - other_width) / 8, self.root.winfo_height() / 10))
+        if size != self.square_size:
+            self.resize_board(size)
+
+    def resize_board(self, square_size):
+        self.square_size = square_size
+        self.load_images()
+        board_px = 8 * square_size
+        self.top_palette.config(width=board_px, height=square_size)
+        self.bottom_palette.config(width=board_px, height=square_size)
+        self.canvas.config(width=board_px, height=board_px)
+        self.left_canvas.config(width=board_px, height=10 * square_size)
+        self.eval_bar_canvas.config(height=10 * square_size)
+        self.eval_graph_canvas.config(width=board_px)
+        self.draw_eval_graph()
+        self.renderer.resize(square_size)
+        self.draw_board()
         self.draw_palettes()
+        self.update_eval_bar(getattr(self, '_eval_result', None))
 
-        # --- Always update FEN entry after any board change ---
-        if getattr(self, '_sync_fen_after_move', False):
-            self.update_fen_entry()
+    def draw_board(self):
+        # Use selected theme
+        theme = self.BOARD_THEMES.get(self.board_theme_name.get(), ("#F0D9B5", "#B58863"))
+        # Only squares whose piece changed (or everything, after a flip/theme change) are touched
+        self.renderer.render(self.board, getattr(self, 'flip', False), theme,
+                             arrows=self.arrows,
+                             best_move_arrow=getattr(self, 'best_move_arrow', None),
+                             arrow_drag=self.arrow_drag)
 
-    def _draw_arrow(self, x1, y1, x2, y2, color="#1201ff", width=5, dash=None):
-        # If the arrow is a knight move, draw an L-shaped arrow
-        def is_knight_move(x1, y1, x2, y2):
-            dx = abs(x2 - x1)
-            dy = abs(y2 - y1)
-            # Each square is 60x60, so knight moves are (1,2) or (2,1) squares
-            return (dx == 60 and dy == 120) or (dx == 120 and dy == 60)
-
-        if is_knight_move(x1, y1, x2, y2):
-            # Draw an L-shaped arrow for knight moves
-            # Determine the intermediate corner point
-            if abs(x2 - x1) == 60:
-                # Horizontal first, then vertical
-                mid_x = x2
-                mid_y = y1
-            else:
-                # Vertical first, then horizontal
-                mid_x = x1
-                mid_y = y2
-            # Draw two segments: start to corner, corner to end
-            self.canvas.create_line(x1, y1, mid_x, mid_y, fill=color, width=width, capstyle=tk.ROUND, dash=dash)
-            self.canvas.create_line(mid_x, mid_y, x2, y2, fill=color, width=width, arrow=tk.LAST, arrowshape=(16,20,6), capstyle=tk.ROUND, dash=dash)
-        else:
-            # Draw main line for non-knight moves
-            self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width, arrow=tk.LAST, arrowshape=(16,20,6), capstyle=tk.ROUND, dash=dash)
+    def draw_arrows(self):
+        # Arrow-only refresh (right-drag, best move arrow)
+        self.renderer.render_arrows(self.arrows, getattr(self, 'best_move_arrow', None), self.arrow_drag)
 
     def clear_arrows(self):
         self.arrows.clear()
-        self.draw_board()
+        self.draw_arrows()
 
     def update_points_label(self):
         # Standard chess piece values
@@ -879,7 +1327,7 @@ class ChessGUI:
         self.points_label.config(text=text)
 
     def on_piece_press(self, event):
-        col, row = event.x // 60, event.y // 60
+        col, row = event.x // self.square_size, event.y // self.square_size
         # Adjust for flip
         if getattr(self, 'flip', False):
             board_col = 7 - col
@@ -902,27 +1350,38 @@ class ChessGUI:
 
     def on_piece_drag(self, event):
         if hasattr(self, 'drag_data') and self.drag_data and self.drag_data.get('dragging'):
-            self.draw_board(dragging_piece=self.drag_data, dragging_pos=(event.x, event.y))
+            # Only the dragged sprite moves; the rest of the board is left alone
+            if not self.drag_data.get('sprite'):
+                self.renderer.begin_drag(self.drag_data['square'], self.drag_data['piece'].symbol(), event.x, event.y)
+                self.drag_data['sprite'] = True
+            else:
+                self.renderer.move_drag(event.x, event.y)
 
     def on_piece_release(self, event):
         if not hasattr(self, 'drag_data') or not self.drag_data or not self.drag_data.get('dragging'):
             return
+        self.renderer.end_drag()
         from_square = self.drag_data['square']
-        to_col, to_row = event.x // 60, event.y // 60
+        to_col, to_row = event.x // self.square_size, event.y // self.square_size
         if getattr(self, 'flip', False):
             board_col = 7 - to_col
             board_row = 7 - to_row
         else:
             board_col = to_col
             board_row = to_row
+        if self.points_match is not None:
+            # During a match pieces move by the rules; anything else snaps back
+            if 0 <= to_col < 8 and 0 <= to_row < 8:
+                self.points_match_user_move(chess.Move(from_square, chess.square(board_col, 7 - board_row)))
+            self.drag_data = None
+            return
         # If released outside the board, remove the piece
         if not (0 <= to_col < 8 and 0 <= to_row < 8):
             self.board.remove_piece_at(from_square)
-            self.draw_board()
-            self.calculate_and_show_best_move()
+            self.model.changed()
+            self.model.flush()  # Now, so the dropped piece never shows on its old square for a frame
             self.play_sound('move')
             self.drag_data = None
-            self.update_fen_entry()  # Always sync FEN after manual edit
             return
         to_square = chess.square(board_col, 7 - board_row)
         # Allow moving any piece to any square (custom setup style)
@@ -932,8 +1391,8 @@ class ChessGUI:
         self.board.remove_piece_at(to_square)
         self.board.remove_piece_at(from_square)
         self.board.set_piece_at(to_square, moving_piece)
-        self.draw_board()
-        self.calculate_and_show_best_move()
+        self.model.changed()
+        self.model.flush()  # Now, so the dropped piece never shows on its old square for a frame
         # Play sound: check, capture, or move
         if self.board.is_check():
             self.play_sound('check')
@@ -942,87 +1401,53 @@ class ChessGUI:
         else:
             self.play_sound('move')
         self.drag_data = None
-        self.update_fen_entry()  # Always sync FEN after manual edit
 
-    def update_best_move(self):
-        import threading
-        if not self.engine:
-            self.status.config(text="Engine not available.")
+    def batch_analyse_file(self):
+        # Analyse every FEN or EPD record in a text file (one per line) across all cores, writing <file>.analysis.jsonl
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(title="FEN file", filetypes=[("FEN/EPD files", "*.fen *.epd *.txt"), ("All files", "*.*")])
+        if not path:
             return
-        # Enhanced legality checks for custom positions
-        try:
-            if not self.board.is_valid():
-                self.status.config(text="Position is illegal!", fg="red")
-                self.status.unbind("<Button-1>")
-                return
-            if self.board.king(chess.WHITE) is None or self.board.king(chess.BLACK) is None:
-                self.status.config(text="Missing king(s)!", fg="red")
-                self.status.unbind("<Button-1>")
-                return
-            if self.board.is_checkmate():
-                winner = "Black wins" if self.board.turn == chess.WHITE else "White wins"
-                self.status.config(text=winner, fg="green")
-                self.status.unbind("<Button-1>")
-                return
-            if self.board.is_stalemate():
-                self.status.config(text="Stalemate", fg="gold")
-                self.status.unbind("<Button-1>")
-                return
-            if not any(self.board.legal_moves):
-                self.status.config(text="No legal moves for the current side to move!", fg="red")
-                self.status.unbind("<Button-1>")
-                return
-        except Exception:
-            self.status.config(text="Position is not legal for engine analysis!", fg="red")
-            self.status.unbind("<Button-1>")
-            return
-        self.status.config(text="Calculating best move", fg="black")
-        self.status.unbind("<Button-1>")
-        def analyse_in_thread(board_fen):
+        think_time = self.think_time.get()
+        out_path = os.path.splitext(path)[0] + ".analysis.jsonl"
+        self.batch_btn.config(state='disabled')
+        def run():
+            import json
+            done = 0
             try:
-                import chess
-                board = chess.Board(board_fen)
-                result = self.engine.analyse(board, chess.engine.Limit(time=0.5))
-                move = result['pv'][0]
-                move_san = board.san(move)
-                def update():
-                    self.status.config(text=f"Best move: {move_san}", fg="blue")
-                    self.status.bind("<Button-1>", lambda e: self.play_best_move(move))
-                self.root.after(0, update)
+                with open(path) as f, open(out_path, "w") as out, EnginePool(STOCKFISH_PATH) as pool:
+                    fens = (line for line in f if line.strip())
+                    for r in pool.analyse_many(fens, chess.engine.Limit(time=think_time)):
+                        out.write(json.dumps(r.to_dict()) + "\n")
+                        done += 1
+                        self.ui_queue.post(lambda n=done: self.batch_label.config(text=f"Batch: {n} positions analysed"))
+                message = f"Batch done: {done} positions -> {os.path.basename(out_path)}"
             except Exception as e:
-                def update():
-                    self.status.config(text="No best move found.", fg="red")
-                    self.status.unbind("<Button-1>")
-                self.root.after(0, update)
-        threading.Thread(target=analyse_in_thread, args=(self.board.fen(),), daemon=True).start()
+                message = f"Batch failed: {e}"
+            def finish():
+                self.batch_label.config(text=message)
+                self.batch_btn.config(state='normal')
+            self.ui_queue.post(finish)
+        # The engines run on the shared engine loop; this thread only reads the file and writes results
+        threading.Thread(target=run, name="batch-analysis", daemon=True).start()
 
     def on_closing(self):
-        if hasattr(self, 'engine') and self.engine:
+        if ui_profiler.started is not None:
             try:
-                self.engine.quit()
-            except Exception:
-                pass
+                print(f"UI profile written to {ui_profiler.export()}")
+            except OSError as e:
+                print(f"[PROFILE ERROR] {e}")
+        # The scheduler owns the engine process
+        self.analysis_scheduler.close()
+        self.engine = None
+        self.opening_book.close()
+        self.tablebase.close()
+        self.sounds.close()
+        if self.analysis_db is not None:
+            # After any pending writes, which run on the same worker
+            self.analysis_scheduler.loop.run_blocking(self.analysis_db.close)
         self.root.destroy()
 
-    def draw_palettes(self):
-        # Draw palettes according to board orientation
-        top_pieces, bottom_pieces = self.get_palette_pieces()
-        self.top_palette.delete("all")
-        for i, piece in enumerate(top_pieces):
-            img = PIECE_IMAGES[piece]
-            self.top_palette.create_image(i*80+40, 30, image=img, tags=(f"top_{piece}", "palette_piece"))
-        self.bottom_palette.delete("all")
-        for i, piece in enumerate(bottom_pieces):
-            img = PIECE_IMAGES[piece]
-            self.bottom_palette.create_image(i*80+40, 30, image=img, tags=(f"bottom_{piece}", "palette_piece"))
-        # Bind palette events for drag and drop
-        self.top_palette.bind('<ButtonPress-1>', self.on_palette_press)
-        self.top_palette.bind('<B1-Motion>', self.on_palette_drag)
-        self.top_palette.bind('<ButtonRelease-1>', self.on_palette_release)
-        self.bottom_palette.bind('<ButtonPress-1>', self.on_palette_press)
-        self.bottom_palette.bind('<B1-Motion>', self.on_palette_drag)
-        self.bottom_palette.bind('<ButtonRelease-1>', self.on_palette_release)
-
     def on_palette_press(self, event):
         # Determine which palette and which piece was clicked, respecting flip
         widget = event.widget
@@ -1035,7 +1460,7 @@ class ChessGUI:
         else:
             palette = 'bottom'
             pieces = bottom_pieces
-        idx = x // 80
+        idx = x // self.palette_spacing()
         if 0 <= idx < 6:
             piece = pieces[idx]
             self.palette_drag_data = {
@@ -1064,9 +1489,10 @@ class ChessGUI:
         mouse_y = event.y_root
         rel_x = mouse_x - board_x
         rel_y = mouse_y - board_y
-        if 0 <= rel_x < 480 and 0 <= rel_y < 480:
-            col = int(rel_x // 60)
-            row = int(rel_y // 60)
+        board_px = 8 * self.square_size
+        if 0 <= rel_x < board_px and 0 <= rel_y < board_px and self.points_match is None:
+            col = int(rel_x // self.square_size)
+            row = int(rel_y // self.square_size)
             # Adjust for flip
             if getattr(self, 'flip', False):
                 board_col = 7 - col
@@ -1078,21 +1504,26 @@ class ChessGUI:
             # Place the piece on the board
             self.board.remove_piece_at(square)
             self.board.set_piece_at(square, chess.Piece.from_symbol(self.palette_drag_data['piece']))
-            self.draw_board()
-            self.calculate_and_show_best_move()
+            self.model.changed()
         self.palette_drag_data = None
 
+    def palette_spacing(self):
+        # Six palette pieces spread over the board width
+        return 8 * self.square_size // 6
+
     def draw_palettes(self):
         # Draw palettes according to board orientation using get_palette_pieces()
         top_pieces, bottom_pieces = self.get_palette_pieces()
+        spacing = self.palette_spacing()
+        half = self.square_size // 2
         self.top_palette.delete("all")
         for i, piece in enumerate(top_pieces):
             img = PIECE_IMAGES[piece]
-            self.top_palette.create_image(i*80+40, 30, image=img, tags=(f"top_{piece}", "palette_piece"))
+            self.top_palette.create_image(i*spacing+spacing//2, half, image=img, tags=(f"top_{piece}", "palette_piece"))
         self.bottom_palette.delete("all")
         for i, piece in enumerate(bottom_pieces):
             img = PIECE_IMAGES[piece]
-            self.bottom_palette.create_image(i*80+40, 30, image=img, tags=(f"bottom_{piece}", "palette_piece"))
+            self.bottom_palette.create_image(i*spacing+spacing//2, half, image=img, tags=(f"bottom_{piece}", "palette_piece"))
         # Bind palette events for drag and drop
         self.top_palette.bind('<ButtonPress-1>', self.on_palette_press)
         self.top_palette.bind('<B1-Motion>', self.on_palette_drag)
@@ -1102,6 +1533,8 @@ class ChessGUI:
         self.bottom_palette.bind('<ButtonRelease-1>', self.on_palette_release)
 
 if __name__ == "__main__":
+    # Before any widget exists, so every callback can be timed (enabled by NEXTCHESSMOVE_PROFILE_UI or the stats panel)
+    install_ui_profiler()
     root = tk.Tk()
     app = ChessGUI(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
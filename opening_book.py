@@ -0,0 +1,68 @@
+"""Polyglot opening book lookups.
+
+The .bin file is memory-mapped once (chess.polyglot.MemoryMappedReader) and
+each lookup is a binary search on the position's Zobrist key, so answering an
+opening position costs microseconds instead of a full engine search.
+"""
+import os
+import threading
+
+import chess
+import chess.polyglot
+
+# Polyglot opening book path: book.bin next to the script, or the POLYGLOT_BOOK_PATH environment variable
+POLYGLOT_BOOK_PATH = os.environ.get(
+    "POLYGLOT_BOOK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin"),
+)
+
+
+class BookMove:
+    __slots__ = ("move", "weight", "share")
+
+    def __init__(self, move, weight, share):
+        self.move = move
+        self.weight = weight
+        self.share = share  # Fraction of the total weight of this position's book moves
+
+
+class OpeningBook:
+    def __init__(self, path=POLYGLOT_BOOK_PATH):
+        self.path = path
+        self._reader = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Map the file on first use; a missing or broken book just disables lookups
+        if self._reader is None and not self._failed:
+            with self._lock:
+                if self._reader is None and not self._failed:
+                    try:
+                        self._reader = chess.polyglot.open_reader(self.path)
+                    except OSError as e:
+                        if os.path.exists(self.path):
+                            print(f"Failed to open opening book {self.path}: {e}")
+                        self._failed = True
+        return self._reader
+
+    def moves(self, board, minimum_weight=1):
+        """Book moves for board, heaviest first, or [] if the position is not in book."""
+        reader = self._open()
+        if reader is None:
+            return []
+        merged = {}
+        # find_all() binary-searches the key and checks legality against the board
+        for entry in reader.find_all(board, minimum_weight=minimum_weight):
+            merged[entry.move] = merged.get(entry.move, 0) + entry.weight
+        total = sum(merged.values())
+        if not total:
+            return []
+        return sorted((BookMove(move, weight, weight / total) for move, weight in merged.items()),
+                      key=lambda m: m.weight, reverse=True)
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
@@ -0,0 +1,183 @@
+"""Annotate whole PGN files with engine evaluations.
+
+Games are streamed from the input with chess.pgn.read_game, so the file is
+never loaded at once. Every position of the main line is analysed through an
+EnginePool (all cores), each move gets a [%eval ...] comment, and moves that
+lose too much evaluation are marked as inaccuracy (?!), mistake (?) or
+blunder (??) with the engine's best alternatives. Annotated games are
+appended to the output as soon as they are finished.
+
+Progress is recorded next to the output (<output>.progress), so an
+interrupted run continues with the next unfinished game when restarted.
+
+    python nextchessmove.py annotate games.pgn annotated.pgn --time 0.5
+"""
+import json
+import os
+import queue
+
+import chess
+import chess.engine
+import chess.pgn
+
+from analysis_core import STOCKFISH_PATH
+from engine_pool import EnginePool
+
+# Eval drop (centipawns, from the mover's point of view) at which a move is flagged
+INACCURACY = 50
+MISTAKE = 100
+BLUNDER = 300
+# Scores are clamped to +-CLAMP before comparing, so "+15 instead of +20" is not a blunder
+CLAMP = 1000
+MATE_SCORE = 100000
+
+
+def _progress_path(out_path):
+    return out_path + ".progress"
+
+
+def load_progress(out_path):
+    try:
+        with open(_progress_path(out_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_progress(out_path, state):
+    # Write-then-rename so an interruption never leaves a half-written progress file
+    tmp = _progress_path(out_path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, _progress_path(out_path))
+
+
+def terminal_score(board):
+    # Score for positions the engine is not asked about (game over)
+    if board.is_checkmate():
+        return chess.engine.PovScore(chess.engine.Mate(-0), board.turn)
+    return chess.engine.PovScore(chess.engine.Cp(0), board.turn)
+
+
+def eval_comment(score):
+    """[%eval] value from White's point of view, e.g. 0.35 or #-3."""
+    white = score.white()
+    if white.is_mate():
+        return f"[%eval #{white.mate()}]"
+    return f"[%eval {white.score() / 100:.2f}]"
+
+
+def classify(drop):
+    if drop >= BLUNDER:
+        return chess.pgn.NAG_BLUNDER, "Blunder"
+    if drop >= MISTAKE:
+        return chess.pgn.NAG_MISTAKE, "Mistake"
+    if drop >= INACCURACY:
+        return chess.pgn.NAG_DUBIOUS_MOVE, "Inaccuracy"
+    return None, None
+
+
+def _cp(score, color):
+    return max(-CLAMP, min(CLAMP, score.pov(color).score(mate_score=MATE_SCORE)))
+
+
+def annotate_game(game, results):
+    """Add eval comments and mistake NAGs to game's main line.
+
+    results holds one PoolResult per position: the start position and the
+    position after every main line move. Returns {label: count}.
+    """
+    counts = {"Inaccuracy": 0, "Mistake": 0, "Blunder": 0}
+    board = game.board()
+    moves = list(game.mainline_moves())
+    scores = []
+    for ply, result in enumerate(results):
+        if result.score is not None:
+            scores.append(result.score)
+        elif board.is_game_over():
+            scores.append(terminal_score(board))
+        else:
+            scores.append(None)  # Illegal position or engine failure: no eval for this ply
+        if ply < len(moves):
+            board.push(moves[ply])
+    node = game
+    for ply, child in enumerate(game.mainline()):
+        before, after = scores[ply], scores[ply + 1]
+        if after is not None:
+            comment = eval_comment(after)
+            child.comment = f"{comment} {child.comment}".strip()
+        if before is not None and after is not None:
+            mover = node.turn()
+            drop = _cp(before, mover) - _cp(after, mover)
+            nag, label = classify(drop)
+            outcome = results[ply].outcome
+            if nag is not None and outcome is not None and outcome.best_move != child.move:
+                child.nags.add(nag)
+                counts[label] += 1
+                alternatives = [san for san in (outcome.best_move_san, outcome.second_move_san)
+                                if san and san != node.board().san(child.move)]
+                if alternatives:
+                    child.comment = f"{child.comment} {label}. Best was {' or '.join(alternatives)}.".strip()
+        node = child
+    return counts
+
+
+def annotate_pgn(in_path, out_path, limit, engine_path=STOCKFISH_PATH, engines=None, resume=True, on_game=None):
+    """Annotate every game of in_path into out_path; returns the number of games written.
+
+    on_game(index, game, counts) is called after each game is written.
+    """
+    state = load_progress(out_path) if resume else None
+    if state and state.get("input") != os.path.abspath(in_path):
+        state = None
+    with open(in_path, encoding="utf-8-sig", errors="replace") as source:
+        if state:
+            # Drop a partially written game, then continue after the last finished one
+            os.truncate(out_path, state["output_size"])
+            source.seek(state["last_game_offset"])
+            chess.pgn.skip_game(source)
+            games_done = state["games_done"]
+        else:
+            open(out_path, "w").close()
+            games_done = 0
+        games = queue.Queue()
+
+        def positions():
+            # Pulled by analyse_many() on the calling thread; reads ahead only as far as the pool lets it
+            while True:
+                offset = source.tell()
+                game = chess.pgn.read_game(source)
+                if game is None:
+                    return
+                board = game.board()
+                fens = [board.fen()]
+                for move in game.mainline_moves():
+                    board.push(move)
+                    fens.append(board.fen())
+                games.put((offset, game, len(fens)))
+                yield from fens
+
+        with open(out_path, "a", encoding="utf-8") as out, EnginePool(engine_path, size=engines) as pool:
+            current, buffered = None, []
+            for result in pool.analyse_many(positions(), limit, multipv=2):
+                if current is None:
+                    current = games.get()
+                buffered.append(result)
+                offset, game, count = current
+                if len(buffered) < count:
+                    continue
+                counts = annotate_game(game, buffered)
+                game.headers["Annotator"] = "nextchessmove"
+                print(game, file=out, end="\n\n")
+                out.flush()
+                games_done += 1
+                _save_progress(out_path, {
+                    "input": os.path.abspath(in_path),
+                    "games_done": games_done,
+                    "last_game_offset": offset,
+                    "output_size": out.tell(),
+                })
+                if on_game:
+                    on_game(games_done, game, counts)
+                current, buffered = None, []
+    return games_done
@@ -0,0 +1,103 @@
+"""Points Match: the user and the engine alternate moves and score captured material.
+
+The engine's move selection is capture-focused and fast: captures that do
+not lose material are ranked by gain and only those are searched (UCI
+searchmoves via root_moves), for a fraction of a second. Without such a
+capture it falls back to a short normal search.
+"""
+import chess
+import chess.engine
+
+PIECE_POINTS = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9}
+DEFAULT_MOVES = 10  # Moves per side
+ENGINE_THINK_TIME = 0.3  # Seconds per engine move
+MAX_CANDIDATES = 4  # Captures handed to the engine as root moves
+
+
+def piece_points(piece):
+    return PIECE_POINTS.get(piece.piece_type, 0) if piece else 0
+
+
+def captured_piece(board, move):
+    """Piece taken by move (en passant included), or None."""
+    if board.is_en_passant(move):
+        return chess.Piece(chess.PAWN, not board.turn)
+    return board.piece_at(move.to_square)
+
+
+def ranked_captures(board):
+    """Legal captures with their expected material gain, best first.
+
+    Gain is the victim's value, minus the capturing piece's value when the
+    target square is defended (it will probably be taken back).
+    """
+    ranked = []
+    for move in board.generate_legal_captures():
+        gain = piece_points(captured_piece(board, move))
+        if board.is_attacked_by(not board.turn, move.to_square):
+            gain -= piece_points(board.piece_at(move.from_square))
+        ranked.append((gain, move))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked
+
+
+def choose_engine_move(engine, board, think_time=ENGINE_THINK_TIME, max_candidates=MAX_CANDIDATES):
+    """Engine move for a Points Match (blocking; call it off the UI thread)."""
+    candidates = [move for gain, move in ranked_captures(board) if gain >= 0][:max_candidates]
+    if len(candidates) == 1:
+        return candidates[0]
+    try:
+        result = engine.analyse(board, chess.engine.Limit(time=think_time), root_moves=candidates or None)
+        pv = result.get('pv')
+        if pv and pv[0] in board.legal_moves:
+            return pv[0]
+    except Exception as e:
+        print(f"[POINTS MATCH] Engine error, using the best capture: {e}")
+    if candidates:
+        return candidates[0]
+    return next(iter(board.legal_moves), None)
+
+
+class PointsMatch:
+    def __init__(self, user_color, max_moves=DEFAULT_MOVES):
+        self.user_color = user_color
+        self.max_moves = max_moves  # Per side
+        self.moves = {chess.WHITE: 0, chess.BLACK: 0}
+        self.points = {chess.WHITE: 0, chess.BLACK: 0}
+
+    @property
+    def engine_color(self):
+        return not self.user_color
+
+    @property
+    def user_points(self):
+        return self.points[self.user_color]
+
+    @property
+    def engine_points(self):
+        return self.points[self.engine_color]
+
+    def play(self, board, move):
+        """Push move on board and score it; returns the points it won."""
+        mover = board.turn
+        gained = piece_points(captured_piece(board, move))
+        board.push(move)
+        self.moves[mover] += 1
+        self.points[mover] += gained
+        return gained
+
+    def finished(self, board):
+        return board.is_game_over() or all(count >= self.max_moves for count in self.moves.values())
+
+    def tally_text(self):
+        return (f"Points Match - You: {self.user_points}  Engine: {self.engine_points}  "
+                f"(move {min(self.moves[self.user_color] + 1, self.max_moves)}/{self.max_moves})")
+
+    def result_text(self, board):
+        if board.is_checkmate():
+            return "You won by checkmate!" if board.turn == self.engine_color else "The engine won by checkmate."
+        if self.user_points > self.engine_points:
+            return f"You won the Points Match {self.user_points}-{self.engine_points}!"
+        if self.user_points < self.engine_points:
+            return f"The engine won the Points Match {self.engine_points}-{self.user_points}."
+        return f"Points Match drawn {self.user_points}-{self.engine_points}."
@@ -0,0 +1,317 @@
+"""Sound effects decoded once and played in-process.
+
+Every sounds/*.wav file is read at startup and converted to one PCM format
+(16-bit stereo at RATE), so playing a sound only adds a voice to the Mixer.
+Output goes through one stream that lives as long as the app:
+
+- sounddevice (pip install sounddevice) if installed: a RawOutputStream
+  whose callback pulls mixed blocks;
+- otherwise on Linux, a single `aplay` reading raw PCM from a pipe, fed by
+  one worker thread;
+- on Windows, one worker thread playing the preloaded WAV data with winsound
+  (SND_MEMORY); on macOS without sounddevice, the same worker runs afplay.
+  These two play one sound at a time.
+
+Overlap policy: at most MAX_VOICES sounds play at once. Replaying a sound
+that is still playing restarts it; beyond MAX_VOICES the oldest voice is
+dropped. Voices are scaled by VOLUME so a few can overlap before the sum
+clips. The serial backends let a new sound interrupt the one playing.
+
+Without a usable backend or sound file, play() does nothing.
+"""
+import array
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+
+try:
+    import sounddevice
+except ImportError:  # Optional: otherwise aplay / winsound / afplay
+    sounddevice = None
+if sys.platform == "win32":
+    import winsound
+else:
+    winsound = None
+
+SOUNDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+RATE = 44100
+CHANNELS = 2
+BLOCK_FRAMES = 512  # Frames mixed per block (~12 ms)
+LEAD = 0.05  # Seconds of audio the aplay worker writes ahead of the clock
+MAX_VOICES = 4
+VOLUME = 0.7
+
+
+def load_wav(path):
+    """PCM samples of a WAV file as an array('h'): 16-bit, stereo, RATE, scaled by VOLUME."""
+    with wave.open(path, "rb") as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        samples = [(b - 128) << 8 for b in raw]
+    elif width == 2:
+        samples = array.array("h")
+        samples.frombytes(raw[:len(raw) - len(raw) % 2])
+        if sys.byteorder == "big":
+            samples.byteswap()
+    elif width in (3, 4):
+        # Keep the top 16 bits
+        samples = [int.from_bytes(raw[i + width - 2:i + width], "little", signed=True)
+                   for i in range(0, len(raw) - width + 1, width)]
+    else:
+        raise wave.Error(f"unsupported sample width: {width} bytes")
+    if channels == 1:
+        left = right = samples
+    else:
+        left, right = samples[0::channels], samples[1::channels]
+    frames = min(len(left), len(right))
+    if rate != RATE:
+        # Nearest-neighbour resampling is good enough for short effects
+        picks = [i * rate // RATE for i in range(frames * RATE // rate)]
+        left, right = [left[i] for i in picks], [right[i] for i in picks]
+        frames = len(picks)
+    result = array.array("h", bytes(frames * CHANNELS * 2))
+    result[0::2] = array.array("h", (int(s * VOLUME) for s in left[:frames]))
+    result[1::2] = array.array("h", (int(s * VOLUME) for s in right[:frames]))
+    return result
+
+
+class _Voice:
+    __slots__ = ("name", "samples", "pos")
+
+    def __init__(self, name, samples):
+        self.name = name
+        self.samples = samples
+        self.pos = 0
+
+
+class Mixer:
+    def __init__(self, max_voices=MAX_VOICES):
+        self.max_voices = max_voices
+        self._voices = []  # Oldest first
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def add(self, name, samples):
+        with self._cond:
+            self._voices = [v for v in self._voices if v.name != name]
+            self._voices.append(_Voice(name, samples))
+            del self._voices[:-self.max_voices]
+            self._cond.notify()
+
+    @property
+    def active(self):
+        return bool(self._voices)
+
+    def wait(self):
+        """Block until a voice is playing; returns False once closed."""
+        with self._cond:
+            while not self._voices and not self._closed:
+                self._cond.wait()
+            return not self._closed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._voices = []
+            self._cond.notify_all()
+
+    def mix(self, frames):
+        """The next frames of output as native-endian 16-bit bytes (silence when idle)."""
+        n = frames * CHANNELS
+        chunks = []
+        with self._cond:
+            for voice in self._voices:
+                chunks.append(voice.samples[voice.pos:voice.pos + n])
+                voice.pos += n
+            self._voices = [v for v in self._voices if v.pos < len(v.samples)]
+        if not chunks:
+            return bytes(n * 2)
+        if len(chunks) == 1:
+            out = chunks[0]
+        else:
+            out = array.array("h", (max(-32768, min(32767, sum(s)))
+                                    for s in itertools.zip_longest(*chunks, fillvalue=0)))
+        return out.tobytes() + bytes((n - len(out)) * 2)
+
+
+class _SoundDeviceBackend:
+    def __init__(self):
+        self.mixer = Mixer()
+        self._stream = sounddevice.RawOutputStream(samplerate=RATE, channels=CHANNELS, dtype="int16",
+                                                   blocksize=BLOCK_FRAMES, latency="low", callback=self._fill)
+        self._stream.start()
+
+    def _fill(self, outdata, frames, time_info, status):
+        outdata[:] = self.mixer.mix(frames)
+
+    load = staticmethod(load_wav)
+
+    def play(self, name, samples):
+        self.mixer.add(name, samples)
+
+    def close(self):
+        self.mixer.close()
+        self._stream.close()
+
+
+class _AplayBackend:
+    def __init__(self):
+        self.mixer = Mixer()
+        fmt = "S16_LE" if sys.byteorder == "little" else "S16_BE"
+        self._process = subprocess.Popen(
+            ["aplay", "-q", "-t", "raw", "-f", fmt, "-r", str(RATE), "-c", str(CHANNELS), "--buffer-time=50000"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._thread = threading.Thread(target=self._run, name="sound-output", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        out = self._process.stdin
+        try:
+            while self.mixer.wait():
+                # Pace writes by the clock: the pipe would otherwise queue a new sound behind ~0.4 s of audio
+                start = time.monotonic()
+                written = 0
+                while self.mixer.active:
+                    ahead = written / RATE - (time.monotonic() - start)
+                    if ahead > LEAD:
+                        time.sleep(ahead - LEAD)
+                    out.write(self.mixer.mix(BLOCK_FRAMES))
+                    out.flush()
+                    written += BLOCK_FRAMES
+        except (BrokenPipeError, ValueError):
+            pass  # aplay exited (no audio device) or close() ran
+
+    load = staticmethod(load_wav)
+
+    def play(self, name, samples):
+        self.mixer.add(name, samples)
+
+    def close(self):
+        self.mixer.close()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._process.terminate()
+        self._process.wait()
+
+
+class _SerialBackend:
+    # One sound at a time on a worker thread; a new sound interrupts the one playing
+    def __init__(self):
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="sound-output", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                sound, self._pending = self._pending, None
+            try:
+                self._play_one(sound)
+            except Exception as e:
+                print(f"[SOUND ERROR] {e}")
+
+    def play(self, name, sound):
+        with self._cond:
+            self._pending = sound
+            self._cond.notify()
+        self._stop_one()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._stop_one()
+
+
+class _WinsoundBackend(_SerialBackend):
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _play_one(self, data):
+        winsound.PlaySound(data, winsound.SND_MEMORY)
+
+    def _stop_one(self):
+        winsound.PlaySound(None, 0)
+
+
+class _AfplayBackend(_SerialBackend):
+    def __init__(self):
+        self._process = None
+        super().__init__()
+
+    @staticmethod
+    def load(path):
+        return path
+
+    def _play_one(self, path):
+        self._process = subprocess.Popen(["afplay", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._process.wait()
+        self._process = None
+
+    def _stop_one(self):
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+
+def _open_backend():
+    if sounddevice is not None:
+        try:
+            return _SoundDeviceBackend()
+        except Exception as e:
+            print(f"[SOUND] sounddevice output unavailable: {e}")
+    if winsound is not None:
+        return _WinsoundBackend()
+    if sys.platform == "darwin" and shutil.which("afplay"):
+        return _AfplayBackend()
+    if shutil.which("aplay"):
+        return _AplayBackend()
+    return None
+
+
+class SoundPlayer:
+    def __init__(self, directory=SOUNDS_DIR):
+        self.sounds = {}
+        self._backend = None
+        files = sorted(f for f in os.listdir(directory) if f.lower().endswith(".wav")) if os.path.isdir(directory) else []
+        if not files:
+            return
+        try:
+            self._backend = _open_backend()
+        except OSError as e:
+            print(f"[SOUND ERROR] {e}")
+        if self._backend is None:
+            return
+        for filename in files:
+            try:
+                self.sounds[os.path.splitext(filename)[0]] = self._backend.load(os.path.join(directory, filename))
+            except (OSError, EOFError, wave.Error) as e:
+                print(f"[SOUND ERROR] {filename}: {e}")
+
+    def play(self, name):
+        """Start the named sound ('move', 'capture', 'check', 'castle'); returns at once."""
+        sound = self.sounds.get(name)
+        if sound is not None:
+            self._backend.play(name, sound)
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+            self.sounds = {}
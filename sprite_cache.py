@@ -0,0 +1,103 @@
+"""Disk cache of pre-scaled piece sprites.
+
+Resampling the piece PNGs with LANCZOS is the slow part of startup. Scaled
+copies are written once per size to a cache directory, with the source file's
+mtime in the name so edited sprites are picked up automatically. Cached
+sprites are loaded with Tk's own PNG support, so PIL is only imported when a
+size has never been produced before.
+"""
+import os
+import tempfile
+import threading
+import tkinter as tk
+
+SIZE_STEP = 4  # Square sizes are snapped to this step so window resizes reuse cached scales
+MIN_SIZE = 32
+MAX_SIZE = 128
+SPRITE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sprite_cache")
+
+
+def snap_size(size):
+    size = int(size) // SIZE_STEP * SIZE_STEP
+    return max(MIN_SIZE, min(MAX_SIZE, size))
+
+
+def sprite_filename(symbol):
+    # 'K' -> wK.png, 'k' -> bK.png
+    return f"{'w' if symbol.isupper() else 'b'}{symbol.upper()}.png"
+
+
+class SpriteCache:
+    def __init__(self, pieces_dir, cache_dir=SPRITE_CACHE_DIR):
+        self.pieces_dir = pieces_dir
+        self.cache_dir = cache_dir
+        self._images = {}  # (symbol, size) -> PhotoImage
+        self._lock = threading.Lock()
+
+    def _cached_path(self, symbol, size):
+        source = os.path.join(self.pieces_dir, sprite_filename(symbol))
+        mtime = os.stat(source).st_mtime_ns
+        name = f"{os.path.splitext(sprite_filename(symbol))[0]}-{size}-{mtime}.png"
+        return source, os.path.join(self.cache_dir, str(size), name)
+
+    def _ensure_scaled(self, symbol, size):
+        """Path of the scaled PNG on disk, resampling it first if needed (thread-safe, no Tk)."""
+        source, path = self._cached_path(symbol, size)
+        if os.path.exists(path):
+            return path
+        from PIL import Image
+        with self._lock:
+            if os.path.exists(path):
+                return path
+            img = Image.open(source).convert("RGBA").resize((size, size), Image.LANCZOS)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Drop stale copies of this sprite (older mtimes) at this size
+                prefix = f"{os.path.splitext(sprite_filename(symbol))[0]}-{size}-"
+                for old in os.listdir(os.path.dirname(path)):
+                    if old.startswith(prefix):
+                        os.remove(os.path.join(os.path.dirname(path), old))
+                fd, tmp = tempfile.mkstemp(suffix=".png", dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    img.save(f, format="PNG")
+                os.replace(tmp, path)
+            except OSError as e:
+                # Read-only install: keep working, just without the disk cache
+                print(f"[SPRITES] Could not cache {path}: {e}")
+                return img
+            return path
+
+    def get(self, symbol, size):
+        """PhotoImage of the piece at size x size pixels (call on the Tk thread)."""
+        key = (symbol, size)
+        image = self._images.get(key)
+        if image is None:
+            scaled = self._ensure_scaled(symbol, size)
+            if isinstance(scaled, str):
+                image = tk.PhotoImage(file=scaled)
+            else:
+                from PIL import ImageTk
+                image = ImageTk.PhotoImage(scaled)
+            self._images[key] = image
+        return image
+
+    def images_for(self, symbols, size):
+        images = {}
+        for symbol in symbols:
+            try:
+                images[symbol] = self.get(symbol, size)
+            except FileNotFoundError:
+                print(f"ERROR: Could not find image file: {os.path.join(self.pieces_dir, sprite_filename(symbol))}")
+                images[symbol] = None
+        return images
+
+    def prewarm(self, symbols, sizes):
+        # Produce scaled files for likely sizes in the background, so a later resize only reads PNGs
+        def run():
+            for size in sizes:
+                for symbol in symbols:
+                    try:
+                        self._ensure_scaled(symbol, size)
+                    except Exception:
+                        pass
+        threading.Thread(target=run, name="sprite-prewarm", daemon=True).start()
@@ -0,0 +1,124 @@
+"""Local Syzygy tablebase probing for reduced-material positions.
+
+Positions with no more pieces than the largest table available are answered
+exactly from the WDL/DTZ files: game result with perfect play, the best move
+and the distance to zeroing (DTZ), without starting a search.
+"""
+import os
+import threading
+
+import chess
+import chess.engine
+import chess.syzygy
+
+# Directory with the *.rtbw / *.rtbz files: syzygy/ next to the script, or the SYZYGY_PATH
+# environment variable (several directories separated by os.pathsep)
+SYZYGY_PATH = os.environ.get(
+    "SYZYGY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "syzygy"),
+)
+
+WDL_TEXT = {2: "Win", 1: "Win (cursed by 50-move rule)", 0: "Draw", -1: "Loss (blessed by 50-move rule)", -2: "Loss"}
+
+
+class TablebaseResult:
+    """wdl/dtz are from the side to move's point of view (as returned by chess.syzygy)."""
+    __slots__ = ("board", "wdl", "dtz", "best_move", "second_move")
+
+    def __init__(self, board, wdl, dtz, best_move=None, second_move=None):
+        self.board = board
+        self.wdl = wdl
+        self.dtz = dtz
+        self.best_move = best_move
+        self.second_move = second_move
+
+    @property
+    def text(self):
+        return WDL_TEXT.get(self.wdl, "?")
+
+    @property
+    def white_wdl(self):
+        return self.wdl if self.board.turn == chess.WHITE else -self.wdl
+
+    def as_result(self):
+        # Engine-style info dict so update_eval_bar() can draw it; only real wins get a big score
+        cp = {2: 2000, -2: -2000}.get(self.wdl, 0)
+        return {'score': chess.engine.PovScore(chess.engine.Cp(cp), self.board.turn), 'tablebase': self.white_wdl}
+
+
+class SyzygyTablebase:
+    def __init__(self, path=SYZYGY_PATH):
+        self.path = path
+        self._tablebase = None
+        self.max_pieces = 0
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Index the directories on first use; no tables simply means no probing
+        with self._lock:
+            if not self._opened:
+                self._opened = True
+                tablebase = chess.syzygy.Tablebase()
+                for directory in self.path.split(os.pathsep):
+                    if directory and os.path.isdir(directory):
+                        tablebase.add_directory(directory)
+                if tablebase.wdl:
+                    # Table names look like "KQvKR": letters minus the 'v' is the piece count
+                    self.max_pieces = max(len(name) - 1 for name in tablebase.wdl)
+                    self._tablebase = tablebase
+        return self._tablebase
+
+    def set_path(self, path):
+        self.close()
+        with self._lock:
+            self.path = path
+            self._opened = False
+
+    def covers(self, board):
+        tablebase = self._open()
+        return (tablebase is not None and chess.popcount(board.occupied) <= self.max_pieces
+                and not board.castling_rights)
+
+    def probe(self, board):
+        """Return a TablebaseResult, or None if the position is not in the available tables."""
+        if not self.covers(board):
+            return None
+        tablebase = self._tablebase
+        try:
+            wdl = tablebase.probe_wdl(board)
+            dtz = tablebase.probe_dtz(board)
+            ranked = []
+            for move in board.legal_moves:
+                zeroing = board.is_zeroing(move)
+                board.push(move)
+                try:
+                    if board.is_checkmate():
+                        key = (3, 1, 0)
+                    else:
+                        child_wdl = -tablebase.probe_wdl(board)
+                        child_dtz = tablebase.probe_dtz(board)
+                        if child_wdl > 0:
+                            # Winning: convert as fast as possible, zeroing moves first
+                            key = (child_wdl, int(zeroing), -abs(child_dtz))
+                        elif child_wdl < 0:
+                            # Losing: hold out as long as possible, avoid zeroing
+                            key = (child_wdl, -int(zeroing), abs(child_dtz))
+                        else:
+                            key = (0, 0, 0)
+                finally:
+                    board.pop()
+                ranked.append((key, move))
+        except (KeyError, chess.syzygy.MissingTableError):
+            return None
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        best_move = ranked[0][1] if ranked else None
+        second_move = ranked[1][1] if len(ranked) > 1 else None
+        return TablebaseResult(board.copy(stack=False), wdl, dtz, best_move, second_move)
+
+    def close(self):
+        with self._lock:
+            if self._tablebase is not None:
+                self._tablebase.close()
+                self._tablebase = None
+            self._opened = False
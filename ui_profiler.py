@@ -0,0 +1,213 @@
+"""Opt-in timing of everything that runs on the Tk thread.
+
+install() replaces tkinter's CallWrapper, through which Tk invokes every
+Python callback (event bindings, widget commands, after/after_idle), so each
+callback is timed once profiling is enabled. It must run before the widgets
+are created; while profiling is disabled a callback costs one extra
+attribute check. instrument() additionally times chosen functions called
+from inside those callbacks (draw_board, update_eval_bar, ...), which then
+show up both on their own and as sections of the callback that called them.
+
+Per name the profiler keeps a latency histogram. Callbacks slower than
+long_frame_ms are recorded as long frames with the sections they spent their
+time in; with cprofile=True the slowest ones are also captured with
+cProfile. export() writes everything as JSON for offline inspection.
+
+Enable at startup with NEXTCHESSMOVE_PROFILE_UI=1 (or =cprofile), or from the
+Engine stats panel; the report is written to NEXTCHESSMOVE_PROFILE_OUT
+(ui_profile.json next to the script) on exit.
+"""
+import bisect
+import collections
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tkinter
+
+PROFILE_ENV = os.environ.get("NEXTCHESSMOVE_PROFILE_UI", "")
+PROFILE_OUT_PATH = os.environ.get(
+    "NEXTCHESSMOVE_PROFILE_OUT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ui_profile.json"),
+)
+LONG_FRAME_MS = 50.0  # A callback this slow is a visible hitch
+BUCKETS_MS = (0.5, 1, 2, 4, 8, 16, 33, 50, 100, 250, 500, 1000)  # Histogram upper bounds; one more bucket above
+MAX_LONG_FRAMES = 500
+SLOWEST_PROFILES = 5  # cProfile captures kept (the slowest callbacks)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of samples
+        target = fraction * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + (self.max,), self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {"count": self.count, "total_ms": round(self.total, 3),
+                "mean_ms": round(self.total / self.count, 3) if self.count else None,
+                "p50_ms": self.percentile(0.5), "p90_ms": self.percentile(0.9), "p99_ms": self.percentile(0.99),
+                "max_ms": round(self.max, 3),
+                "histogram": {label: n for label, n in zip(labels, self.counts) if n}}
+
+
+def callback_name(func):
+    """Readable name of a Tk callback; after() callbacks are named after the function they run."""
+    if getattr(func, "__name__", None) and func.__qualname__.endswith("after.<locals>.callit") and func.__closure__:
+        for cell in func.__closure__:
+            target = cell.cell_contents
+            if callable(target) and not isinstance(target, tkinter.Misc):
+                return "after:" + callback_name(target)
+    if isinstance(func, functools.partial):
+        return callback_name(func.func)
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", None) or type(func).__name__
+    return name
+
+
+class UiProfiler:
+    def __init__(self, long_frame_ms=LONG_FRAME_MS):
+        self.enabled = False
+        self.cprofile = False
+        self.long_frame_ms = long_frame_ms
+        self.histograms = collections.defaultdict(Histogram)
+        self.long_frames = collections.deque(maxlen=MAX_LONG_FRAMES)
+        self.profiles = []  # (ms, name, pstats text), slowest SLOWEST_PROFILES
+        self.started = None
+        self._depth = 0  # Nesting: 0 outside any timed callback
+        self._sections = None  # {name: ms} of the running top-level callback
+        self._thread = threading.main_thread()
+
+    def enable(self, cprofile=False):
+        self.cprofile = cprofile
+        if not self.enabled:
+            self.started = time.time()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.histograms.clear()
+        self.long_frames.clear()
+        self.profiles = []
+        self.started = time.time() if self.enabled else None
+
+    def call(self, name, func, *args):
+        """Run func(*args) and time it under name (nested calls become sections of the outer one)."""
+        if not self.enabled or threading.current_thread() is not self._thread:
+            return func(*args)
+        if self._depth:
+            return self._call_section(name, func, args)
+        self._depth = 1
+        self._sections = {}
+        profile = cProfile.Profile() if self.cprofile else None
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                return profile.runcall(func, *args)
+            return func(*args)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self._depth = 0
+            self.histograms[name].add(ms)
+            if ms >= self.long_frame_ms:
+                self.long_frames.append({"time": time.time(), "callback": name, "ms": round(ms, 3),
+                                         "sections": {k: round(v, 3) for k, v in self._sections.items()}})
+                if profile is not None:
+                    self._keep_profile(ms, name, profile)
+            self._sections = None
+
+    def _call_section(self, name, func, args):
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self._depth -= 1
+            self.histograms[name].add(ms)
+            if self._sections is not None:
+                self._sections[name] = self._sections.get(name, 0.0) + ms
+
+    def _keep_profile(self, ms, name, profile):
+        if len(self.profiles) >= SLOWEST_PROFILES and ms <= self.profiles[-1][0]:
+            return
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(30)
+        self.profiles.append((ms, name, text.getvalue()))
+        self.profiles.sort(key=lambda p: p[0], reverse=True)
+        del self.profiles[SLOWEST_PROFILES:]
+
+    def instrument(self, owner, names, prefix=""):
+        """Time owner.<name> for each name (methods of an instance, or module functions)."""
+        for name in names:
+            func = getattr(owner, name)
+            label = prefix + getattr(func, "__qualname__", name)
+            def timed(*args, _func=func, _label=label):
+                return self.call(_label, _func, *args)
+            setattr(owner, name, functools.wraps(func)(timed))
+
+    def report(self):
+        return {
+            "started": self.started,
+            "exported": time.time(),
+            "long_frame_ms": self.long_frame_ms,
+            "callbacks": {name: h.to_dict() for name, h in sorted(self.histograms.items(), key=lambda kv: -kv[1].total)},
+            "long_frames": list(self.long_frames),
+            "slowest_profiles": [{"ms": round(ms, 3), "callback": name, "stats": text} for ms, name, text in self.profiles],
+        }
+
+    def export(self, path=PROFILE_OUT_PATH):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.report(), f, indent=1)
+        os.replace(tmp, path)
+        return path
+
+
+profiler = UiProfiler()
+
+
+class _ProfilingCallWrapper(tkinter.CallWrapper):
+    def __init__(self, func, subst, widget):
+        super().__init__(func, subst, widget)
+        self.name = None
+
+    def __call__(self, *args):
+        if not profiler.enabled:
+            return super().__call__(*args)
+        if self.name is None:
+            self.name = callback_name(self.func)
+        return profiler.call(self.name, super().__call__, *args)
+
+
+def install():
+    """Route every Tk callback created from now on through the profiler; enables it if PROFILE_ENV says so."""
+    tkinter.CallWrapper = _ProfilingCallWrapper
+    if PROFILE_ENV and PROFILE_ENV != "0":
+        profiler.enable(cprofile=PROFILE_ENV.lower() == "cprofile")
+    return profiler
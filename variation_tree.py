@@ -0,0 +1,164 @@
+"""Tree of the lines played from a position, with the last analysis of each node.
+
+Playing a move from a node that already has children adds a new variation
+instead of discarding the old line. Every node keeps its position's Zobrist
+key and the last analysis shown for it (an analysis_cache.CachedAnalysis), so
+stepping back and forth through a line can re-display known evaluations
+without searching again.
+
+Positions are not stored: the board of a node is rebuilt from the root by
+replaying the moves on its path. A node also records the side to move after
+its move, because the app may force the turn after playing a move.
+"""
+import chess
+import chess.pgn
+import chess.polyglot
+
+
+def position_key(board):
+    return chess.polyglot.zobrist_hash(board)
+
+
+class VariationNode:
+    __slots__ = ("move", "turn", "key", "parent", "children", "next", "analysis")
+
+    def __init__(self, move, turn, key, parent=None):
+        self.move = move  # None at the root
+        self.turn = turn  # Side to move after the move
+        self.key = key
+        self.parent = parent
+        self.children = []  # children[0] continues the main line
+        self.next = None  # Child that forward() goes to (the last one visited)
+        self.analysis = None
+
+    def path(self):
+        # Nodes from the root's first child down to this one
+        nodes = []
+        node = self
+        while node.parent is not None:
+            nodes.append(node)
+            node = node.parent
+        nodes.reverse()
+        return nodes
+
+    def child(self, move):
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+
+class VariationTree:
+    def __init__(self, board=None):
+        self.reset(board if board is not None else chess.Board())
+
+    def reset(self, board):
+        """Start a new tree at board (e.g. after the position was edited)."""
+        self.root_board = board.copy()
+        self.root = VariationNode(None, board.turn, position_key(board))
+        self.current = self.root
+
+    def board(self, node=None):
+        """The position at node (default: the current node), rebuilt from the root."""
+        board = self.root_board.copy()
+        for step in (node or self.current).path():
+            board.push(step.move)
+            board.turn = step.turn
+        return board
+
+    def play(self, move, board):
+        """Record that move led from the current node to board; returns the (new or existing) child."""
+        node = self.current
+        child = node.child(move)
+        key = position_key(board)
+        if child is None or child.key != key:
+            child = VariationNode(move, board.turn, key, node)
+            node.children.append(child)
+        node.next = child
+        self.current = child
+        return child
+
+    def sync(self, board):
+        """Follow board after it changed outside the tree.
+
+        If board is the current position, nothing happens; if it is the current
+        position plus one move, that move is recorded; anything else (an edited
+        position) starts a new tree.
+        """
+        key = position_key(board)
+        if key == self.current.key:
+            return
+        if board.move_stack:
+            previous = board.copy()
+            move = previous.pop()
+            if position_key(previous) == self.current.key:
+                self.play(move, board)
+                return
+        self.reset(board)
+
+    def goto(self, node):
+        # forward() from any node on the way retraces this line
+        step = node
+        while step.parent is not None:
+            step.parent.next = step
+            step = step.parent
+        self.current = node
+        return node
+
+    def back(self):
+        return self.goto(self.current.parent) if self.current.parent is not None else None
+
+    def forward(self):
+        node = self.current
+        child = node.next or (node.children[0] if node.children else None)
+        return self.goto(child) if child is not None else None
+
+    def node_for(self, board):
+        """The current node, its parent or one of its children if it holds board, else None."""
+        key = position_key(board)
+        node = self.current
+        for candidate in (node, node.parent, *node.children):
+            if candidate is not None and candidate.key == key:
+                return candidate
+        return None
+
+    # --- PGN ---
+    def to_game(self, headers=None):
+        """A chess.pgn.Game with every variation; analysed nodes get an [%eval] comment."""
+        game = chess.pgn.Game()
+        if self.root_board.fen() != chess.STARTING_FEN or self.root_board.move_stack:
+            game.setup(self.root_board.copy(stack=False))
+        for name, value in (headers or {}).items():
+            game.headers[name] = value
+        board = game.board()
+        stack = [(self.root, game, board)]
+        while stack:
+            node, game_node, board = stack.pop()
+            for child in node.children:
+                if not board.is_legal(child.move):
+                    continue
+                pgn_child = game_node.add_variation(child.move)
+                if child.analysis is not None and child.analysis.score is not None:
+                    pgn_child.set_eval(child.analysis.score, child.analysis.depth or None)
+                child_board = board.copy(stack=False)
+                child_board.push(child.move)
+                # PGN cannot express a turn forced after the move, so such a line ends here
+                if child_board.turn == child.turn:
+                    stack.append((child, pgn_child, child_board))
+        return game
+
+    @classmethod
+    def from_game(cls, game):
+        """Build a tree from a chess.pgn.Game, variations included."""
+        board = game.board()
+        tree = cls(board)
+        stack = [(tree.root, game, board)]
+        while stack:
+            node, game_node, board = stack.pop()
+            for variation in game_node.variations:
+                child_board = board.copy(stack=False)
+                child_board.push(variation.move)
+                child = VariationNode(variation.move, child_board.turn, position_key(child_board), node)
+                node.children.append(child)
+                stack.append((child, variation, child_board))
+        return tree